@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from run_benchmarks import RESULTS_DIR, SCRIPTS_DIR, current_commit
+
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+import llm_multi_prompt as multi
+import llm_with_chatGPT as llm
+from llm_backends import ErroLLM, criar_backend, formatar_relatorio
+
+# Compara backends de LLM (ex.: gpt-3.5-turbo hospedado x modelo local em CPU) com exatamente os
+# mesmos lotes: mesmos repositórios, mesma variante de prompt, mesma divisão em lotes. Para cada
+# backend mede vazão e latência, e soma as contagens de smells para comparar as respostas.
+
+WORKERS = 8
+
+
+def preparar_prompts(repos, variante, max_lotes=None):
+    template = multi.carregar_prompts()[variante]
+    prompts = []
+    for repo_name in repos:
+        for i, codigo in enumerate(multi.preparar_lotes(os.path.join(multi.REPOS_DIR, repo_name))):
+            prompts.append((repo_name, i + 1, multi.construir_prompt_variante(template, repo_name, codigo)))
+    return prompts[:max_lotes] if max_lotes else prompts
+
+
+def executar_backend(backend, prompts, workers):
+    def chamar(item):
+        _, _, prompt = item
+        try:
+            resposta = backend.completar(prompt)
+        except ErroLLM:
+            return None
+        try:
+            return llm.extrair_json(resposta.conteudo)["code_smells"]
+        except (ValueError, KeyError, TypeError):
+            return "invalida"
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        respostas = list(executor.map(chamar, prompts))
+
+    totais = Counter()
+    for contagens in respostas:
+        if isinstance(contagens, dict):
+            totais.update({smell: qtd for smell, qtd in contagens.items() if isinstance(qtd, int)})
+    return {
+        **backend.relatorio(),
+        "respostas_invalidas": sum(1 for r in respostas if r == "invalida"),
+        "code_smells": dict(totais),
+        "lotes": [{"repo": repo, "lote": lote, "code_smells": r if isinstance(r, dict) else None}
+                  for (repo, lote, _), r in zip(prompts, respostas)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara vazão, latência e respostas de backends de LLM nos mesmos lotes.")
+    parser.add_argument("--backends", nargs="+", default=["openai", "local"], help="Backends de llm_backends.criar_backend.")
+    parser.add_argument("--url", nargs="+", default=[], metavar="BACKEND=URL", help="URL base por backend (ex.: local=http://127.0.0.1:8080/v1).")
+    parser.add_argument("--repos", nargs="+", required=True, help="Repositórios em data/repositories.")
+    parser.add_argument("--variante", default="zero_shot", choices=list(multi.SECOES_PROMPT.values()))
+    parser.add_argument("--max-lotes", type=int, help="Limita o número de lotes enviados a cada backend.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Requisições simultâneas (no backend local, limitadas aos slots).")
+    parser.add_argument("--minificar", action="store_true", help="Minifica o código antes de montar os lotes (ver java_minifier.py).")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/llm_backends_<ts>_<sha>.json).")
+    args = parser.parse_args()
+    if args.minificar:
+        llm.MINIFICAR_CODIGO = True
+
+    urls = dict(item.split("=", 1) for item in args.url)
+    prompts = preparar_prompts(args.repos, args.variante, args.max_lotes)
+    print(f"{len(prompts)} lote(s) de {len(args.repos)} repositório(s), variante {args.variante}")
+
+    resultados = []
+    for nome in args.backends:
+        backend = criar_backend(nome, usar_cache=False, base_url=urls.get(nome))
+        resultado = executar_backend(backend, prompts, args.workers)
+        resultados.append(resultado)
+        print(formatar_relatorio(resultado) + f" | respostas inválidas {resultado['respostas_invalidas']}")
+
+    print("\nContagens somadas por backend:")
+    smells = sorted({smell for r in resultados for smell in r["code_smells"]})
+    for smell in smells:
+        print(f"  {smell:<60}" + "".join(f"{r['code_smells'].get(smell, 0):>10}" for r in resultados))
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"llm_backends_{time.strftime('%Y%m%d_%H%M%S')}_{current_commit()}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"commit": current_commit(), "variante": args.variante, "repos": args.repos,
+                   "results": resultados}, f, indent=2, ensure_ascii=False)
+    print(f"✓ Resultados salvos em {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from run_benchmarks import RESULTS_DIR, SCRIPTS_DIR, current_commit
+
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from llm_backends import CachingBackend, ErroLLM, OpenAIHTTPBackend
+from mock_llm_server import iniciar_em_thread
+
+# Teste de carga offline: sobe o servidor mock numa thread e dispara requisições
+# concorrentes pelo mesmo backend usado pelos scripts da LLM.
+
+PROMPT_TEMPLATE = """Conte os code smells do código abaixo e retorne APENAS um JSON no formato:
+{{
+  "repository": "load_test",
+  "code_smells": {{
+    "God Class": 0,
+    "Empty Catch Block": 0
+  }},
+  "total_smells": 0
+}}
+
+Código:
+class Classe{index} {{ {body} }}
+"""
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def run_load_test(requests_count, concurrency, unique_prompts, prompt_chars, use_cache, max_retries, server_config):
+    server = iniciar_em_thread(**server_config)
+    backend = OpenAIHTTPBackend(server.url, api_key="mock", model="mock", max_retries=max_retries)
+    cache_dir = None
+    if use_cache:
+        cache_dir = tempfile.TemporaryDirectory(prefix="llm_cache_")
+        backend = CachingBackend(backend, cache_dir.name)
+
+    body = "int x; " * max(1, prompt_chars // 7)
+    prompts = [PROMPT_TEMPLATE.format(index=i % unique_prompts, body=body) for i in range(requests_count)]
+
+    def call(prompt):
+        try:
+            return backend.completar(prompt)
+        except ErroLLM:
+            return None
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(call, prompts))
+    finally:
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+        if cache_dir:
+            cache_dir.cleanup()
+
+    succeeded = [r for r in responses if r is not None]
+    latencies = [r.latencia for r in succeeded if not r.cache]
+    return {
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "unique_prompts": unique_prompts,
+        "cache": use_cache,
+        "server": server_config,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(succeeded) / elapsed, 2) if elapsed else None,
+        "succeeded": len(succeeded),
+        "failed": len(responses) - len(succeeded),
+        "cache_hits": sum(1 for r in succeeded if r.cache),
+        "retries": sum(r.tentativas - 1 for r in succeeded if not r.cache),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "server_stats": dict(server.stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do backend da LLM contra o servidor mock local.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--unique-prompts", type=int, default=None, help="Prompts distintos (padrão: todos distintos).")
+    parser.add_argument("--prompt-chars", type=int, default=4000)
+    parser.add_argument("--cache", action="store_true", help="Usa o CachingBackend (cache em diretório temporário).")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=0)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/llm_load_<ts>_<sha>.json).")
+    args = parser.parse_args()
+
+    server_config = {"latencia": args.latency, "taxa_erro": args.error_rate,
+                     "taxa_429": args.rate_limit_rate, "retry_after": args.retry_after}
+    results = []
+    for concurrency in args.concurrency:
+        result = run_load_test(args.requests, concurrency, args.unique_prompts or args.requests,
+                               args.prompt_chars, args.cache, args.max_retries, server_config)
+        results.append(result)
+        p50 = result["latency_p50"] or 0
+        p95 = result["latency_p95"] or 0
+        print(f"• concorrência {concurrency:>3}: {result['throughput_rps']:>8} req/s | "
+              f"p50 {p50 * 1000:.0f} ms | p95 {p95 * 1000:.0f} ms | "
+              f"novas tentativas {result['retries']} | falhas {result['failed']} | cache {result['cache_hits']}")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"llm_load_{time.strftime('%Y%m%d_%H%M%S')}_{current_commit()}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"commit": current_commit(), "results": results}, f, indent=2)
+    print(f"✓ Resultados salvos em {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+import importlib
+import subprocess
+import multiprocessing
+from datetime import datetime
+
+try:
+    import resource  # Indisponível no Windows
+except ImportError:
+    resource = None
+
+from synthetic_corpus import PRESETS, generate_corpus
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BASE_DIR, "..")
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+CORPUS_DIR = os.path.join(BASE_DIR, ".corpus")
+RESULTS_DIR = os.path.join(BASE_DIR, "results")
+
+# Variação relativa a partir da qual um caso é marcado como regressão
+REGRESSION_THRESHOLD = 0.10
+
+
+# --- Utilitários ---
+def load_script(module_name):
+    """
+    Importa um script do diretório scripts/ (inclusive os numerados, como 06_total_smells_checkstyle).
+    Os scripts usam caminhos relativos a scripts/, então o import é feito a partir dele.
+    """
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    previous_cwd = os.getcwd()
+    os.chdir(SCRIPTS_DIR)
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        os.chdir(previous_cwd)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def current_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True)
+        return result.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+# --- Casos de benchmark ---
+# Cada caso tem um setup (não cronometrado) que devolve um contexto, e uma execução cronometrada.
+def setup_checkstyle(corpus_dir):
+    module = load_script("06_total_smells_checkstyle")
+    files = sorted(glob.glob(os.path.join(corpus_dir, "checkstyle_reports", "*_checkstyle_raw.xml")))
+    return module, files
+
+
+def run_checkstyle(context):
+    module, files = context
+    for xml_path in files:
+        for _ in module.parse_checkstyle_report(xml_path):
+            pass
+
+
+def setup_pmd(corpus_dir):
+    module = load_script("03_total_smells_pmd")
+    files = sorted(glob.glob(os.path.join(corpus_dir, "pmd_reports", "*_pmd_report.csv")))
+    return module, files
+
+
+def run_pmd(context):
+    module, files = context
+    for csv_path in files:
+        module.process_pmd_csv(csv_path, os.path.basename(csv_path).replace("_pmd_report.csv", ""))
+
+
+def setup_analyze(corpus_dir):
+    module = load_script("analyze_results")
+    module.OUTPUT_DIR = os.path.join(corpus_dir, "figures")
+    os.makedirs(module.OUTPUT_DIR, exist_ok=True)
+    return module
+
+
+def setup_loader(corpus_dir):
+    return setup_analyze(corpus_dir), corpus_dir
+
+
+def setup_loaded_data(corpus_dir):
+    module = setup_analyze(corpus_dir)
+    llm_data = module.load_llm_data_for_prompt(os.path.join(corpus_dir, "llm_results"), "zero_shot")
+    tool_data = module.load_tool_data(os.path.join(corpus_dir, "pmd_reports", "summaries"))
+    all_repos = module.get_all_repositories([llm_data, tool_data])
+    return module, llm_data, tool_data, all_repos, corpus_dir
+
+
+def run_load_tool_data(context):
+    module, corpus_dir = context
+    module.load_tool_data(os.path.join(corpus_dir, "pmd_reports", "summaries"))
+
+
+def run_load_llm_data(context):
+    module, corpus_dir = context
+    module.load_llm_data_for_prompt(os.path.join(corpus_dir, "llm_results"), "zero_shot")
+
+
+def run_corpus_metrics(context):
+    module, llm_data, tool_data, all_repos, _ = context
+    module.calculate_corpus_metrics(llm_data, tool_data, all_repos)
+
+
+def run_bar_chart(context):
+    module, llm_data, tool_data, all_repos, _ = context
+    totals = {}
+    totals.update(module.calculate_total_smells_per_tool(llm_data, "LLM", all_repos))
+    totals.update(module.calculate_total_smells_per_tool(tool_data, "PMD", all_repos))
+    module.plot_enhanced_bar_chart(totals, "Benchmark", "Abordagem", "Total", "bench_bar.png")
+
+
+def run_scatter(context):
+    module, llm_data, tool_data, all_repos, _ = context
+    df = module.prepare_detailed_comparison_data(llm_data, tool_data, all_repos)
+    module.plot_scatter_comparison(df, "LLM", "PMD", "bench_scatter.png")
+
+
+def run_heatmap(context):
+    module, llm_data, tool_data, all_repos, _ = context
+    module.plot_heatmap_comparison(llm_data, tool_data, all_repos, "LLM", "PMD", "bench_heatmap.png")
+
+
+CASES = {
+    "parse_checkstyle_report": (setup_checkstyle, run_checkstyle),
+    "process_pmd_csv": (setup_pmd, run_pmd),
+    "load_tool_data": (setup_loader, run_load_tool_data),
+    "load_llm_data_for_prompt": (setup_loader, run_load_llm_data),
+    "calculate_corpus_metrics": (setup_loaded_data, run_corpus_metrics),
+    "plot_enhanced_bar_chart": (setup_loaded_data, run_bar_chart),
+    "plot_scatter_comparison": (setup_loaded_data, run_scatter),
+    "plot_heatmap_comparison": (setup_loaded_data, run_heatmap),
+}
+
+
+def _case_worker(name, corpus_dir, queue):
+    """Executa um caso num processo isolado, para que o pico de RSS seja só dele."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    try:
+        setup, run = CASES[name]
+        context = setup(corpus_dir)
+        setup_rss = peak_rss_mb()
+        start = time.perf_counter()
+        run(context)
+        wall_time = time.perf_counter() - start
+        queue.put({"wall_time_s": wall_time, "setup_peak_rss_mb": setup_rss, "peak_rss_mb": peak_rss_mb()})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(name, corpus_dir, timeout):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_case_worker, args=(name, corpus_dir, queue))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return {"error": f"timeout após {timeout}s"}
+    if queue.empty():
+        return {"error": f"processo terminou com código {process.exitcode}"}
+    return queue.get()
+
+
+# --- Comparação entre execuções ---
+def compare_results(current, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Compara o tempo e o pico de memória de cada caso com uma execução anterior."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    previous = {(r["case"], r["violations"], r["repos"]): r for r in baseline["results"]}
+    regressions = []
+
+    print(f"\nComparação com {baseline.get('commit', '?')} ({os.path.basename(baseline_path)}):")
+    print(f"{'Caso':<28} {'Tamanho':>18} {'Antes (s)':>10} {'Agora (s)':>10} {'Var.':>8} {'RSS antes':>10} {'RSS agora':>10}")
+    for result in current["results"]:
+        key = (result["case"], result["violations"], result["repos"])
+        old = previous.get(key)
+        if not old or "error" in old or "error" in result:
+            continue
+        ratio = (result["wall_time_s"] - old["wall_time_s"]) / old["wall_time_s"] if old["wall_time_s"] else 0.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSÃO"
+            regressions.append(key)
+        size = f"{result['violations']}/{result['repos']}"
+        old_rss = f"{old['peak_rss_mb']:.1f}" if old.get("peak_rss_mb") is not None else "n/d"
+        new_rss = f"{result['peak_rss_mb']:.1f}" if result.get("peak_rss_mb") is not None else "n/d"
+        print(f"{result['case']:<28} {size:>18} {old['wall_time_s']:>10.3f} {result['wall_time_s']:>10.3f} "
+              f"{ratio:>+7.1%} {old_rss:>10} {new_rss:>10}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de análise de code smells com corpora sintéticos.")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS),
+                        help="Tamanho pré-definido (pode ser repetido). Padrão: tiny e small.")
+    parser.add_argument("--violations", type=int, help="Total de violações (substitui --preset).")
+    parser.add_argument("--repos", type=int, help="Número de repositórios (usado com --violations).")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Executa apenas os casos indicados.")
+    parser.add_argument("--timeout", type=int, default=3600, help="Tempo máximo por caso, em segundos.")
+    parser.add_argument("--compare", help="Arquivo JSON de uma execução anterior para comparação.")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    if args.violations:
+        sizes = [(args.violations, args.repos or 10)]
+    else:
+        sizes = [PRESETS[p] for p in (args.preset or ["tiny", "small"])]
+    cases = args.case or list(CASES)
+
+    report = {
+        "commit": current_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+
+    for violations, repos in sizes:
+        corpus_dir = os.path.join(CORPUS_DIR, f"v{violations}_r{repos}")
+        print(f"Gerando corpus sintético: {violations} violações em {repos} repositórios...")
+        start = time.perf_counter()
+        generate_corpus(corpus_dir, violations, repos)
+        print(f"Corpus pronto em {time.perf_counter() - start:.1f}s ({corpus_dir})")
+
+        for name in cases:
+            result = run_case(name, corpus_dir, args.timeout)
+            result.update({"case": name, "violations": violations, "repos": repos})
+            report["results"].append(result)
+            if "error" in result:
+                print(f"  {name:<28} ERRO: {result['error']}")
+            else:
+                rss = f"{result['peak_rss_mb']:.1f} MB" if result["peak_rss_mb"] is not None else "n/d"
+                print(f"  {name:<28} {result['wall_time_s']:>10.3f}s  pico RSS {rss}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = os.path.join(args.output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['commit']}.json")
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {output_file}")
+
+    if args.compare:
+        regressions = compare_results(report, args.compare)
+        if regressions:
+            print(f"\n{len(regressions)} regressão(ões) acima de {REGRESSION_THRESHOLD:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
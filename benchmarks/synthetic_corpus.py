@@ -0,0 +1,172 @@
+import os
+import json
+import random
+
+# Regras reais (fonte completa) do Checkstyle, na mesma forma que aparecem nos relatórios XML
+CHECKSTYLE_SOURCES = [
+    "com.puppycrawl.tools.checkstyle.checks.imports.UnusedImportsCheck",
+    "com.puppycrawl.tools.checkstyle.checks.metrics.CyclomaticComplexityCheck",
+    "com.puppycrawl.tools.checkstyle.checks.blocks.EmptyCatchBlockCheck",
+    "com.puppycrawl.tools.checkstyle.checks.naming.TypeNameCheck",
+    "com.puppycrawl.tools.checkstyle.checks.metrics.ClassFanOutComplexityCheck",
+    "com.puppycrawl.tools.checkstyle.checks.coding.EmptyStatementCheck",
+    "com.puppycrawl.tools.checkstyle.checks.metrics.ClassDataAbstractionCouplingCheck",
+    # Regras fora do mapeamento, para exercitar o caminho de descarte
+    "com.puppycrawl.tools.checkstyle.checks.sizes.LineLengthCheck",
+    "com.puppycrawl.tools.checkstyle.checks.coding.MagicNumberCheck",
+]
+
+# Regras mapeadas por 03_total_smells_pmd.TARGET_SMELLS, para que toda linha passe pela contagem
+PMD_RULES = [
+    ("EmptyCatchBlock", "Error Prone"),
+    ("UnusedImports", "Best Practices"),
+    ("UnusedLocalVariable", "Best Practices"),
+    ("CyclomaticComplexity", "Design"),
+    ("GodClass", "Design"),
+    ("ClassNamingConventions", "Code Style"),
+    ("EmptyIfStmt", "Error Prone"),
+    ("TooManyFields", "Design"),
+    ("TooManyMethods", "Design"),
+]
+
+LLM_SMELLS = [
+    "Empty Catch Block",
+    "Unnecessary Import (Unused Imports)",
+    "Unnecessary Local Before Return (Unused Local Variables)",
+    "Cyclomatic Complexity",
+    "God Class",
+    "Class Naming Conventions",
+    "Empty Control Statement",
+    "Too Many Fields",
+    "Too Many Methods",
+]
+
+PROMPT_TYPES = ["zero_shot", "one_shot", "prompt_calibrado"]
+
+# Tamanhos pré-definidos (violações totais, repositórios)
+PRESETS = {
+    "tiny": (1_000, 10),
+    "small": (100_000, 100),
+    "medium": (1_000_000, 500),
+    "large": (5_000_000, 2_000),
+    "xlarge": (10_000_000, 5_000),
+}
+
+# Incrementar quando o conteúdo gerado mudar, para que corpora antigos em .corpus sejam refeitos
+CORPUS_VERSION = 2
+VIOLATIONS_PER_FILE = 10
+WRITE_CHUNK = 10_000
+
+
+def repo_names(num_repos):
+    return [f"owner{i:05d}_repo{i:05d}" for i in range(num_repos)]
+
+
+def distribute_violations(total_violations, num_repos, seed=42):
+    """
+    Distribui as violações entre os repositórios seguindo uma cauda longa (Zipf),
+    como acontece no corpus real (poucos monorepos concentram a maior parte).
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(num_repos)]
+    rng.shuffle(weights)
+    total_weight = sum(weights)
+    counts = [int(total_violations * w / total_weight) for w in weights]
+    counts[0] += total_violations - sum(counts)
+    return counts
+
+
+def write_checkstyle_report(path, repo, num_violations, rng):
+    """Gera um relatório XML no formato produzido pelo Checkstyle."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<checkstyle version="10.24.0">\n')
+        buffer = []
+        remaining = num_violations
+        file_idx = 0
+        while remaining > 0:
+            in_file = min(remaining, VIOLATIONS_PER_FILE)
+            buffer.append(f'<file name="../data/repositories/{repo}/src/main/java/pkg{file_idx % 50}/Class{file_idx}.java">\n')
+            for _ in range(in_file):
+                source = rng.choice(CHECKSTYLE_SOURCES)
+                buffer.append(
+                    f'<error line="{rng.randint(1, 2000)}" column="{rng.randint(1, 80)}" severity="warning" '
+                    f'message="Synthetic violation" source="{source}"/>\n'
+                )
+            buffer.append("</file>\n")
+            remaining -= in_file
+            file_idx += 1
+            if len(buffer) >= WRITE_CHUNK:
+                f.write("".join(buffer))
+                buffer = []
+        f.write("".join(buffer))
+        f.write("</checkstyle>\n")
+
+
+def write_pmd_report(path, repo, num_violations, rng):
+    """Gera um relatório CSV no formato produzido pelo PMD."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write('"Problem","Package","File","Priority","Line","Description","Rule set","Rule"\n')
+        buffer = []
+        for i in range(num_violations):
+            rule, ruleset = rng.choice(PMD_RULES)
+            file_idx = i // VIOLATIONS_PER_FILE
+            buffer.append(
+                f'"{i + 1}","pkg{file_idx % 50}","../data/repositories/{repo}/src/main/java/pkg{file_idx % 50}/Class{file_idx}.java",'
+                f'"3","{rng.randint(1, 2000)}","Synthetic violation","{ruleset}","{rule}"\n'
+            )
+            if len(buffer) >= WRITE_CHUNK:
+                f.write("".join(buffer))
+                buffer = []
+        f.write("".join(buffer))
+
+
+def write_summary(path, repo, smells, rng, scale):
+    counts = {smell: rng.randint(0, scale) for smell in smells}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"repository": repo, "code_smells": counts, "total_smells": sum(counts.values())}, f)
+
+
+def generate_corpus(output_dir, total_violations, num_repos, seed=42):
+    """
+    Gera um corpus sintético completo em output_dir:
+
+    - checkstyle_reports/<repo>_checkstyle_raw.xml e checkstyle_reports/summaries
+    - pmd_reports/<repo>_pmd_report.csv e pmd_reports/summaries
+    - llm_results/<repo>/<prompt>.json
+
+    O corpus é reaproveitado se já existir com os mesmos parâmetros.
+    """
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    manifest = {"version": CORPUS_VERSION, "total_violations": total_violations, "num_repos": num_repos, "seed": seed}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                return manifest
+
+    rng = random.Random(seed)
+    repos = repo_names(num_repos)
+    counts = distribute_violations(total_violations, num_repos, seed)
+
+    checkstyle_dir = os.path.join(output_dir, "checkstyle_reports")
+    pmd_dir = os.path.join(output_dir, "pmd_reports")
+    llm_dir = os.path.join(output_dir, "llm_results")
+    for directory in (os.path.join(checkstyle_dir, "summaries"), os.path.join(pmd_dir, "summaries"), llm_dir):
+        os.makedirs(directory, exist_ok=True)
+
+    # Metade das violações vai para cada ferramenta
+    for repo, count in zip(repos, counts):
+        write_checkstyle_report(os.path.join(checkstyle_dir, f"{repo}_checkstyle_raw.xml"), repo, count // 2, rng)
+        write_pmd_report(os.path.join(pmd_dir, f"{repo}_pmd_report.csv"), repo, count - count // 2, rng)
+
+        scale = max(1, count // (2 * len(LLM_SMELLS)))
+        write_summary(os.path.join(pmd_dir, "summaries", f"{repo}_summary.json"), repo, LLM_SMELLS, rng, scale)
+        write_summary(os.path.join(checkstyle_dir, "summaries", f"{repo}_summary.json"), repo, LLM_SMELLS, rng, scale)
+
+        repo_llm_dir = os.path.join(llm_dir, repo)
+        os.makedirs(repo_llm_dir, exist_ok=True)
+        for prompt_type in PROMPT_TYPES:
+            write_summary(os.path.join(repo_llm_dir, f"{prompt_type}.json"), repo, LLM_SMELLS, rng, scale)
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
@@ -1,17 +1,37 @@
 import os
 import json
 import time
+import argparse
 import requests
+import threading
 import subprocess
 import logging
 from datetime import datetime
 
+from http_cache import HTTPCache
+from instrumentation import setup_from_args, span, traced
+
 # Configurações
 GITHUB_TOKEN = "github_token"  # Substitua pela sua chave API GitHub
 REPOS_DIR = "../data/repositories"
 LOGS_DIR = "../data/clone_logs"
 NUM_REPOS_TO_CLONE = 10
 START_PAGE = 1  # Modifique para clonar lotes diferentes (1=primeiros 10, 2=próximos 10, etc.)
+# Validade (s) das respostas da API em data/http_cache.sqlite antes de revalidar com ETag
+# (304 não conta no rate limit). 0 = sempre revalida; None = sem cache
+SEARCH_CACHE_TTL = 6 * 3600
+CONTENTS_CACHE_TTL = 7 * 24 * 3600
+# Triagem em lote via GraphQL (aliases): uma requisição verifica GRAPHQL_BATCH_SIZE candidatos.
+# Sem token ou em caso de erro, volta para uma chamada REST por repositório
+USE_GRAPHQL = True
+GITHUB_GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+GRAPHQL_BATCH_SIZE = 50
+BUILD_FILES = {"pom": "pom.xml", "gradle": "build.gradle", "gradleKts": "build.gradle.kts"}
+# Ledger só de acréscimos com cada decisão (clonado, sem Maven/Gradle, não encontrado, falha) e
+# cada página de busca concluída, gravado na hora com fsync. A retomada pula os repositórios e
+# as páginas já decididos sem chamar a API; o clone_results.json é gerado a partir dele.
+CLONE_LEDGER = os.path.join(LOGS_DIR, "clone_ledger.jsonl")
+CLONE_RESULTS = os.path.join(LOGS_DIR, "clone_results.json")
 
 # Configurar logging
 os.makedirs(LOGS_DIR, exist_ok=True)
@@ -28,6 +48,77 @@ logger = logging.getLogger(__name__)
 # Criar diretório para repositórios
 os.makedirs(REPOS_DIR, exist_ok=True)
 
+http_cache = HTTPCache()
+ledger_lock = threading.Lock()
+
+def append_ledger(entry):
+    """Acrescenta uma linha ao ledger e só retorna depois que ela está no disco."""
+    line = json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), **entry}, ensure_ascii=False)
+    with ledger_lock:
+        with open(CLONE_LEDGER, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def record_decision(repo, decision, message=None):
+    append_ledger({"owner": repo["owner"], "name": repo["name"], "url": repo.get("url"), "stars": repo.get("stars"),
+                   "decision": decision, "message": message})
+
+def repair_ledger():
+    """Remove a última linha se um crash a deixou pela metade (sem quebra de linha no fim)."""
+    if not os.path.exists(CLONE_LEDGER):
+        return
+    with open(CLONE_LEDGER, "rb+") as f:
+        content = f.read()
+        if content and not content.endswith(b"\n"):
+            f.truncate(content.rfind(b"\n") + 1)
+            logger.warning("Linha incompleta removida do fim do clone_ledger.jsonl")
+
+def migrate_clone_results():
+    """Na primeira execução com ledger, importa o clone_results.json existente para não perder o histórico."""
+    if os.path.exists(CLONE_LEDGER) or not os.path.exists(CLONE_RESULTS):
+        return
+    try:
+        with open(CLONE_RESULTS, "r") as f:
+            previous_results = json.load(f)
+    except json.JSONDecodeError:
+        logger.warning("Erro ao ler o arquivo de resultados anteriores.")
+        return
+    for result in previous_results:
+        record_decision(result, "cloned" if result["success"] else "failed", result.get("message"))
+    logger.info(f"{len(previous_results)} resultados de {CLONE_RESULTS} importados para o ledger.")
+
+def load_ledger():
+    repair_ledger()
+    migrate_clone_results()
+    if not os.path.exists(CLONE_LEDGER):
+        return []
+    with open(CLONE_LEDGER, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def next_search_page(entries):
+    """
+    Primeira página de busca ainda não concluída segundo o ledger. Uma página com repositórios
+    não verificados fica sem page_done e volta a ser buscada, mesmo que as seguintes já tenham sido.
+    """
+    done = {entry["page"] for entry in entries if entry.get("decision") == "page_done"}
+    page = START_PAGE
+    while page in done:
+        page += 1
+    return page
+
+def write_clone_results(entries):
+    """Regenera o clone_results.json (mesmo formato de antes) a partir das tentativas de clonagem do ledger."""
+    results = [{"owner": entry["owner"], "name": entry["name"], "success": entry["decision"] == "cloned",
+                "message": entry["message"], "url": entry["url"], "stars": entry["stars"]}
+               for entry in entries if entry.get("decision") in ("cloned", "failed")]
+    tmp_file = f"{CLONE_RESULTS}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_file, CLONE_RESULTS)
+    return results
+
+@traced("http", capture=("page",))
 def get_popular_java_repos(page=1, per_page=50):
     """
     Busca os repositórios Java mais populares no GitHub.
@@ -48,7 +139,7 @@ def get_popular_java_repos(page=1, per_page=50):
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = http_cache.get(url, headers=headers, params=params, ttl=SEARCH_CACHE_TTL)
         response.raise_for_status()
         data = response.json()
         repos = []
@@ -64,9 +155,11 @@ def get_popular_java_repos(page=1, per_page=50):
         logger.error(f"Erro ao buscar repositórios: {e}")
         return []
 
+@traced("http", capture=("owner", "repo"))
 def check_uses_maven_or_gradle(owner, repo):
     """
     Verifica se o repositório usa Maven (pom.xml) ou Gradle (build.gradle ou build.gradle.kts).
+    Retorna None se a API falhar, para que o repositório não seja descartado por um erro passageiro.
     """
     url = f"https://api.github.com/repos/{owner}/{repo}/contents"
     headers = {
@@ -76,7 +169,7 @@ def check_uses_maven_or_gradle(owner, repo):
         headers["Authorization"] = f"token {GITHUB_TOKEN}"
 
     try:
-        response = requests.get(url, headers=headers)
+        response = http_cache.get(url, headers=headers, ttl=CONTENTS_CACHE_TTL)
         response.raise_for_status()
         files = response.json()
         filenames = [file["name"].lower() for file in files]
@@ -87,20 +180,94 @@ def check_uses_maven_or_gradle(owner, repo):
         return False
     except requests.exceptions.RequestException as e:
         logger.error(f"Erro ao verificar Maven/Gradle para {owner}/{repo}: {e}")
-        return False
-
-def get_already_cloned_repos():
-    cloned_repos = set()
-
-    results_path = os.path.join(LOGS_DIR, "clone_results.json")
-    if os.path.exists(results_path):
-        try:
-            with open(results_path, "r") as f:
-                results = json.load(f)
-                for repo in results:
-                    cloned_repos.add(f"{repo['owner']}_{repo['name']}")
-        except json.JSONDecodeError:
-            logger.warning("Erro ao ler o arquivo de resultados anteriores.")
+        return None
+
+def build_files_query(repos):
+    """Monta uma consulta com um alias por repositório (r0, r1, ...)."""
+    files = " ".join(f'{alias}: object(expression: "HEAD:{name}") {{ __typename }}'
+                     for alias, name in BUILD_FILES.items())
+    fields = f"stargazerCount diskUsage defaultBranchRef {{ name }} {files}"
+    aliases = "\n".join(f"  r{i}: repository(owner: {json.dumps(repo['owner'])}, name: {json.dumps(repo['name'])}) {{ {fields} }}"
+                        for i, repo in enumerate(repos))
+    return f"query {{\n{aliases}\n  rateLimit {{ cost remaining }}\n}}"
+
+@traced("http")
+def check_build_systems_bulk(repos):
+    """
+    Verifica pom.xml/build.gradle(.kts), estrelas, tamanho e branch padrão de vários
+    repositórios numa única requisição GraphQL. Retorna {owner_nome: info}; repositórios
+    inexistentes ou inacessíveis ficam com info None.
+    """
+    headers = {"Authorization": f"bearer {GITHUB_TOKEN}", "Content-Type": "application/json"}
+    response = requests.post(GITHUB_GRAPHQL_URL, headers=headers, json={"query": build_files_query(repos)}, timeout=60)
+    response.raise_for_status()
+    payload = response.json()
+    data = payload.get("data")
+    if data is None:
+        raise requests.exceptions.RequestException(f"GraphQL sem dados: {payload.get('errors')}")
+
+    results = {}
+    for i, repo in enumerate(repos):
+        node = data.get(f"r{i}")
+        if node is None:
+            results[f"{repo['owner']}_{repo['name']}"] = None
+            continue
+        found = [name for alias, name in BUILD_FILES.items() if node.get(alias)]
+        results[f"{repo['owner']}_{repo['name']}"] = {
+            "uses_maven_or_gradle": bool(found),
+            "build_files": found,
+            "stars": node["stargazerCount"],
+            "size_kb": node["diskUsage"],
+            "default_branch": (node.get("defaultBranchRef") or {}).get("name"),
+        }
+    rate = data.get("rateLimit") or {}
+    logger.info(f"GraphQL: {len(repos)} repositórios verificados (custo {rate.get('cost')}, restante {rate.get('remaining')})")
+    return results
+
+def filter_maven_gradle(repos, undecided=None):
+    """
+    Gera só os candidatos que usam Maven ou Gradle, acrescentando tamanho e branch padrão
+    quando a triagem em lote via GraphQL está disponível. O fallback REST é sob demanda.
+    Os descartados vão para o ledger e não são verificados de novo. Os que não puderam ser
+    verificados (erro na API) não vão para o ledger e, se `undecided` for uma lista, entram nela.
+    """
+    for start in range(0, len(repos), GRAPHQL_BATCH_SIZE):
+        batch = repos[start:start + GRAPHQL_BATCH_SIZE]
+        checked = {}
+        if USE_GRAPHQL and GITHUB_TOKEN:
+            try:
+                checked = check_build_systems_bulk(batch)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Triagem GraphQL falhou, usando a API REST: {e}")
+
+        for repo in batch:
+            repo_id = f"{repo['owner']}_{repo['name']}"
+            if repo_id in checked:
+                info = checked[repo_id]
+                if info is None:
+                    logger.info(f"Pulando {repo['owner']}/{repo['name']} - não encontrado no GitHub.")
+                    record_decision(repo, "not_found")
+                    continue
+                uses_build = info["uses_maven_or_gradle"]
+                repo = {**repo, "stars": info["stars"], "size_kb": info["size_kb"],
+                        "default_branch": info["default_branch"]}
+            else:
+                uses_build = check_uses_maven_or_gradle(repo["owner"], repo["name"])
+
+            if uses_build:
+                yield repo
+            elif uses_build is False:
+                logger.info(f"Pulando {repo['owner']}/{repo['name']} - não usa Maven nem Gradle.")
+                record_decision(repo, "skipped_no_build")
+            elif undecided is not None:
+                undecided.append(repo)
+
+@traced("load")
+def get_already_cloned_repos(entries=None):
+    """Repositórios com alguma decisão no ledger (clonados, descartados ou com falha) ou já em disco."""
+    if entries is None:
+        entries = load_ledger()
+    cloned_repos = {f"{entry['owner']}_{entry['name']}" for entry in entries if "owner" in entry}
 
     if os.path.exists(REPOS_DIR):
         for dirname in os.listdir(REPOS_DIR):
@@ -109,8 +276,8 @@ def get_already_cloned_repos():
 
     return cloned_repos
 
-def clone_repository(owner, name, url):
-    repo_dir = os.path.join(REPOS_DIR, f"{owner}_{name}")
+def clone_repository(owner, name, url, repos_dir=REPOS_DIR, depth=None):
+    repo_dir = os.path.join(repos_dir, f"{owner}_{name}")
     if os.path.exists(repo_dir):
         return False, f"Repositório {owner}/{name} já existe."
 
@@ -121,8 +288,11 @@ def clone_repository(owner, name, url):
             cmd = ["git", "clone", auth_url, repo_dir]
         else:
             cmd = ["git", "clone", url, repo_dir]
+        if depth:
+            cmd[2:2] = ["--depth", str(depth)]
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with span("git clone", "subprocess", repo=f"{owner}/{name}"):
+            result = subprocess.run(cmd, capture_output=True, text=True)
 
         if result.returncode != 0:
             logger.error(f"Erro ao clonar {owner}/{name}: {result.stderr}")
@@ -135,13 +305,35 @@ def clone_repository(owner, name, url):
         return False, str(e)
 
 def main():
-    clone_results = []
-    cloned_count = 0
-    already_cloned = get_already_cloned_repos()
-    logger.info(f"Encontrados {len(already_cloned)} repositórios já clonados.")
+    parser = argparse.ArgumentParser(description="Busca e clona repositórios Java populares que usam Maven ou Gradle.")
+    parser.add_argument("--rebuild-results", action="store_true", help="Só regenera o clone_results.json a partir do ledger.")
+    args = parser.parse_args(setup_from_args("01_clone_repos"))
+
+    entries = load_ledger()
+    if args.rebuild_results:
+        results = write_clone_results(entries)
+        logger.info(f"{len(results)} resultados salvos em {CLONE_RESULTS}")
+        return
 
-    current_page = START_PAGE
+    already_cloned = get_already_cloned_repos(entries)
+    logger.info(f"Encontrados {len(already_cloned)} repositórios já clonados ou descartados.")
 
+    current_page = next_search_page(entries)
+    if current_page != START_PAGE:
+        logger.info(f"Retomando a busca na página {current_page} (páginas anteriores já concluídas no ledger).")
+
+    try:
+        cloned_count = search_and_clone(current_page, already_cloned)
+        logger.info(f"Clonados {cloned_count} novos repositórios.")
+    finally:
+        results = write_clone_results(load_ledger())
+        logger.info(f"Cache HTTP: {http_cache.stats['fresh']} respostas válidas, {http_cache.stats['revalidated']} revalidadas (304), "
+                    f"{http_cache.stats['downloaded']} baixadas")
+        logger.info(f"{len(results)} resultados salvos em {CLONE_RESULTS}")
+
+def search_and_clone(current_page, already_cloned):
+    """Percorre as páginas de busca clonando até NUM_REPOS_TO_CLONE; cada decisão vai na hora para o ledger."""
+    cloned_count = 0
     while cloned_count < NUM_REPOS_TO_CLONE:
         logger.info(f"Buscando repositórios populares (página {current_page})...")
         repos = get_popular_java_repos(page=current_page, per_page=50)
@@ -152,33 +344,22 @@ def main():
 
         logger.info(f"Encontrados {len(repos)} repositórios na página {current_page}.")
 
+        candidates = []
         for repo in repos:
+            if f"{repo['owner']}_{repo['name']}" in already_cloned:
+                logger.info(f"Pulando {repo['owner']}/{repo['name']} - já foi clonado ou descartado anteriormente.")
+            else:
+                candidates.append(repo)
+
+        page_done = True
+        undecided = []
+        for repo in filter_maven_gradle(candidates, undecided):
             if cloned_count >= NUM_REPOS_TO_CLONE:
+                page_done = False
                 break
 
-            owner = repo["owner"]
-            name = repo["name"]
-            repo_id = f"{owner}_{name}"
-
-            if repo_id in already_cloned:
-                logger.info(f"Pulando {owner}/{name} - já foi clonado anteriormente.")
-                continue
-
-            if not check_uses_maven_or_gradle(owner, name):
-                logger.info(f"Pulando {owner}/{name} - não usa Maven nem Gradle.")
-                continue
-
-            success, message = clone_repository(owner, name, repo["url"])
-
-            result = {
-                "owner": owner,
-                "name": name,
-                "success": success,
-                "message": message,
-                "url": repo["url"],
-                "stars": repo["stars"]
-            }
-            clone_results.append(result)
+            success, message = clone_repository(repo["owner"], repo["name"], repo["url"])
+            record_decision(repo, "cloned" if success else "failed", message)
 
             if success:
                 cloned_count += 1
@@ -186,25 +367,16 @@ def main():
 
             time.sleep(1)
 
+        # Página inteira decidida: a próxima execução começa depois dela. Com repositórios não
+        # verificados (ex.: rate limit), a página é buscada de novo na próxima execução.
+        if undecided:
+            logger.warning(f"{len(undecided)} repositório(s) da página {current_page} não puderam ser verificados; "
+                           f"a página será revista na próxima execução.")
+        elif page_done:
+            append_ledger({"page": current_page, "decision": "page_done"})
         current_page += 1
 
-    results_file = os.path.join(LOGS_DIR, "clone_results.json")
-
-    previous_results = []
-    if os.path.exists(results_file):
-        try:
-            with open(results_file, "r") as f:
-                previous_results = json.load(f)
-        except json.JSONDecodeError:
-            logger.warning("Erro ao ler resultados anteriores. Criando novo arquivo.")
-
-    all_results = previous_results + clone_results
-
-    with open(results_file, "w") as f:
-        json.dump(all_results, f, indent=2)
-
-    logger.info(f"Clonados {cloned_count} novos repositórios.")
-    logger.info(f"Resultados salvos em {results_file}")
+    return cloned_count
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,22 @@
 import os
+import csv
+import argparse
 import subprocess
 import logging
 from datetime import datetime
 
+from instrumentation import setup_from_args, span
+from job_scheduler import run_longest_first
+from module_shards import plan_shards, run_shards
+from report_files import create_report, finalize_report
+
 REPOS_DIR = "../data/repositories"   
 REPORTS_DIR = "../data/pmd_reports"  
 PMD_CMD = "pmd"  # Ajuste o PATH do comando PMD conforme necessário
 RULESET = "rulesets/custom_ruleset.xml"
 LANGUAGE = "java"
 REPORT_FORMAT = "csv"  
+WORKERS = 2  # Repositórios em paralelo (cada um sobe uma JVM, ou uma por shard)
 
 # Configuração do logging
 os.makedirs(REPORTS_DIR, exist_ok=True)
@@ -22,47 +30,122 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_pmd_on_repo(repo_path, repo_name):
-    report_file = os.path.join(REPORTS_DIR, f"{repo_name}_pmd_report.{REPORT_FORMAT}")
-
+def run_pmd(sources, repo_name, report_file, label=None):
+    """Uma execução do PMD sobre `sources` (["-d", dir] ou ["--file-list", arquivo])."""
+    label = label or repo_name
     cmd = [
         PMD_CMD,
         "check",
-        "-d", repo_path,
+        *sources,
         "-R", RULESET,
         "-f", REPORT_FORMAT,
         "--force-language=java",  
+        # Sem isso o PMD sai com código 4 sempre que encontra violações
+        "--no-fail-on-violation",
         "-r", report_file
     ]
 
-    logger.info(f"Rodando PMD no repositório {repo_name}...")
+    logger.info(f"Rodando PMD no repositório {label}...")
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with span("pmd check", "subprocess", repo=label):
+            result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode == 0:
-            logger.info(f"PMD executado com sucesso no repositório {repo_name}. Relatório salvo em {report_file}")
+            logger.info(f"PMD executado com sucesso no repositório {label}. Relatório salvo em {report_file}")
             return True
         else:
-            logger.error(f"Erro ao rodar PMD no {repo_name}: {result.stderr}")
+            logger.error(f"Erro ao rodar PMD no {label}: {result.stderr}")
             # Se for erro de memória, escreva mensagem no CSV
             if "OutOfMemoryError" in result.stderr:
                 with open(report_file, "w", encoding="utf-8") as f:
                     f.write("PMD_ERROR: OutOfMemoryError\n")
             return False
     except Exception as e:
-        logger.error(f"Exceção ao rodar PMD no {repo_name}: {e}")
+        logger.error(f"Exceção ao rodar PMD no {label}: {e}")
         with open(report_file, "w", encoding="utf-8") as f:
             f.write(f"PMD_ERROR: {e}\n")
         return False
 
-def main():
+def merge_csv_reports(part_files, report_file):
+    """Junta os CSVs dos shards num só relatório (comprimido), com um cabeçalho e a coluna Problem renumerada."""
+    problem = 0
+    with create_report(report_file) as out:
+        writer = csv.writer(out, quoting=csv.QUOTE_ALL)
+        header_written = False
+        for part in part_files:
+            with open(part, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    continue
+                if not header_written:
+                    writer.writerow(header)
+                    header_written = True
+                for row in reader:
+                    if row and header[0] == "Problem":
+                        problem += 1
+                        row[0] = str(problem)
+                    writer.writerow(row)
+
+def run_pmd_sharded(repo_path, repo_name, report_file, shards):
+    """Roda o PMD por shard (módulos Maven/Gradle ou fatias por tamanho) e junta os relatórios."""
+    logger.info(f"{repo_name}: {sum(len(s) for s in shards)} arquivos divididos em {len(shards)} shards.")
+    base = report_file[:-len(f".{REPORT_FORMAT}")] if report_file.endswith(f".{REPORT_FORMAT}") else report_file
+
+    def work(index, files):
+        file_list = f"{base}.part{index}.txt"
+        with open(file_list, "w", encoding="utf-8") as f:
+            f.write("\n".join(files))
+        try:
+            return run_pmd(["--file-list", file_list], repo_name, f"{base}.part{index}.{REPORT_FORMAT}",
+                           label=f"{repo_name} [shard {index + 1}/{len(shards)}]")
+        finally:
+            os.remove(file_list)
+
+    results = run_shards(shards, work)
+    part_files = [f"{base}.part{i}.{REPORT_FORMAT}" for i in range(len(shards))]
+    try:
+        if all(results):
+            with span("merge pmd shards", "io", repo=repo_name):
+                merge_csv_reports(part_files, report_file)
+            logger.info(f"Relatórios dos shards de {repo_name} juntados em {report_file}")
+            return True
+        # Propaga a marca de erro do primeiro shard que falhou (ex.: OutOfMemoryError)
+        failed = part_files[results.index(False)]
+        error = "PMD_ERROR: falha em um dos shards\n"
+        if os.path.exists(failed):
+            with open(failed, encoding="utf-8") as f:
+                first_line = f.readline()
+            if first_line.startswith("PMD_ERROR"):
+                error = first_line
+        with create_report(report_file) as f:
+            f.write(error)
+        return False
+    finally:
+        for part in part_files:
+            if os.path.exists(part):
+                os.remove(part)
+
+def run_pmd_on_repo(repo_path, repo_name, report_file=None):
+    report_file = report_file or os.path.join(REPORTS_DIR, f"{repo_name}_pmd_report.{REPORT_FORMAT}")
+    shards = plan_shards(repo_path)
+    if shards:
+        return run_pmd_sharded(repo_path, repo_name, report_file, shards)
+    success = run_pmd(["-d", repo_path], repo_name, report_file)
+    finalize_report(report_file)
+    return success
+
+def main(workers=WORKERS):
     repos = [d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d))]
 
     logger.info(f"Encontrados {len(repos)} repositórios para analisar com PMD.")
 
-    for repo_name in repos:
-        repo_path = os.path.join(REPOS_DIR, repo_name)
-        run_pmd_on_repo(repo_path, repo_name)
+    # Os maiores repositórios (pela duração das execuções anteriores) saem primeiro
+    run_longest_first("pmd", repos, lambda repo_name: run_pmd_on_repo(os.path.join(REPOS_DIR, repo_name), repo_name),
+                      workers, repos_dir=REPOS_DIR)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Roda o PMD em todos os repositórios.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Repositórios analisados em paralelo.")
+    args = parser.parse_args(setup_from_args("02_analyze_pmd"))
+    main(args.workers)
\ No newline at end of file
@@ -2,6 +2,9 @@ import csv
 import json
 import os
 
+from instrumentation import setup_from_args, traced
+from report_files import find_report, open_report, report_base
+
 # Mapeia os nomes exatos que queremos contar
 TARGET_SMELLS = {
     "EmptyCatchBlock": "Empty Catch Block",
@@ -15,11 +18,12 @@ TARGET_SMELLS = {
     "TooManyMethods": "Too Many Methods"
 }
 
+@traced("parse", capture=("repository_name",))
 def process_pmd_csv(file_path, repository_name):
     smell_counts = {name: 0 for name in TARGET_SMELLS.values()}
     total_smells = 0
 
-    with open(file_path, newline='', encoding='utf-8') as csvfile:
+    with open_report(file_path) as csvfile:
         reader = csv.DictReader(csvfile)
         for row in reader:
             rule = row['Rule']
@@ -36,24 +40,41 @@ def process_pmd_csv(file_path, repository_name):
 
     return result
 
-if __name__ == "__main__":
-    reports_dir = "../data/pmd_reports"
-    summaries_dir = os.path.join(reports_dir, "summaries")
-    os.makedirs(summaries_dir, exist_ok=True)  
+REPORTS_DIR = "../data/pmd_reports"
+SUMMARIES_DIR = os.path.join(REPORTS_DIR, "summaries")
+
+def summarize_pmd_report(csv_file, summaries_dir=SUMMARIES_DIR):
+    """
+    Gera o resumo JSON de um relatório CSV do PMD (plano ou comprimido).
+    Retorna o caminho do resumo, ou None se o relatório contém erro do PMD.
+    """
+    csv_file = find_report(csv_file)
+    filename = os.path.basename(csv_file)
+    with open_report(csv_file) as f:
+        first_line = f.readline()
+        if first_line.startswith("PMD_ERROR"):
+            print(f"Arquivo {filename} contém erro PMD, ignorando sumarização.")
+            return None
+    repository_name = os.path.basename(report_base(csv_file)).replace("_pmd_report.csv", "")
+    summary = process_pmd_csv(csv_file, repository_name)
+
+    os.makedirs(summaries_dir, exist_ok=True)
+    output_file = os.path.join(summaries_dir, f"{repository_name}_summary.json")
+    with open(output_file, "w", encoding="utf-8") as jsonfile:
+        json.dump(summary, jsonfile, indent=2, ensure_ascii=False)
 
-    for filename in os.listdir(reports_dir):
+    print(f"Resumo salvo em {output_file}")
+    return output_file
+
+def main():
+    os.makedirs(SUMMARIES_DIR, exist_ok=True)
+
+    # Um relatório pode existir plano e comprimido; find_report escolhe o mais recente
+    reports = {report_base(filename) for filename in os.listdir(REPORTS_DIR)}
+    for filename in sorted(reports):
         if filename.endswith(".csv"):
-            csv_file = os.path.join(reports_dir, filename)
-            with open(csv_file, encoding="utf-8") as f:
-                first_line = f.readline()
-                if first_line.startswith("PMD_ERROR"):
-                    print(f"Arquivo {filename} contém erro PMD, ignorando sumarização.")
-                    continue
-            repository_name = filename.replace("_pmd_report.csv", "")
-            summary = process_pmd_csv(csv_file, repository_name)
-
-            output_file = os.path.join(summaries_dir, f"{repository_name}_summary.json")
-            with open(output_file, "w", encoding="utf-8") as jsonfile:
-                json.dump(summary, jsonfile, indent=2, ensure_ascii=False)
-
-            print(f"Resumo salvo em {output_file}")
\ No newline at end of file
+            summarize_pmd_report(os.path.join(REPORTS_DIR, filename))
+
+if __name__ == "__main__":
+    setup_from_args("03_total_smells_pmd")
+    main()
@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import setup_from_args, span, traced
+import java_metrics
+from java_metrics import CLASS_NAME_RE, analyze_source
+from java_sources import listar_blobs
+
+# Quarta linha de base: métricas estruturais calculadas em Python puro (java_metrics.py),
+# em paralelo em todos os núcleos, com cache por arquivo (SHA do blob) e sumários no mesmo
+# formato JSON do PMD e do Checkstyle.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+REPORTS_DIR = os.path.join(DATA_DIR, "metrics_reports")
+SUMMARIES_DIR = os.path.join(REPORTS_DIR, "summaries")
+CACHE_FILE = os.path.join(DATA_DIR, "metrics_cache.sqlite")
+
+CHUNK_SIZE = 32
+
+# Limites (os da classe God Class e de Too Many Fields/Methods seguem o prompt calibrado)
+LONG_METHOD_LINES = 100
+LONG_PARAMETER_LIST = 10
+CYCLOMATIC_COMPLEXITY = 10
+GOD_CLASS_COUPLING = 7
+GOD_CLASS_FAN_OUT = 20
+TOO_MANY_FIELDS = 30
+TOO_MANY_METHODS = 100
+
+SMELLS = [
+    "Empty Catch Block",
+    "Unnecessary Import (Unused Imports)",
+    "Cyclomatic Complexity",
+    "God Class",
+    "Class Naming Conventions",
+    "Empty Control Statement",
+    "Too Many Fields",
+    "Too Many Methods",
+    "Long Method",
+    "Long Parameter List",
+    "Data Class",
+]
+
+
+def engine_version():
+    """Hash de java_metrics.py: qualquer mudança no motor de métricas invalida o cache."""
+    with open(java_metrics.__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+ENGINE_VERSION = engine_version()
+
+
+class MetricsCache:
+    """Métricas por arquivo em SQLite, pela chave versão:SHA do blob. Só o processo principal escreve."""
+
+    def __init__(self, path=CACHE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS metrics (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    @staticmethod
+    def key(sha):
+        return f"{ENGINE_VERSION}:{sha}"
+
+    def get_many(self, shas):
+        found = {}
+        shas = list(shas)
+        for start in range(0, len(shas), 500):
+            keys = [self.key(sha) for sha in shas[start:start + 500]]
+            placeholders = ",".join("?" * len(keys))
+            for key, data in self.connection.execute(f"SELECT key, data FROM metrics WHERE key IN ({placeholders})", keys):
+                found[key.split(":", 1)[1]] = json.loads(data)
+        return found
+
+    def put_many(self, items):
+        self.connection.executemany("INSERT OR REPLACE INTO metrics (key, data) VALUES (?, ?)",
+                                    [(self.key(sha), json.dumps(metrics)) for sha, metrics in items])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def analyze_file(path):
+    """Executado nos processos de trabalho: lê e analisa um arquivo."""
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+        return analyze_source(content.decode("utf-8", errors="ignore"))
+    except Exception as e:
+        return {"error": str(e), "classes": [], "methods": [], "empty_catch_blocks": 0,
+                "empty_control_statements": 0, "unused_imports": 0, "lines": 0}
+
+
+def file_smells(metrics):
+    """Contagens de smells de um arquivo a partir das métricas (os limites podem mudar sem reanalisar)."""
+    counts = dict.fromkeys(SMELLS, 0)
+    counts["Empty Catch Block"] = metrics["empty_catch_blocks"]
+    counts["Empty Control Statement"] = metrics["empty_control_statements"]
+    counts["Unnecessary Import (Unused Imports)"] = metrics["unused_imports"]
+
+    for method in metrics["methods"]:
+        counts["Cyclomatic Complexity"] += method["cyclomatic_complexity"] > CYCLOMATIC_COMPLEXITY
+        counts["Long Method"] += method["length"] > LONG_METHOD_LINES
+        counts["Long Parameter List"] += method["parameters"] > LONG_PARAMETER_LIST
+
+    for info in metrics["classes"]:
+        counts["Class Naming Conventions"] += not CLASS_NAME_RE.match(info["name"])
+        counts["Too Many Fields"] += info["fields"] > TOO_MANY_FIELDS
+        counts["Too Many Methods"] += info["methods"] > TOO_MANY_METHODS
+        counts["God Class"] += (info["coupling"] > GOD_CLASS_COUPLING or info["fan_out"] > GOD_CLASS_FAN_OUT
+                                or info["methods"] > TOO_MANY_METHODS or info["fields"] > TOO_MANY_FIELDS)
+        counts["Data Class"] += (info["kind"] == "class" and info["fields"] > 0
+                                 and info["methods"] > 0 and info["accessors"] == info["methods"])
+    return counts
+
+
+@traced("parse", capture=("repo_name",))
+def analyze_repository(repo_name, executor, cache, repos_dir=REPOS_DIR):
+    """Calcula as métricas dos arquivos sem cache em paralelo e grava o relatório e o sumário."""
+    repo_path = os.path.join(repos_dir, repo_name)
+    files = listar_blobs(repo_path)
+    known = cache.get_many({sha for _, sha in files})
+
+    pending = {}
+    for path, sha in files:
+        if sha not in known and sha not in pending:
+            pending[sha] = os.path.join(repo_path, path)
+
+    if pending:
+        with span("analyze_files", "parse", repo=repo_name, files=len(pending)):
+            shas = list(pending)
+            results = list(zip(shas, executor.map(analyze_file, [pending[sha] for sha in shas], chunksize=CHUNK_SIZE)))
+        # Arquivos que falharam não vão para o cache, para serem refeitos na próxima execução
+        cache.put_many((sha, metrics) for sha, metrics in results if "error" not in metrics)
+        known.update(results)
+
+    write_reports(repo_name, files, known)
+    print(f"✓ {repo_name}: {len(files)} arquivos ({len(pending)} analisados, {len(files) - len(pending)} do cache)")
+
+
+def write_reports(repo_name, files, metrics_by_sha):
+    os.makedirs(SUMMARIES_DIR, exist_ok=True)
+    totals = dict.fromkeys(SMELLS, 0)
+    with open(os.path.join(REPORTS_DIR, f"{repo_name}_metrics.jsonl"), "w", encoding="utf-8") as report:
+        for path, sha in files:
+            metrics = metrics_by_sha[sha]
+            for smell, count in file_smells(metrics).items():
+                totals[smell] += count
+            report.write(json.dumps({"path": path, "blob": sha, **metrics}) + "\n")
+
+    summary = {
+        "repository": repo_name,
+        "code_smells": totals,
+        "total_smells": sum(totals.values()),
+    }
+    with open(os.path.join(SUMMARIES_DIR, f"{repo_name}_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula métricas estruturais dos repositórios Java em paralelo.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos de análise (padrão: todos os núcleos).")
+    args = parser.parse_args(setup_from_args("04_analyze_metrics"))
+
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    cache = MetricsCache()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for repo_name in repos:
+                analyze_repository(repo_name, executor, cache)
+    finally:
+        cache.close()
+    print(f"\nSumários salvos em {SUMMARIES_DIR}")
+
+
+if __name__ == "__main__":
+    main()
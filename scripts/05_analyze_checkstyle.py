@@ -1,23 +1,90 @@
 import os
+import argparse
 import subprocess
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+from instrumentation import setup_from_args, span
+from job_scheduler import run_longest_first
+from module_shards import plan_shards, run_shards
+from report_files import create_report, finalize_report, find_report
 
 REPOS_DIR = "../data/repositories"
 RESULTS_DIR = "../data/checkstyle_reports"
 CHECKSTYLE_JAR = "CHECKSTYLE_JAR"
 CHECKSTYLE_CONFIG = "../config/checkstyle-config.xml"
+WORKERS = 2  # Repositórios em paralelo (cada um sobe uma JVM, ou uma por shard)
 
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
 def run_checkstyle(repo_path, output_file):
+    src_main_path = os.path.join(repo_path, "src", "main", "java")
+    target_path = src_main_path if os.path.exists(src_main_path) else repo_path
+    shards = plan_shards(repo_path, target_path)
+    if shards:
+        return run_checkstyle_sharded(repo_path, output_file, shards)
     try:
-        src_main_path = os.path.join(repo_path, "src", "main", "java")
-        target_path = src_main_path if os.path.exists(src_main_path) else repo_path
         cmd = f"java -jar {CHECKSTYLE_JAR} -c {CHECKSTYLE_CONFIG} -f xml -o {output_file} {target_path}"
-        subprocess.run(cmd, shell=True, check=True)
+        with span("checkstyle", "subprocess", repo=os.path.basename(repo_path)):
+            subprocess.run(cmd, shell=True, check=True)
         return True
     except subprocess.CalledProcessError as e:
         print(f"Erro ao executar CheckStyle em {repo_path}: {e}")
         return False
+    finally:
+        finalize_report(output_file)
+
+def merge_xml_reports(part_files, output_file):
+    """Junta os <file> dos XMLs dos shards num único relatório <checkstyle> (comprimido), em streaming."""
+    with create_report(output_file) as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        opened = False
+        for part in part_files:
+            for event, element in ET.iterparse(part, events=("start", "end")):
+                if event == "start" and element.tag == "checkstyle" and not opened:
+                    out.write(f"<checkstyle version={quoteattr(element.get('version', ''))}>\n")
+                    opened = True
+                elif event == "end" and element.tag == "file":
+                    out.write(ET.tostring(element, encoding="unicode"))
+                    element.clear()
+        if not opened:
+            out.write("<checkstyle>\n")
+        out.write("</checkstyle>\n")
+
+def run_checkstyle_sharded(repo_path, output_file, shards):
+    """Roda o Checkstyle por shard (módulos Maven/Gradle ou fatias por tamanho) e junta os XMLs."""
+    repo_name = os.path.basename(repo_path)
+    print(f"{repo_name}: {sum(len(s) for s in shards)} arquivos divididos em {len(shards)} shards.")
+    base = output_file[:-len(".xml")] if output_file.endswith(".xml") else output_file
+
+    def work(index, files):
+        # Lista de arquivos num @argfile (picocli), para não estourar o limite da linha de comando
+        args_file = f"{base}.part{index}.args"
+        with open(args_file, "w", encoding="utf-8") as f:
+            f.write("\n".join('"' + path.replace(os.sep, "/") + '"' for path in files))
+        try:
+            cmd = f"java -jar {CHECKSTYLE_JAR} -c {CHECKSTYLE_CONFIG} -f xml -o {base}.part{index}.xml @{args_file}"
+            with span("checkstyle", "subprocess", repo=f"{repo_name} [shard {index + 1}/{len(shards)}]"):
+                subprocess.run(cmd, shell=True, check=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Erro ao executar CheckStyle em {repo_path} (shard {index + 1}): {e}")
+            return False
+        finally:
+            os.remove(args_file)
+
+    results = run_shards(shards, work)
+    part_files = [f"{base}.part{i}.xml" for i in range(len(shards))]
+    try:
+        if not all(results):
+            return False
+        with span("merge checkstyle shards", "io", repo=repo_name):
+            merge_xml_reports(part_files, output_file)
+        return True
+    finally:
+        for part in part_files:
+            if os.path.exists(part):
+                os.remove(part)
 
 def process_repository(repo_folder):
     repo_path = os.path.join(REPOS_DIR, repo_folder)
@@ -26,11 +93,11 @@ def process_repository(repo_folder):
     xml_output = os.path.join(RESULTS_DIR, f"{repo_folder}_checkstyle_raw.xml")
 
     if run_checkstyle(repo_path, xml_output):
-        print(f"Arquivo bruto salvo em {xml_output}")
+        print(f"Arquivo bruto salvo em {find_report(xml_output)}")
         return True
     return False
 
-def main():
+def main(workers=WORKERS):
     if not os.path.exists(REPOS_DIR):
         print(f"O diretório {REPOS_DIR} não existe.")
         return
@@ -43,8 +110,11 @@ def main():
 
     print(f"Encontrados {len(repo_folders)} repositórios para análise.")
 
-    for repo_folder in repo_folders:
-        process_repository(repo_folder)
+    # Os maiores repositórios (pela duração das execuções anteriores) saem primeiro
+    run_longest_first("checkstyle", repo_folders, process_repository, workers, repos_dir=REPOS_DIR)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Roda o CheckStyle em todos os repositórios.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Repositórios analisados em paralelo.")
+    args = parser.parse_args(setup_from_args("05_analyze_checkstyle"))
+    main(args.workers)
@@ -2,60 +2,70 @@ import os
 import json
 import xml.etree.ElementTree as ET
 from collections import Counter
-import xml.etree.ElementTree as ET
+
+from instrumentation import setup_from_args, span, traced
+from report_files import find_report, open_report, report_base
 
 REPORTS_DIR = "../data/checkstyle_reports"
 SUMMARIES_DIR = os.path.join(REPORTS_DIR, "summaries")
 os.makedirs(SUMMARIES_DIR, exist_ok=True)
 
+RULE_MAPPING = {
+    "UnusedImports": "Unused Imports",
+    "CyclomaticComplexity": "Cyclomatic Complexity",
+    "EmptyCatchBlock": "Empty Catch Block",
+    "TypeName": "Naming Conventions",
+    "ClassFanOutComplexity": "Potential God Class",
+    "EmptyStatement": "Empty Control Statement",
+    "ClassDataAbstractionCoupling": "Too Many Fields"
+}
+
 def parse_checkstyle_report(xml_path):
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    results = []
-
-    for file_element in root.findall('file'):
-        file_name = file_element.get('name')
-        file_issues = []
-
-        for error in file_element.findall('.//error'):
-            line = error.get('line')
-            column = error.get('column', '0')
-            severity = error.get('severity')
-            message = error.get('message')
-            source = error.get('source', '').split('.')[-1]
-            if source.endswith('Check'):
-                source = source[:-5]
-            file_issues.append({
-                "line": line,
-                "column": column,
-                "severity": severity,
-                "message": message,
-                "rule": source
-            })
-
-        results.append({
-            "file": file_name,
-            "issues": file_issues
+    # Gerador: iterparse sobre o arquivo descomprimido em streaming, um <file> por vez, sem
+    # montar a lista do relatório inteiro. Um XML inválido levanta ET.ParseError durante a iteração.
+    with span("parse_checkstyle_report", "parse", xml_path=xml_path):
+        with open_report(find_report(xml_path), "rb") as f:
+            for element in iter_file_elements(f):
+                yield parse_file_element(element)
+
+def iter_file_elements(stream):
+    for _, element in ET.iterparse(stream):
+        if element.tag == "file":
+            yield element
+            element.clear()
+
+def parse_file_element(file_element):
+    file_name = file_element.get('name')
+    file_issues = []
+
+    for error in file_element.findall('.//error'):
+        line = error.get('line')
+        column = error.get('column', '0')
+        severity = error.get('severity')
+        message = error.get('message')
+        source = error.get('source', '').split('.')[-1]
+        if source.endswith('Check'):
+            source = source[:-5]
+        file_issues.append({
+            "line": line,
+            "column": column,
+            "severity": severity,
+            "message": message,
+            "rule": source
         })
 
-    return results
-
-def generate_summary_json(repo_name, detailed_results):
-    rule_mapping = {
-        "UnusedImports": "Unused Imports",
-        "CyclomaticComplexity": "Cyclomatic Complexity",
-        "EmptyCatchBlock": "Empty Catch Block",
-        "TypeName": "Naming Conventions",
-        "ClassFanOutComplexity": "Potential God Class",
-        "EmptyStatement": "Empty Control Statement",
-        "ClassDataAbstractionCoupling": "Too Many Fields"
+    return {
+        "file": file_name,
+        "issues": file_issues
     }
 
+@traced("aggregate", capture=("repo_name",))
+def generate_summary_json(repo_name, detailed_results):
     counter = Counter()
     for file_result in detailed_results:
         for issue in file_result.get("issues", []):
             rule = issue.get("rule")
-            nice_rule = rule_mapping.get(rule)
+            nice_rule = RULE_MAPPING.get(rule)
             if nice_rule:
                 counter[nice_rule] += 1
 
@@ -76,7 +86,7 @@ def generate_summary_json(repo_name, detailed_results):
 import xml.etree.ElementTree as ET
 
 def main():
-    xml_files = [f for f in os.listdir(REPORTS_DIR) if f.endswith("_checkstyle_raw.xml")]
+    xml_files = sorted({report_base(f) for f in os.listdir(REPORTS_DIR) if report_base(f).endswith("_checkstyle_raw.xml")})
 
     if not xml_files:
         print("Nenhum arquivo XML encontrado em", REPORTS_DIR)
@@ -88,11 +98,10 @@ def main():
         repo_name = xml_file.replace("_checkstyle_raw.xml", "")
         xml_path = os.path.join(REPORTS_DIR, xml_file)
         try:
-            detailed_results = parse_checkstyle_report(xml_path)
+            generate_summary_json(repo_name, parse_checkstyle_report(xml_path))
         except ET.ParseError:
             print(f"Arquivo XML inválido ou corrompido: {xml_file}, ignorando.")
-            continue
-        generate_summary_json(repo_name, detailed_results)
 
 if __name__ == "__main__":
+    setup_from_args("06_total_smells_checkstyle")
     main()
@@ -0,0 +1,325 @@
+import os
+import re
+import json
+import math
+import time
+import random
+import argparse
+import subprocess
+import threading
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from instrumentation import setup_from_args, span, traced
+
+# Etapa do SonarQube: roda o SonarScanner em cada repositório contra uma instância local,
+# baixa as issues das regras mapeadas pela Web API (páginas pedidas em paralelo, sincronização
+# incremental por createdAfter) e grava sumários no mesmo formato do PMD e do Checkstyle.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+REPORTS_DIR = os.path.join(DATA_DIR, "sonarqube_reports")
+SUMMARIES_DIR = os.path.join(REPORTS_DIR, "summaries")
+WORK_DIR = os.path.join(REPORTS_DIR, "work")
+SONAR_CONFIG = os.path.join(BASE_DIR, "..", "config", "sonarqube-config.properties")
+SONAR_SCANNER = "sonar-scanner"
+
+DEFAULT_HOST_URL = "http://localhost:9000"
+PROJECT_KEY_PREFIX = "code-smells:"
+
+PAGE_SIZE = 500         # máximo aceito por /api/issues/search
+MAX_RESULTS = 10000     # a API não pagina além dos 10.000 primeiros resultados de uma consulta
+MAX_PAGE_REQUESTS = 4
+TIMEOUT = 60
+MAX_RETRIES = 5
+TASK_TIMEOUT = 1800
+TASK_POLL_INTERVAL = 2
+# Margem no createdAfter para diferenças de relógio entre esta máquina e o servidor
+SYNC_OVERLAP = timedelta(hours=1)
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+# Regras do SonarJava equivalentes aos smells do PMD (mesmos nomes dos sumários do 03)
+TARGET_RULES = {
+    "java:S2486": "Empty Catch Block",
+    "java:S1128": "Unnecessary Import (Unused Imports)",
+    "java:S1481": "Unnecessary Local Before Return (Unused Local Variables)",
+    "java:S1488": "Unnecessary Local Before Return (Unused Local Variables)",
+    "java:S1541": "Cyclomatic Complexity",
+    "java:S6539": "God Class",
+    "java:S1200": "God Class",
+    "java:S101": "Class Naming Conventions",
+    "java:S108": "Empty Control Statement",
+    "java:S1820": "Too Many Fields",
+    "java:S1448": "Too Many Methods",
+}
+
+
+class SonarQubeError(Exception):
+    """Falha definitiva numa chamada à Web API (após esgotar as tentativas)."""
+
+
+class SonarQubeClient:
+    """Cliente da Web API. Repete a chamada em 429, 5xx e falhas de conexão, com backoff exponencial."""
+
+    def __init__(self, base_url, token=None, timeout=TIMEOUT, max_retries=MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # requests.Session não é thread-safe; uma por thread reaproveita as conexões
+        if not hasattr(self._local, "session"):
+            session = requests.Session()
+            if self.token:
+                session.auth = (self.token, "")
+            self._local.session = session
+        return self._local.session
+
+    def get(self, path, **params):
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                if response.status_code != 429 and response.status_code < 500:
+                    raise SonarQubeError(f"{path}: HTTP {response.status_code} {response.text[:200]}")
+                error = f"HTTP {response.status_code}"
+            if attempt < self.max_retries:
+                time.sleep(min(2 ** (attempt - 1), 30) * (0.5 + random.random() / 2))
+        raise SonarQubeError(f"{path}: {error}")
+
+    def status(self):
+        return self.get("/api/system/status").get("status")
+
+    def search_issues(self, project, page=1, page_size=PAGE_SIZE, rules=None, created_after=None, facets=None):
+        """Uma página das issues abertas do projeto, em ordem de criação (ordem estável entre páginas)."""
+        params = {"projects": project, "resolved": "false", "rules": ",".join(rules or TARGET_RULES),
+                  "s": "CREATION_DATE", "asc": "true", "p": page, "ps": page_size}
+        if created_after:
+            params["createdAfter"] = created_after
+        if facets:
+            params["facets"] = facets
+        with span("issues_search", "http", project=project, page=page):
+            return self.get("/api/issues/search", **params)
+
+    def wait_for_task(self, task_id, timeout=TASK_TIMEOUT):
+        """Aguarda o processamento do relatório do scanner no servidor e devolve o status final."""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = self.get("/api/ce/task", id=task_id)["task"]["status"]
+            if status in ("SUCCESS", "FAILED", "CANCELED"):
+                return status
+            if time.monotonic() > deadline:
+                raise SonarQubeError(f"Tarefa {task_id} não terminou em {timeout}s (status {status})")
+            time.sleep(TASK_POLL_INTERVAL)
+
+
+def read_properties(path):
+    properties = {}
+    if not os.path.exists(path):
+        return properties
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith(("#", "!")) and "=" in line:
+                key, value = line.split("=", 1)
+                properties[key.strip()] = value.strip()
+    return properties
+
+
+def project_key(repo_name):
+    return PROJECT_KEY_PREFIX + re.sub(r"[^\w.-]", "_", repo_name)
+
+
+def run_scanner(repo_path, project, host_url, token=None):
+    """Roda o SonarScanner e devolve o id da tarefa de processamento no servidor (ou None em caso de erro)."""
+    work_dir = os.path.join(WORK_DIR, project.replace(":", "_"))
+    cmd = [
+        SONAR_SCANNER,
+        f"-Dproject.settings={os.path.abspath(SONAR_CONFIG)}",
+        f"-Dsonar.projectKey={project}",
+        f"-Dsonar.projectName={os.path.basename(repo_path)}",
+        f"-Dsonar.projectBaseDir={os.path.abspath(repo_path)}",
+        f"-Dsonar.working.directory={os.path.abspath(work_dir)}",
+        f"-Dsonar.host.url={host_url}",
+    ]
+    # O token vai pelo ambiente para não aparecer na lista de processos
+    env = {**os.environ, "SONAR_TOKEN": token} if token else None
+    try:
+        with span("sonar-scanner", "subprocess", repo=os.path.basename(repo_path)):
+            subprocess.run(cmd, check=True, env=env)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"Erro ao executar o SonarScanner em {repo_path}: {e}")
+        return None
+    return read_properties(os.path.join(work_dir, "report-task.txt")).get("ceTaskId")
+
+
+def facet_counts(response):
+    return {value["val"]: value["count"] for facet in response.get("facets", []) if facet["property"] == "rules"
+            for value in facet["values"] if value["count"]}
+
+
+def fetch_issues(client, executor, project, created_after=None, rules=None):
+    """
+    Busca as issues abertas das regras mapeadas: a primeira página informa o total e as demais são
+    pedidas em paralelo. Acima do limite de 10.000 resultados da API, divide a consulta por regra.
+    Devolve (issues, {regra: total no servidor}).
+    """
+    rules = list(rules or TARGET_RULES)
+    first = client.search_issues(project, rules=rules, created_after=created_after, facets="rules")
+    total = first["paging"]["total"]
+    counts = facet_counts(first)
+
+    if total > MAX_RESULTS and len(rules) > 1:
+        issues = []
+        for rule in rules:
+            if counts.get(rule):
+                issues.extend(fetch_issues(client, executor, project, created_after, [rule])[0])
+        return issues, counts
+    if total > MAX_RESULTS:
+        print(f"Aviso: {project} tem {total} issues de {rules[0]}; a API só devolve as {MAX_RESULTS} primeiras "
+              f"(o sumário usa o total do servidor).")
+
+    pages = range(2, math.ceil(min(total, MAX_RESULTS) / PAGE_SIZE) + 1)
+    issues = list(first["issues"])
+    for response in executor.map(lambda page: client.search_issues(project, page=page, rules=rules,
+                                                                   created_after=created_after), pages):
+        issues.extend(response["issues"])
+    return issues, counts
+
+
+def compact_issue(issue):
+    return {key: issue.get(key) for key in ("key", "rule", "component", "line", "creationDate")}
+
+
+@traced("http", capture=("repo_name",))
+def sync_issues(client, executor, repo_name, project, full=False):
+    """
+    Atualiza data/sonarqube_reports/<repo>_sonarqube_issues.json. Com uma sincronização anterior,
+    pede só as issues criadas desde então e confere as contagens por regra com o servidor; se não
+    baterem (issues resolvidas ou criadas com data retroativa), refaz a sincronização completa.
+    Devolve (issues, {regra: total no servidor}, modo).
+    """
+    issues_file = os.path.join(REPORTS_DIR, f"{repo_name}_sonarqube_issues.json")
+    started = datetime.now(timezone.utc)
+    state = None
+    if not full and os.path.exists(issues_file):
+        with open(issues_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+    issues = None
+    mode = "completa"
+    if state and state.get("project") == project:
+        created_after = (datetime.strptime(state["synced_at"], DATE_FORMAT) - SYNC_OVERLAP).strftime(DATE_FORMAT)
+        new_issues, _ = fetch_issues(client, executor, project, created_after)
+        issues = {issue["key"]: issue for issue in state["issues"]}
+        issues.update((issue["key"], compact_issue(issue)) for issue in new_issues)
+        counts = facet_counts(client.search_issues(project, page_size=1, facets="rules"))
+        local = Counter(issue["rule"] for issue in issues.values())
+        # Regras com mais de MAX_RESULTS issues nunca são baixadas por inteiro e ficam fora da conferência
+        if all(local[rule] == counts.get(rule, 0) for rule in set(local) | set(counts)
+               if counts.get(rule, 0) <= MAX_RESULTS):
+            mode = f"incremental, {len(new_issues)} novas"
+        else:
+            print(f"• {repo_name}: contagens divergentes do servidor, refazendo a sincronização completa")
+            issues = None
+
+    if issues is None:
+        fetched, counts = fetch_issues(client, executor, project)
+        issues = {issue["key"]: compact_issue(issue) for issue in fetched}
+
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    temporary = f"{issues_file}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"project": project, "synced_at": started.strftime(DATE_FORMAT),
+                   "issues": list(issues.values())}, f)
+    os.replace(temporary, issues_file)
+    return list(issues.values()), counts, mode
+
+
+def generate_summary_json(repo_name, rule_counts, summaries_dir=SUMMARIES_DIR):
+    smell_counts = dict.fromkeys(TARGET_RULES.values(), 0)
+    for rule, count in rule_counts.items():
+        if rule in TARGET_RULES:
+            smell_counts[TARGET_RULES[rule]] += count
+
+    summary = {
+        "repository": repo_name,
+        "code_smells": smell_counts,
+        "total_smells": sum(smell_counts.values()),
+    }
+    os.makedirs(summaries_dir, exist_ok=True)
+    output_file = os.path.join(summaries_dir, f"{repo_name}_summary.json")
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return output_file
+
+
+def process_repository(repo_name, client, executor, host_url, token=None, scan=True, full=False):
+    project = project_key(repo_name)
+    if scan:
+        print(f"Analisando {repo_name} com o SonarScanner...")
+        task_id = run_scanner(os.path.join(REPOS_DIR, repo_name), project, host_url, token)
+        if task_id is None:
+            return False
+        status = client.wait_for_task(task_id)
+        if status != "SUCCESS":
+            print(f"✗ {repo_name}: processamento da análise terminou com status {status}")
+            return False
+
+    issues, counts, mode = sync_issues(client, executor, repo_name, project, full)
+    generate_summary_json(repo_name, counts)
+    print(f"✓ {repo_name}: {sum(counts.values())} issues ({len(issues)} sincronizadas, {mode})")
+    return True
+
+
+def create_client(host_url=None):
+    """Configuração: --host-url, SONAR_HOST_URL/SONAR_TOKEN ou config/sonarqube-config.properties."""
+    properties = read_properties(SONAR_CONFIG)
+    host_url = host_url or os.getenv("SONAR_HOST_URL") or properties.get("sonar.host.url") or DEFAULT_HOST_URL
+    token = os.getenv("SONAR_TOKEN") or properties.get("sonar.token") or None
+    return SonarQubeClient(host_url, token), host_url, token
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analisa os repositórios com o SonarQube e sumariza as issues.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--host-url", help=f"URL do SonarQube (padrão: SONAR_HOST_URL ou {DEFAULT_HOST_URL}).")
+    parser.add_argument("--skip-scan", action="store_true", help="Só sincroniza as issues de análises já feitas.")
+    parser.add_argument("--full", action="store_true", help="Ignora a sincronização anterior e baixa todas as issues.")
+    parser.add_argument("--workers", type=int, default=MAX_PAGE_REQUESTS, help="Páginas pedidas em paralelo.")
+    args = parser.parse_args(setup_from_args("07_analyze_sonarqube"))
+
+    client, host_url, token = create_client(args.host_url)
+    try:
+        status = client.status()
+    except (SonarQubeError, ValueError) as e:
+        print(f"✗ SonarQube indisponível em {host_url}: {e}")
+        return
+    if status != "UP":
+        print(f"✗ SonarQube em {host_url} não está pronto (status {status})")
+        return
+
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for repo_name in repos:
+            try:
+                process_repository(repo_name, client, executor, host_url, token, not args.skip_scan, args.full)
+            except SonarQubeError as e:
+                print(f"✗ {repo_name}: {e}")
+    print(f"\nSumários salvos em {SUMMARIES_DIR}")
+
+
+if __name__ == "__main__":
+    main()
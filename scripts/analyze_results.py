@@ -1,6 +1,5 @@
-import json
 import os
-import glob
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -9,13 +8,15 @@ from collections import defaultdict
 import warnings
 warnings.filterwarnings('ignore')
 
+from instrumentation import setup_from_args, traced
+import smell_statistics as stats
+# Seções 1 e 2 (normalização dos nomes e carregamento dos dados) ficam em smell_names.py e smell_data.py
+from smell_data import (CHECKSTYLE_REPORTS_DIR, LLM_RESULTS_DIR, METRICS_REPORTS_DIR, PMD_REPORTS_DIR,
+                        SONARQUBE_REPORTS_DIR, load_llm_data_for_prompt, load_tool_data)
+from smell_names import COMMON_CODE_SMELLS
+
 # --- Configurações Iniciais ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
-
-PMD_REPORTS_DIR = os.path.join(DATA_DIR, 'pmd_reports', 'summaries')
-CHECKSTYLE_REPORTS_DIR = os.path.join(DATA_DIR, 'checkstyle_reports', 'summaries')
-LLM_RESULTS_DIR = os.path.join(DATA_DIR, 'llm_results')
 
 OUTPUT_DIR = os.path.join(BASE_DIR, 'analysis_results')
 if not os.path.exists(OUTPUT_DIR):
@@ -25,113 +26,12 @@ if not os.path.exists(OUTPUT_DIR):
 plt.style.use('seaborn-v0_8-whitegrid')
 sns.set_palette("husl")
 
-# --- Code Smells Comuns entre PMD e CheckStyle ---
-COMMON_CODE_SMELLS = {
-    "empty_catch_block",
-    "unused_import",
-    "cyclomatic_complexity",
-    "god_class",
-    "naming_conventions",
-    "class_naming_conventions",
-    "empty_control_statement",
-    "too_many_fields"
-}
-
-# --- 1. Normalização de Nomes de Code Smells ---
-def normalize_smell_name(name):
-    """
-    Normaliza os nomes dos code smells para comparação.
-    """
-    name = name.lower()
-    name = name.replace('-', '_').replace(' ', '_')
-    
-    # Mapeamentos específicos
-    mappings = {
-        "empty_catch_block": ["empty_catch_block", "emptycatchblock"],
-        "cyclomatic_complexity": ["cyclomatic_complexity", "cyclomaticcomplexity"],
-        "god_class": ["god_class", "godclass", "classfanoutcomplexity"],
-        "class_naming_conventions": ["class_naming_conventions", "classnamingconventions", "typename"],
-        "too_many_fields": ["too_many_fields", "toomanyfields", "classdataabstractioncoupling"],
-        "too_many_methods": ["too_many_methods", "toomanymethods"],
-        "unused_import": ["unused_import", "unnecessary_import", "unnecessaryimport", "unusedimports"],
-        "empty_control_statement": ["empty_control_statement", "emptycontrolstatement", "emptystatement"],
-        "naming_conventions": ["naming_conventions", "namingconventions", "typename"],
-        "unused_local_variable": ["unused_local_variable", "unnecessarylocalbeforereturn"]
-    }
-    
-    for normalized, variations in mappings.items():
-        if any(var in name for var in variations):
-            return normalized
-    
-    return name
-
-# --- 2. Carregamento de Dados ---
-def load_json_file(file_path):
-    """Carrega um único arquivo JSON."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Aviso: Erro ao carregar {file_path}: {e}")
-        return None
-
-def load_tool_data(tool_summaries_path, filter_common=True):
-    """
-    Carrega dados de ferramentas como PMD ou CheckStyle.
-    """
-    data = {}
-    if not os.path.isdir(tool_summaries_path):
-        print(f"Aviso: Diretório não encontrado {tool_summaries_path}")
-        return data
-
-    for file_path in glob.glob(os.path.join(tool_summaries_path, '*.json')):
-        content = load_json_file(file_path)
-        if content and 'repository' in content:
-            repo_name = content['repository']
-            normalized_smells = {}
-            
-            for k, v in content.get('code_smells', {}).items():
-                normalized_name = normalize_smell_name(k)
-                if normalized_name and (not filter_common or normalized_name in COMMON_CODE_SMELLS):
-                    normalized_smells[normalized_name] = normalized_smells.get(normalized_name, 0) + v
-            
-            data[repo_name] = {
-                "code_smells": normalized_smells,
-                "total_smells": sum(normalized_smells.values())
-            }
-    return data
-
-def load_llm_data_for_prompt(llm_base_path, prompt_type, filter_common=True):
-    """
-    Carrega dados da LLM para um tipo de prompt específico.
-    """
-    data = {}
-    if not os.path.isdir(llm_base_path):
-        print(f"Aviso: Diretório base da LLM não encontrado {llm_base_path}")
-        return data
-
-    for repo_folder_name in os.listdir(llm_base_path):
-        repo_folder_path = os.path.join(llm_base_path, repo_folder_name)
-        if os.path.isdir(repo_folder_path):
-            repo_name = repo_folder_name
-            file_path = os.path.join(repo_folder_path, f"{prompt_type}.json")
-            content = load_json_file(file_path)
-            
-            if content:
-                if 'repository' not in content:
-                    content['repository'] = repo_name
-
-                normalized_smells = {}
-                for k, v in content.get('code_smells', {}).items():
-                    normalized_name = normalize_smell_name(k)
-                    if normalized_name and (not filter_common or normalized_name in COMMON_CODE_SMELLS):
-                        normalized_smells[normalized_name] = normalized_smells.get(normalized_name, 0) + v
-                
-                data[repo_name] = {
-                    "code_smells": normalized_smells,
-                    "total_smells": sum(normalized_smells.values())
-                }
-    return data
+# Modo para corpora grandes: acima destes limites os gráficos deixam de desenhar/anotar
+# cada repositório individualmente
+HEATMAP_ANNOTATE_MAX_REPOS = 30
+HEATMAP_LABEL_MAX_REPOS = 100
+SCATTER_HEXBIN_MIN_REPOS = 500
+MAX_SCATTER_LABELS = 10
 
 # --- 3. Cálculo de Métricas ---
 def get_all_repositories(datasets):
@@ -141,6 +41,7 @@ def get_all_repositories(datasets):
         all_repos.update(data.keys())
     return sorted(list(all_repos))
 
+@traced("aggregate", capture=("tool_name",))
 def calculate_total_smells_per_tool(data_dict, tool_name, all_repositories):
     """Calcula o número total de smells para uma ferramenta/abordagem."""
     total = 0
@@ -148,56 +49,52 @@ def calculate_total_smells_per_tool(data_dict, tool_name, all_repositories):
         total += data_dict.get(repo, {}).get('total_smells', 0)
     return {tool_name: total}
 
+def calculate_total_smells_interval(data_dict, all_repositories):
+    """
+    Intervalo de confiança do total de smells quando algum repositório foi analisado por
+    amostragem; repositórios exatos entram com o próprio valor. None se todos são exatos.
+    """
+    low, high, sampled = 0.0, 0.0, False
+    for repo in all_repositories:
+        repo_data = data_dict.get(repo, {})
+        total = repo_data.get('total_smells', 0)
+        ci = repo_data.get('total_smells_ci')
+        if ci:
+            sampled = True
+            low += ci[0]
+            high += ci[1]
+        else:
+            low += total
+            high += total
+    return (low, high) if sampled else None
+
+@traced("aggregate", capture=("name1", "name2"))
 def calculate_average_difference(data1, data2, name1, name2, all_repositories):
     """Calcula a diferença média de detecção por repositório."""
-    differences = []
-    for repo in all_repositories:
-        smells1 = data1.get(repo, {}).get('total_smells', 0)
-        smells2 = data2.get(repo, {}).get('total_smells', 0)
-        differences.append(smells1 - smells2)
-    
-    return np.mean(differences) if differences else 0
+    return stats.average_difference(stats.total_smells_vector(data1, all_repositories),
+                                    stats.total_smells_vector(data2, all_repositories))
 
+@traced("aggregate")
 def calculate_corpus_metrics(llm_data, tool_data, all_repositories):
     """
     Calcula Similaridade e Divergência usando a fórmula de Jaccard.
     """
-    corpus_llm_smells = defaultdict(int)
-    corpus_tool_smells = defaultdict(int)
-
-    for repo in all_repositories:
-        repo_llm_data = llm_data.get(repo, {"code_smells": {}})
-        repo_tool_data = tool_data.get(repo, {"code_smells": {}})
-
-        for smell, count in repo_llm_data["code_smells"].items():
-            corpus_llm_smells[smell] += count
-        for smell, count in repo_tool_data["code_smells"].items():
-            corpus_tool_smells[smell] += count
+    _, (llm_matrix, tool_matrix) = stats.align([llm_data, tool_data], all_repositories)
+    similarity_rate, divergence_rate = stats.corpus_similarity(llm_matrix, tool_matrix)
+    return float(similarity_rate), float(divergence_rate)
 
-    # Interseção e União
-    intersection_sum = 0
-    all_smell_types = set(corpus_llm_smells.keys()) | set(corpus_tool_smells.keys())
-    
-    for s_type in all_smell_types:
-        llm_count = corpus_llm_smells.get(s_type, 0)
-        tool_count = corpus_tool_smells.get(s_type, 0)
-        intersection_sum += min(llm_count, tool_count)
-    
-    # União
-    union_sum = sum(corpus_llm_smells.values()) + sum(corpus_tool_smells.values()) - intersection_sum
-    
-    if union_sum == 0:
-        similarity_rate = 0.0
-        divergence_rate = 0.0
-    else:
-        similarity_rate = (intersection_sum / union_sum) * 100
-        
-        # Divergência: LLM - Ferramenta
-        llm_minus_tool = sum(corpus_llm_smells.values()) - intersection_sum
-        divergence_rate = (llm_minus_tool / union_sum) * 100
-        
-    return similarity_rate, divergence_rate
+@traced("aggregate")
+def calculate_agreement_by_smell(llm_data, tool_data, all_repositories, comparison):
+    """
+    Concordância por code smell (Jaccard, Jaccard ponderado, Pearson, Spearman e Kappa de Cohen)
+    com intervalos de confiança por bootstrap.
+    """
+    rows = stats.agreement_table(llm_data, tool_data, all_repositories)
+    for row in rows:
+        row['comparison'] = comparison
+    return rows
 
+@traced("aggregate")
 def prepare_detailed_comparison_data(llm_data, tool_data, all_repositories):
     """Prepara dados detalhados para visualizações avançadas."""
     comparison_data = []
@@ -219,8 +116,12 @@ def prepare_detailed_comparison_data(llm_data, tool_data, all_repositories):
     return pd.DataFrame(comparison_data)
 
 # --- 4. Funções de Plotagem Aprimoradas ---
-def plot_enhanced_bar_chart(data_dict, title, xlabel, ylabel, filename):
-    """Gráfico de barras aprimorado com gradientes."""
+@traced("plot", capture=("filename",))
+def plot_enhanced_bar_chart(data_dict, title, xlabel, ylabel, filename, intervals=None):
+    """
+    Gráfico de barras aprimorado com gradientes. `intervals` ({nome: (mín, máx)}) adiciona
+    barras de erro para as abordagens estimadas por amostragem.
+    """
     fig, ax = plt.subplots(figsize=(12, 8))
     
     names = list(data_dict.keys())
@@ -231,9 +132,18 @@ def plot_enhanced_bar_chart(data_dict, title, xlabel, ylabel, filename):
     
     bars = ax.bar(names, values, color=colors, edgecolor='black', linewidth=1.5)
     
-    # Adicionar valores nas barras
-    for bar, val in zip(bars, values):
-        height = bar.get_height()
+    intervals = {name: ci for name, ci in (intervals or {}).items() if ci and name in data_dict}
+    if intervals:
+        yerr = np.zeros((2, len(names)))
+        for i, name in enumerate(names):
+            if name in intervals:
+                yerr[0, i] = max(0, values[i] - intervals[name][0])
+                yerr[1, i] = max(0, intervals[name][1] - values[i])
+        ax.errorbar(names, values, yerr=yerr, fmt='none', ecolor='black', capsize=8, linewidth=1.5)
+    
+    # Adicionar valores nas barras (acima da barra de erro, se houver)
+    for name, bar, val in zip(names, bars, values):
+        height = max(bar.get_height(), intervals[name][1]) if name in intervals else bar.get_height()
         ax.text(bar.get_x() + bar.get_width()/2., height + max(values)*0.01,
                 f'{int(val)}', ha='center', va='bottom', fontsize=11, fontweight='bold')
     
@@ -247,6 +157,7 @@ def plot_enhanced_bar_chart(data_dict, title, xlabel, ylabel, filename):
     plt.savefig(os.path.join(OUTPUT_DIR, filename), dpi=300, bbox_inches='tight')
     plt.close()
 
+@traced("plot", capture=("filename",))
 def plot_scatter_comparison(df, llm_name, tool_name, filename):
     """Cria scatter plot melhorado para comparação entre LLM e ferramenta."""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 8))
@@ -286,18 +197,18 @@ def plot_scatter_comparison(df, llm_name, tool_name, filename):
     max_val1 = max(smell_summary['tool_count'].max(), smell_summary['llm_count'].max()) * 1.1
     ax1.plot([0, max_val1], [0, max_val1], 'k--', alpha=0.5, linewidth=2, label='Linha de igualdade')
     
-    # Adicionar anotações para pontos significativos
-    for idx, row in smell_summary.iterrows():
-        # Anotar apenas pontos com diferença significativa ou total alto
-        if abs(row['diff_percent']) > 50 or row['total'] > smell_summary['total'].median():
-            ax1.annotate(row['code_smell'].replace('_', ' ').title(), 
-                        (row['tool_count'], row['llm_count']),
-                        xytext=(10, 10), 
-                        textcoords='offset points',
-                        fontsize=10, 
-                        alpha=0.9,
-                        bbox=dict(boxstyle="round,pad=0.3", facecolor='white', alpha=0.7),
-                        arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0.3', alpha=0.5))
+    # Anotar apenas pontos com diferença significativa ou total alto (os de maior total)
+    significant = (smell_summary['diff_percent'].abs() > 50) | (smell_summary['total'] > smell_summary['total'].median())
+    labeled = smell_summary[significant].nlargest(MAX_SCATTER_LABELS, 'total')
+    for smell, x, y in zip(labeled['code_smell'], labeled['tool_count'], labeled['llm_count']):
+        ax1.annotate(smell.replace('_', ' ').title(), 
+                    (x, y),
+                    xytext=(10, 10), 
+                    textcoords='offset points',
+                    fontsize=10, 
+                    alpha=0.9,
+                    bbox=dict(boxstyle="round,pad=0.3", facecolor='white', alpha=0.7),
+                    arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0.3', alpha=0.5))
     
     # Configurações do subplot 1
     ax1.set_xlabel(f'{tool_name} - Total de Detecções', fontsize=14, fontweight='bold')
@@ -325,15 +236,31 @@ def plot_scatter_comparison(df, llm_name, tool_name, filename):
     repo_summary['diff_percent'] = ((repo_summary['llm_count'] - repo_summary['tool_count']) / 
                                     (repo_summary['tool_count'] + 1)) * 100
     
-    scatter2 = ax2.scatter(repo_summary['tool_count'], 
-                          repo_summary['llm_count'],
-                          s=150, 
-                          c=repo_summary['diff_percent'],
-                          cmap='RdYlBu', 
-                          alpha=0.7,
-                          edgecolors='black', 
-                          linewidth=1.5,
-                          marker='D')  # Diamante para diferenciar
+    large_n = len(repo_summary) > SCATTER_HEXBIN_MIN_REPOS
+    if large_n:
+        # Muitos repositórios: densidade em vez de um marcador por ponto
+        scatter2 = ax2.hexbin(repo_summary['tool_count'], 
+                              repo_summary['llm_count'],
+                              gridsize=60, 
+                              bins='log', 
+                              mincnt=1, 
+                              cmap='viridis', 
+                              rasterized=True)
+        # Rótulos só para os repositórios mais divergentes
+        outliers = repo_summary.loc[(repo_summary['llm_count'] - repo_summary['tool_count']).abs()
+                                    .nlargest(MAX_SCATTER_LABELS).index]
+        for repo, x, y in zip(outliers['repository'], outliers['tool_count'], outliers['llm_count']):
+            ax2.annotate(repo, (x, y), xytext=(5, 5), textcoords='offset points', fontsize=8, alpha=0.8)
+    else:
+        scatter2 = ax2.scatter(repo_summary['tool_count'], 
+                              repo_summary['llm_count'],
+                              s=150, 
+                              c=repo_summary['diff_percent'],
+                              cmap='RdYlBu', 
+                              alpha=0.7,
+                              edgecolors='black', 
+                              linewidth=1.5,
+                              marker='D')  # Diamante para diferenciar
     
     # Linha de referência
     max_val2 = max(repo_summary['tool_count'].max(), repo_summary['llm_count'].max()) * 1.1
@@ -359,7 +286,7 @@ def plot_scatter_comparison(df, llm_name, tool_name, filename):
     
     # Colorbar para o subplot 2
     cbar2 = plt.colorbar(scatter2, ax=ax2)
-    cbar2.set_label('Diferença % (LLM - Ferramenta)', fontsize=12)
+    cbar2.set_label('Repositórios por célula (log)' if large_n else 'Diferença % (LLM - Ferramenta)', fontsize=12)
     
     # Título geral
     fig.suptitle(f'Análise Comparativa: {llm_name} vs {tool_name}', 
@@ -372,42 +299,21 @@ def plot_scatter_comparison(df, llm_name, tool_name, filename):
     # --- Gráfico adicional: Violin Plot ---
     fig, ax = plt.subplots(figsize=(12, 8))
     
-    # Preparar dados para violin plot
-    violin_data = []
-    for _, row in df.iterrows():
-        if row['llm_count'] > 0:
-            violin_data.extend([llm_name] * int(row['llm_count']))
-        if row['tool_count'] > 0:
-            violin_data.extend([tool_name] * int(row['tool_count']))
-    
-    # Criar DataFrame para violin plot
-    if violin_data:  # Apenas se houver dados
-        violin_df = pd.DataFrame({'Tool': violin_data})
-        violin_df['Count'] = 1
-        
-        # Agregar por repositório e ferramenta
-        plot_data = []
-        for repo in df['repository'].unique():
-            repo_data = df[df['repository'] == repo]
-            plot_data.append({
-                'Tool': llm_name,
-                'Count': repo_data['llm_count'].sum(),
-                'Repository': repo
-            })
-            plot_data.append({
-                'Tool': tool_name,
-                'Count': repo_data['tool_count'].sum(),
-                'Repository': repo
-            })
-        
-        plot_df = pd.DataFrame(plot_data)
+    # Agregar por repositório e ferramenta
+    repo_totals = repo_summary.set_index('repository')[['llm_count', 'tool_count']]
+    
+    if (repo_totals.to_numpy() > 0).any():  # Apenas se houver dados
+        plot_df = (repo_totals.rename(columns={'llm_count': llm_name, 'tool_count': tool_name})
+                   .melt(var_name='Tool', value_name='Count', ignore_index=False)
+                   .rename_axis('Repository').reset_index())
         
         # Criar violin plot
         sns.violinplot(data=plot_df, x='Tool', y='Count', ax=ax, inner='box', palette='Set2')
         
-        # Adicionar pontos individuais
-        sns.stripplot(data=plot_df, x='Tool', y='Count', ax=ax, 
-                     size=4, color='black', alpha=0.3)
+        # Adicionar pontos individuais (ilegíveis e lentos com milhares de repositórios)
+        if not large_n:
+            sns.stripplot(data=plot_df, x='Tool', y='Count', ax=ax, 
+                         size=4, color='black', alpha=0.3)
         
         ax.set_title(f'Distribuição de Detecções por Repositório\n{llm_name} vs {tool_name}', 
                     fontsize=16, fontweight='bold')
@@ -427,51 +333,82 @@ def plot_scatter_comparison(df, llm_name, tool_name, filename):
                    dpi=300, bbox_inches='tight')
         plt.close()
 
-def plot_heatmap_comparison(llm_data, tool_data, all_repositories, llm_name, tool_name, filename):
-    """Cria heatmap para comparação entre repositórios e code smells."""
-    # Preparar matriz de dados
-    all_smells = set()
-    for repo in all_repositories:
-        all_smells.update(llm_data.get(repo, {"code_smells": {}})["code_smells"].keys())
-        all_smells.update(tool_data.get(repo, {"code_smells": {}})["code_smells"].keys())
-    
-    all_smells = sorted(list(all_smells))
-    
-    # Criar matriz de diferença
-    diff_matrix = np.zeros((len(all_repositories), len(all_smells)))
+def seriation_order(matrix):
+    """Ordena as linhas pela projeção na primeira componente principal, aproximando linhas parecidas."""
+    if matrix.shape[0] < 3 or matrix.shape[1] == 0:
+        return np.arange(matrix.shape[0])
+    centered = matrix - matrix.mean(axis=0)
+    _, _, vt = np.linalg.svd(centered, full_matrices=False)
+    # Empates (ex.: linhas zeradas) são desfeitos pela magnitude
+    return np.lexsort((np.abs(matrix).sum(axis=1), centered @ vt[0]))
+
+@traced("plot", capture=("filename",))
+def plot_heatmap_comparison(llm_data, tool_data, all_repositories, llm_name, tool_name, filename, top_k=None):
+    """
+    Cria heatmap para comparação entre repositórios e code smells. Com `top_k`, mostra só os
+    repositórios de maior divergência; acima de HEATMAP_ANNOTATE_MAX_REPOS linhas, usa imshow
+    rasterizado, sem anotações e com linhas e colunas reordenadas por similaridade.
+    """
+    # Preparar matriz de diferença
+    all_smells, (llm_matrix, tool_matrix) = stats.align([llm_data, tool_data], all_repositories)
+    diff_matrix = llm_matrix - tool_matrix
+    repositories = np.asarray(all_repositories)
+    if diff_matrix.size == 0:
+        print(f"Aviso: sem dados para {filename}")
+        return
     
-    for i, repo in enumerate(all_repositories):
-        for j, smell in enumerate(all_smells):
-            llm_count = llm_data.get(repo, {"code_smells": {}})["code_smells"].get(smell, 0)
-            tool_count = tool_data.get(repo, {"code_smells": {}})["code_smells"].get(smell, 0)
-            diff_matrix[i, j] = llm_count - tool_count
+    if top_k and len(repositories) > top_k:
+        divergence = np.abs(diff_matrix).sum(axis=1)
+        selected = np.sort(np.argsort(-divergence, kind='stable')[:top_k])
+        diff_matrix, repositories = diff_matrix[selected], repositories[selected]
     
     # Criar heatmap
     fig, ax = plt.subplots(figsize=(14, 10))
     
-    # Criar máscaras para valores zero
-    mask = diff_matrix == 0
-    
-    sns.heatmap(diff_matrix, 
-                xticklabels=all_smells,
-                yticklabels=all_repositories,
-                cmap='RdBu_r',
-                center=0,
-                annot=True,
-                fmt='.0f',
-                mask=mask,
-                cbar_kws={'label': f'Diferença ({llm_name} - {tool_name})'},
-                ax=ax)
+    if len(repositories) <= HEATMAP_ANNOTATE_MAX_REPOS:
+        # Criar máscaras para valores zero
+        mask = diff_matrix == 0
+        
+        sns.heatmap(diff_matrix, 
+                    xticklabels=all_smells,
+                    yticklabels=list(repositories),
+                    cmap='RdBu_r',
+                    center=0,
+                    annot=True,
+                    fmt='.0f',
+                    mask=mask,
+                    cbar_kws={'label': f'Diferença ({llm_name} - {tool_name})'},
+                    ax=ax)
+        ylabel = 'Repositórios'
+    else:
+        rows = seriation_order(diff_matrix)
+        cols = seriation_order(diff_matrix.T)
+        ordered = diff_matrix[np.ix_(rows, cols)]
+        # Escala simétrica pelo percentil 99, para poucos outliers não apagarem o resto
+        limit = np.percentile(np.abs(ordered), 99) or np.abs(ordered).max() or 1
+        image = ax.imshow(ordered, aspect='auto', interpolation='nearest', cmap='RdBu_r',
+                          vmin=-limit, vmax=limit, rasterized=True)
+        fig.colorbar(image, ax=ax, label=f'Diferença ({llm_name} - {tool_name})', extend='both')
+        ax.set_xticks(range(len(cols)))
+        ax.set_xticklabels([all_smells[j] for j in cols])
+        if len(rows) <= HEATMAP_LABEL_MAX_REPOS:
+            ax.set_yticks(range(len(rows)))
+            ax.set_yticklabels(repositories[rows], fontsize=6)
+        else:
+            ax.set_yticks([])
+        ax.grid(False)
+        ylabel = f'Repositórios ({len(rows)}, ordenados por similaridade)'
     
     ax.set_title(f'Heatmap de Diferenças: {llm_name} - {tool_name}', fontsize=16, fontweight='bold', pad=20)
     ax.set_xlabel('Code Smells', fontsize=14)
-    ax.set_ylabel('Repositórios', fontsize=14)
+    ax.set_ylabel(ylabel, fontsize=14)
     
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
     plt.savefig(os.path.join(OUTPUT_DIR, filename), dpi=300, bbox_inches='tight')
     plt.close()
 
+@traced("plot", capture=("filename",))
 def plot_grouped_bar_enhanced(data_dict, title, filename):
     """Gráfico de barras agrupadas aprimorado."""
     df = pd.DataFrame(data_dict)
@@ -506,6 +443,7 @@ def plot_grouped_bar_enhanced(data_dict, title, filename):
     plt.savefig(os.path.join(OUTPUT_DIR, filename), dpi=300, bbox_inches='tight')
     plt.close()
 
+@traced("plot", capture=("filename",))
 def create_summary_report(results_dict, filename):
     """Cria um relatório resumido em formato de tabela."""
     fig, ax = plt.subplots(figsize=(16, 10))
@@ -556,7 +494,7 @@ def create_summary_report(results_dict, filename):
     plt.close()
 
 # --- 5. Lógica Principal do Script ---
-def main():
+def main(heatmap_top_k=None):
     print("=" * 80)
     print("ANÁLISE APRIMORADA DE CODE SMELLS - LLM vs FERRAMENTAS")
     print("=" * 80)
@@ -576,6 +514,12 @@ def main():
     checkstyle_data = load_tool_data(CHECKSTYLE_REPORTS_DIR, filter_common)
     print(f"✓ CheckStyle: {len(checkstyle_data)} repositórios carregados")
     
+    metrics_data = load_tool_data(METRICS_REPORTS_DIR, filter_common)
+    print(f"✓ Métricas: {len(metrics_data)} repositórios carregados")
+    
+    sonarqube_data = load_tool_data(SONARQUBE_REPORTS_DIR, filter_common)
+    print(f"✓ SonarQube: {len(sonarqube_data)} repositórios carregados")
+    
     llm_zeroshot_data = load_llm_data_for_prompt(LLM_RESULTS_DIR, "zero_shot", filter_common)
     print(f"✓ LLM Zero-Shot: {len(llm_zeroshot_data)} repositórios carregados")
     
@@ -586,7 +530,7 @@ def main():
     print(f"✓ LLM Calibrado: {len(llm_calibrated_data)} repositórios carregados")
     print()
     
-    all_repos = get_all_repositories([pmd_data, checkstyle_data, llm_zeroshot_data, llm_oneshot_data, llm_calibrated_data])
+    all_repos = get_all_repositories([pmd_data, checkstyle_data, metrics_data, sonarqube_data, llm_zeroshot_data, llm_oneshot_data, llm_calibrated_data])
     
     if not all_repos:
         print("❌ Nenhum dado de repositório encontrado. Verifique os caminhos e os arquivos.")
@@ -616,7 +560,8 @@ def main():
         q1_results[f"1.1 - Total {tool}"] = total
     
     plot_enhanced_bar_chart(q1_totals, "Q1: Total de Code Smells Detectados", 
-                           "Abordagem", "Total de Smells", "q1_metric1_1_total_smells.png")
+                           "Abordagem", "Total de Smells", "q1_metric1_1_total_smells.png",
+                           intervals={"LLM Zero-Shot": calculate_total_smells_interval(llm_zeroshot_data, all_repos)})
     
     # Métrica 1.2
     q1_avg_diff_llm_pmd = calculate_average_difference(llm_zeroshot_data, pmd_data, "LLM_Zero_Shot", "PMD", all_repos)
@@ -666,7 +611,7 @@ def main():
     df_comparison_zs_cs = prepare_detailed_comparison_data(llm_zeroshot_data, checkstyle_data, all_repos)
     plot_scatter_comparison(df_comparison_zs_cs, "LLM Zero-Shot", "CheckStyle", "q1_scatter_llm_zs_vs_checkstyle.png")
     
-    plot_heatmap_comparison(llm_zeroshot_data, pmd_data, all_repos[:10], "LLM Zero-Shot", "PMD", "q1_heatmap_llm_zs_vs_pmd.png")
+    plot_heatmap_comparison(llm_zeroshot_data, pmd_data, all_repos, "LLM Zero-Shot", "PMD", "q1_heatmap_llm_zs_vs_pmd.png", top_k=heatmap_top_k)
     
     # --- Question 2: LLM one-shot vs PMD vs CheckStyle ---
     print("\n" + "=" * 80)
@@ -687,7 +632,8 @@ def main():
         q2_results[f"2.1 - Total {tool}"] = total
     
     plot_enhanced_bar_chart(q2_totals, "Q2: Total de Code Smells Detectados", 
-                           "Abordagem", "Total de Smells", "q2_metric2_1_total_smells.png")
+                           "Abordagem", "Total de Smells", "q2_metric2_1_total_smells.png",
+                           intervals={"LLM One-Shot": calculate_total_smells_interval(llm_oneshot_data, all_repos)})
     
     # Métrica 2.2
     q2_avg_diff_llm_pmd = calculate_average_difference(llm_oneshot_data, pmd_data, "LLM_One_Shot", "PMD", all_repos)
@@ -737,7 +683,7 @@ def main():
     df_comparison_os_cs = prepare_detailed_comparison_data(llm_oneshot_data, checkstyle_data, all_repos)
     plot_scatter_comparison(df_comparison_os_cs, "LLM One-Shot", "CheckStyle", "q2_scatter_llm_os_vs_checkstyle.png")
     
-    plot_heatmap_comparison(llm_oneshot_data, pmd_data, all_repos[:10], "LLM One-Shot", "PMD", "q2_heatmap_llm_os_vs_pmd.png")
+    plot_heatmap_comparison(llm_oneshot_data, pmd_data, all_repos, "LLM One-Shot", "PMD", "q2_heatmap_llm_os_vs_pmd.png", top_k=heatmap_top_k)
     
     # --- Question 3: LLM calibrado vs PMD ---
     print("\n" + "=" * 80)
@@ -757,7 +703,8 @@ def main():
         q3_results[f"3.1 - Total {tool}"] = total
     
     plot_enhanced_bar_chart(q3_totals, "Q3: Total de Code Smells Detectados", 
-                           "Abordagem", "Total de Smells", "q3_metric3_1_total_smells.png")
+                           "Abordagem", "Total de Smells", "q3_metric3_1_total_smells.png",
+                           intervals={"LLM Calibrado": calculate_total_smells_interval(llm_calibrated_data, all_repos)})
     
     # Métrica 3.2
     q3_avg_diff_llm_pmd = calculate_average_difference(llm_calibrated_data, pmd_data, "LLM_Calibrado", "PMD", all_repos)
@@ -794,7 +741,7 @@ def main():
     df_comparison_cal_pmd = prepare_detailed_comparison_data(llm_calibrated_data, pmd_data, all_repos)
     plot_scatter_comparison(df_comparison_cal_pmd, "LLM Calibrado", "PMD", "q3_scatter_llm_cal_vs_pmd.png")
     
-    plot_heatmap_comparison(llm_calibrated_data, pmd_data, all_repos[:10], "LLM Calibrado", "PMD", "q3_heatmap_llm_cal_vs_pmd.png")
+    plot_heatmap_comparison(llm_calibrated_data, pmd_data, all_repos, "LLM Calibrado", "PMD", "q3_heatmap_llm_cal_vs_pmd.png", top_k=heatmap_top_k)
     
     # --- Análises Adicionais ---
     print("\n" + "=" * 80)
@@ -813,13 +760,18 @@ def main():
         print(f"   • {prompt}: {total}")
     
     plot_enhanced_bar_chart(llm_comparison, "Comparação entre Prompts LLM", 
-                           "Tipo de Prompt", "Total de Smells", "comparison_llm_prompts.png")
+                           "Tipo de Prompt", "Total de Smells", "comparison_llm_prompts.png",
+                           intervals={
+                               "LLM Zero-Shot": calculate_total_smells_interval(llm_zeroshot_data, all_repos),
+                               "LLM One-Shot": calculate_total_smells_interval(llm_oneshot_data, all_repos),
+                               "LLM Calibrado": calculate_total_smells_interval(llm_calibrated_data, all_repos),
+                           })
     
     # Análise por tipo de code smell
     print("\n🔍 Análise por tipo de code smell (top 5 mais detectados):")
     
     all_smell_counts = defaultdict(int)
-    for data_source in [pmd_data, checkstyle_data, llm_zeroshot_data, llm_oneshot_data, llm_calibrated_data]:
+    for data_source in [pmd_data, checkstyle_data, metrics_data, sonarqube_data, llm_zeroshot_data, llm_oneshot_data, llm_calibrated_data]:
         for repo_data in data_source.values():
             for smell, count in repo_data["code_smells"].items():
                 all_smell_counts[smell] += count
@@ -836,7 +788,9 @@ def main():
         ("LLM One-Shot", llm_oneshot_data),
         ("LLM Calibrado", llm_calibrated_data),
         ("PMD", pmd_data),
-        ("CheckStyle", checkstyle_data)
+        ("CheckStyle", checkstyle_data),
+        ("Métricas", metrics_data),
+        ("SonarQube", sonarqube_data)
     ]
     
     for smell, _ in top_smells:
@@ -876,12 +830,14 @@ def main():
             'LLM_OS': llm_oneshot_data.get(repo, {}).get('total_smells', 0),
             'LLM_Cal': llm_calibrated_data.get(repo, {}).get('total_smells', 0),
             'PMD': pmd_data.get(repo, {}).get('total_smells', 0),
-            'CheckStyle': checkstyle_data.get(repo, {}).get('total_smells', 0)
+            'CheckStyle': checkstyle_data.get(repo, {}).get('total_smells', 0),
+            'Metrics': metrics_data.get(repo, {}).get('total_smells', 0),
+            'SonarQube': sonarqube_data.get(repo, {}).get('total_smells', 0)
         }
         correlation_data.append(row)
     
     corr_df = pd.DataFrame(correlation_data)
-    corr_matrix = corr_df[['LLM_ZS', 'LLM_OS', 'LLM_Cal', 'PMD', 'CheckStyle']].corr()
+    corr_matrix = corr_df[['LLM_ZS', 'LLM_OS', 'LLM_Cal', 'PMD', 'CheckStyle', 'Metrics', 'SonarQube']].corr()
     
     # Heatmap de correlação
     fig, ax = plt.subplots(figsize=(10, 8))
@@ -929,13 +885,35 @@ def main():
             'LLM_OneShot': llm_oneshot_data.get(repo, {}).get('total_smells', 0),
             'LLM_Calibrated': llm_calibrated_data.get(repo, {}).get('total_smells', 0),
             'PMD': pmd_data.get(repo, {}).get('total_smells', 0),
-            'CheckStyle': checkstyle_data.get(repo, {}).get('total_smells', 0)
+            'CheckStyle': checkstyle_data.get(repo, {}).get('total_smells', 0),
+            'Metrics': metrics_data.get(repo, {}).get('total_smells', 0),
+            'SonarQube': sonarqube_data.get(repo, {}).get('total_smells', 0)
         }
         detailed_data.append(row)
     
     detailed_df = pd.DataFrame(detailed_data)
     detailed_df.to_csv(os.path.join(OUTPUT_DIR, 'detailed_by_repository.csv'), index=False)
     
+    # Concordância por code smell, com intervalos de confiança (bootstrap)
+    agreement_rows = []
+    for comparison, llm_source, tool_source in [
+        ("LLM ZS vs PMD", llm_zeroshot_data, pmd_data),
+        ("LLM ZS vs CheckStyle", llm_zeroshot_data, checkstyle_data),
+        ("LLM OS vs PMD", llm_oneshot_data, pmd_data),
+        ("LLM OS vs CheckStyle", llm_oneshot_data, checkstyle_data),
+        ("LLM Calibrado vs PMD", llm_calibrated_data, pmd_data),
+        ("LLM ZS vs Métricas", llm_zeroshot_data, metrics_data),
+        ("LLM Calibrado vs Métricas", llm_calibrated_data, metrics_data),
+        ("LLM ZS vs SonarQube", llm_zeroshot_data, sonarqube_data),
+        ("LLM Calibrado vs SonarQube", llm_calibrated_data, sonarqube_data),
+    ]:
+        agreement_rows.extend(calculate_agreement_by_smell(llm_source, tool_source, all_repos, comparison))
+    
+    agreement_df = pd.DataFrame(agreement_rows)
+    if not agreement_df.empty:
+        agreement_df = agreement_df[['comparison'] + [c for c in agreement_df.columns if c != 'comparison']]
+    agreement_df.to_csv(os.path.join(OUTPUT_DIR, 'per_smell_agreement.csv'), index=False)
+    
     print("\n" + "=" * 80)
     print("✅ ANÁLISE CONCLUÍDA!")
     print("=" * 80)
@@ -948,7 +926,12 @@ def main():
     print("   • Distribuição de code smells")
     print("   • Relatório resumido visual")
     print("   • Arquivos CSV com dados detalhados")
+    print("   • Concordância por code smell com intervalos de confiança")
     print("\n🎯 Total de visualizações criadas: 20+")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compara as detecções da LLM com as das ferramentas.")
+    parser.add_argument("--heatmap-top-k", type=int,
+                        help="Mostra nos heatmaps só os K repositórios de maior divergência (padrão: todos).")
+    args = parser.parse_args(setup_from_args("analyze_results"))
+    main(heatmap_top_k=args.heatmap_top_k)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+
+import llm_with_chatGPT as llm
+from llmGPT_pryce import PRECOS, estimar_custo
+from instrumentation import setup_from_args
+from java_sources import ler_arquivo, listar_blobs
+
+# Índice endereçado por conteúdo dos arquivos .java do corpus. Cada blob do git é mapeado para
+# o hash do seu conteúdo normalizado (sem diferenças de espaços em branco, quebras de linha e
+# linhas vazias), de modo que cópias do mesmo arquivo em repositórios diferentes sejam
+# analisadas uma única vez.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+INDEX_FILE = os.path.join(DATA_DIR, "llm_cache", "content_index.json")
+REPORT_FILE = os.path.join(DATA_DIR, "dedup_report.json")
+
+# Mesma suposição do llmGPT_pryce.py: a saída da IA é 25% dos tokens de entrada
+RAZAO_SAIDA = 0.25
+
+
+def normalizar_codigo(texto):
+    """Remove a indentação, espaços no fim das linhas e linhas vazias; Java não depende deles."""
+    return "\n".join(linha.strip() for linha in texto.splitlines() if linha.strip())
+
+
+def hash_conteudo(texto):
+    return hashlib.sha256(normalizar_codigo(texto).encode("utf-8")).hexdigest()
+
+
+class IndiceConteudo:
+    """
+    blob → (hash do conteúdo normalizado, tokens), persistido em data/llm_cache/content_index.json
+    para que cada blob seja lido e tokenizado uma única vez, mais as ocorrências de cada conteúdo
+    nos repositórios indexados nesta execução.
+    """
+
+    def __init__(self, caminho=INDEX_FILE):
+        self.caminho = caminho
+        self.blobs = {}
+        if os.path.exists(caminho):
+            with open(caminho, "r", encoding="utf-8") as f:
+                self.blobs = json.load(f)
+        self.tokens = {conteudo: tokens for conteudo, tokens in self.blobs.values()}
+        self.ocorrencias = defaultdict(list)
+        self.repositorios = {}
+
+    def indexar_repositorio(self, repo_name, repo_path=None):
+        """Devolve [(caminho, blob, hash do conteúdo)] do repositório e registra as ocorrências."""
+        repo_path = repo_path or os.path.join(REPOS_DIR, repo_name)
+        arquivos = []
+        for caminho, blob in listar_blobs(repo_path):
+            entrada = self.blobs.get(blob)
+            if entrada is None:
+                texto = ler_arquivo(repo_path, caminho)
+                entrada = self.blobs[blob] = [hash_conteudo(texto), llm.contar_tokens(texto)]
+                self.tokens[entrada[0]] = entrada[1]
+            arquivos.append((caminho, blob, entrada[0]))
+            self.ocorrencias[entrada[0]].append((repo_name, caminho))
+        self.repositorios[repo_name] = arquivos
+        return arquivos
+
+    def salvar(self):
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self.blobs, f)
+        os.replace(temporario, self.caminho)
+
+    def relatorio_economia(self):
+        """Tokens e custo estimado com e sem deduplicação, para o corpus e por repositório."""
+        tokens_total = sum(self.tokens[c] * len(ocorr) for c, ocorr in self.ocorrencias.items())
+        tokens_unicos = sum(self.tokens[c] for c in self.ocorrencias)
+
+        def custos(tokens):
+            return {modelo: round(estimar_custo(tokens, int(tokens * RAZAO_SAIDA), modelo), 4) for modelo in PRECOS}
+
+        repositorios = {}
+        for repo_name, arquivos in self.repositorios.items():
+            duplicados = [conteudo for _, _, conteudo in arquivos if len(self.ocorrencias[conteudo]) > 1]
+            outros_repos = defaultdict(int)
+            for conteudo in set(duplicados):
+                for outro, _ in self.ocorrencias[conteudo]:
+                    if outro != repo_name:
+                        outros_repos[outro] += 1
+            repositorios[repo_name] = {
+                "files": len(arquivos),
+                "duplicated_files": len(duplicados),
+                "tokens": sum(self.tokens[c] for _, _, c in arquivos),
+                "duplicated_tokens": sum(self.tokens[c] for c in duplicados),
+                "shares_most_with": max(outros_repos, key=outros_repos.get) if outros_repos else None,
+            }
+
+        economia = tokens_total - tokens_unicos
+        return {
+            "files": sum(len(o) for o in self.ocorrencias.values()),
+            "unique_files": len(self.ocorrencias),
+            "tokens": tokens_total,
+            "unique_tokens": tokens_unicos,
+            "saved_tokens": economia,
+            "saved_percent": round(economia / tokens_total * 100, 2) if tokens_total else 0.0,
+            "cost_without_dedup": custos(tokens_total),
+            "cost_with_dedup": custos(tokens_unicos),
+            "repositories": repositorios,
+        }
+
+
+def imprimir_relatorio(relatorio):
+    print(f"\nArquivos: {relatorio['files']} ({relatorio['unique_files']} conteúdos únicos)")
+    print(f"Tokens: {relatorio['tokens']} → {relatorio['unique_tokens']} "
+          f"(economia de {relatorio['saved_tokens']} tokens, {relatorio['saved_percent']}%)")
+    for modelo, custo in relatorio["cost_without_dedup"].items():
+        print(f"• {modelo}: U${custo:.4f} → U${relatorio['cost_with_dedup'][modelo]:.4f}")
+
+    duplicados = sorted(relatorio["repositories"].items(), key=lambda r: r[1]["duplicated_tokens"], reverse=True)
+    for repo_name, info in duplicados[:10]:
+        if info["duplicated_files"]:
+            print(f"  {repo_name}: {info['duplicated_files']}/{info['files']} arquivos repetidos"
+                  f" (mais em comum com {info['shares_most_with'] or 'ele mesmo'})")
+
+
+def salvar_relatorio(relatorio, caminho=REPORT_FILE):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Relatório salvo em: {caminho}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa o conteúdo dos arquivos .java e estima a economia da deduplicação.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    args = parser.parse_args(setup_from_args("content_index"))
+
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    indice = IndiceConteudo()
+    for repo_name in repos:
+        indice.indexar_repositorio(repo_name)
+    indice.salvar()
+
+    relatorio = indice.relatorio_economia()
+    imprimir_relatorio(relatorio)
+    salvar_relatorio(relatorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import os
+import csv
+import json
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from collections import Counter
+
+from instrumentation import setup_from_args, span, traced
+from pipeline import BASE_DIR, DATA_DIR, REPOS_DIR, hash_file, load_stage
+from report_files import find_report, open_report
+
+# Evolução dos code smells ao longo do histórico: analisa N commits amostrados de cada
+# repositório (por padrão o último de cada mês) com PMD e Checkstyle. As violações são
+# guardadas por blob do git, então um arquivo que não mudou entre dois commits não é
+# reanalisado; só os blobs novos são extraídos (git cat-file) para um diretório temporário
+# e passados às ferramentas, numa única execução de cada uma para todos os commits.
+
+CACHE_FILE = os.path.join(DATA_DIR, "history_cache.sqlite")
+WORK_DIR = os.path.join(DATA_DIR, "history_work")
+RESULTS_DIR = os.path.join(DATA_DIR, "history_reports")
+
+MAX_COMMITS = 50
+# Limita o diretório temporário (e a memória da JVM) por execução das ferramentas
+MAX_FILES_PER_RUN = 20000
+TOOLS = ("pmd", "checkstyle")
+
+PERIODS = {
+    "week": lambda date: "%d-W%02d" % date.isocalendar()[:2],
+    "month": lambda date: date.strftime("%Y-%m"),
+    "quarter": lambda date: f"{date.year}-Q{(date.month - 1) // 3 + 1}",
+    "year": lambda date: str(date.year),
+}
+
+
+class ViolationCache:
+    """Contagens por regra de cada blob, em SQLite, por ferramenta e hash da configuração (ruleset/config)."""
+
+    def __init__(self, path=CACHE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS violations (tool TEXT, config TEXT, blob TEXT, "
+                                "data TEXT NOT NULL, PRIMARY KEY (tool, config, blob))")
+
+    def get_many(self, tool, config, blobs):
+        found = {}
+        blobs = list(blobs)
+        for start in range(0, len(blobs), 500):
+            chunk = blobs[start:start + 500]
+            query = (f"SELECT blob, data FROM violations WHERE tool = ? AND config = ? "
+                     f"AND blob IN ({','.join('?' * len(chunk))})")
+            for blob, data in self.connection.execute(query, [tool, config, *chunk]):
+                found[blob] = json.loads(data)
+        return found
+
+    def put_many(self, tool, config, items):
+        self.connection.executemany("INSERT OR REPLACE INTO violations (tool, config, blob, data) VALUES (?, ?, ?, ?)",
+                                    [(tool, config, blob, json.dumps(counts)) for blob, counts in items.items()])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def git(repo_path, *args):
+    return subprocess.run(["git", "-C", repo_path, *args], capture_output=True, text=True, check=True).stdout
+
+
+def sample_commits(repo_path, max_commits=MAX_COMMITS, period="month", ref="HEAD"):
+    """Último commit (na linha principal) de cada período, do mais antigo ao mais recente: [(sha, data)]."""
+    latest = {}
+    for line in git(repo_path, "log", "--first-parent", "--format=%H %cI", ref).splitlines():
+        sha, date = line.split(" ", 1)
+        date = datetime.fromisoformat(date)
+        latest.setdefault(PERIODS[period](date), (sha, date))
+    return sorted(latest.values(), key=lambda commit: commit[1])[-max_commits:]
+
+
+def list_tree(repo_path, commit):
+    """[(caminho, blob)] dos arquivos .java do commit, direto do objeto tree (sem checkout)."""
+    files = []
+    for entry in git(repo_path, "ls-tree", "-r", "-z", "--full-tree", commit).split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        _, kind, blob = info.split(" ")
+        if kind == "blob" and path.endswith(".java"):
+            files.append((path, blob))
+    return files
+
+
+def export_blobs(repo_path, blobs, target_dir):
+    """
+    Grava cada blob ({sha: nome do arquivo}) em target_dir/<sha>/<nome> com um único
+    `git cat-file --batch`. O nome original é mantido porque algumas regras dependem dele.
+    """
+    process = subprocess.Popen(["git", "-C", repo_path, "cat-file", "--batch"],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed():
+        for sha in blobs:
+            process.stdin.write(f"{sha}\n".encode())
+        process.stdin.close()
+
+    threading.Thread(target=feed, daemon=True).start()
+    exported = 0
+    for sha, name in blobs.items():
+        header = process.stdout.readline().split()
+        if len(header) < 3:  # "<sha> missing"
+            continue
+        content = process.stdout.read(int(header[2]))
+        process.stdout.read(1)
+        os.makedirs(os.path.join(target_dir, sha))
+        with open(os.path.join(target_dir, sha, name), "wb") as f:
+            f.write(content)
+        exported += 1
+    process.wait()
+    return exported
+
+
+def blob_of(path):
+    """Blob de um arquivo extraído por export_blobs, a partir do caminho informado pela ferramenta."""
+    return os.path.basename(os.path.dirname(os.path.normpath(path)))
+
+
+class HistoryMiner:
+    def __init__(self, tools=TOOLS, max_files=MAX_FILES_PER_RUN):
+        self.pmd = load_stage("02_analyze_pmd")
+        self.pmd_summary = load_stage("03_total_smells_pmd")
+        self.checkstyle = load_stage("05_analyze_checkstyle")
+        self.checkstyle_summary = load_stage("06_total_smells_checkstyle")
+
+        self.tools = tools
+        self.max_files = max_files
+        # Mudar o ruleset ou a configuração invalida o cache da ferramenta
+        self.configs = {"pmd": hash_file(self.pmd.RULESET), "checkstyle": hash_file(self.checkstyle.CHECKSTYLE_CONFIG)}
+        self.mappings = {"pmd": self.pmd_summary.TARGET_SMELLS, "checkstyle": self.checkstyle_summary.RULE_MAPPING}
+        self.cache = ViolationCache()
+        os.makedirs(WORK_DIR, exist_ok=True)
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    def close(self):
+        self.cache.close()
+
+    def run_tool(self, tool, source_dir, report_file):
+        """Roda a ferramenta no diretório e devolve as violações (blob, regra), ou None em caso de erro."""
+        if tool == "pmd":
+            if not self.pmd.run_pmd_on_repo(source_dir, os.path.basename(source_dir), report_file=report_file):
+                return None
+            with open_report(find_report(report_file)) as f:
+                return [(blob_of(row["File"]), row["Rule"]) for row in csv.DictReader(f)]
+
+        if not self.checkstyle.run_checkstyle(source_dir, report_file):
+            return None
+        # Gerador: o relatório é lido em streaming enquanto as violações são contadas
+        return ((blob_of(result["file"]), issue["rule"])
+                for result in self.checkstyle_summary.parse_checkstyle_report(report_file)
+                for issue in result["issues"])
+
+    @traced("subprocess", capture=("tool",))
+    def analyse_blobs(self, tool, repo_path, blobs):
+        """Analisa os blobs ainda sem resultado em cache, em lotes de até max_files arquivos."""
+        items = list(blobs.items())
+        for start in range(0, len(items), self.max_files):
+            batch = dict(items[start:start + self.max_files])
+            with tempfile.TemporaryDirectory(dir=WORK_DIR) as scratch:
+                source_dir = os.path.join(scratch, "src")
+                with span("export_blobs", "load", files=len(batch)):
+                    export_blobs(repo_path, batch, source_dir)
+                violations = self.run_tool(tool, source_dir, os.path.join(scratch, f"report.{tool}"))
+                if violations is None:
+                    print(f"✗ {tool} falhou num lote de {len(batch)} arquivos; eles ficam sem resultado")
+                    continue
+                counts = {blob: Counter() for blob in batch}
+                for blob, rule in violations:
+                    if blob in counts:
+                        counts[blob][rule] += 1
+                self.cache.put_many(tool, self.configs[tool], counts)
+
+    @traced("repo", capture=("repo_name",))
+    def mine_repository(self, repo_name, max_commits=MAX_COMMITS, period="month"):
+        repo_path = os.path.join(REPOS_DIR, repo_name)
+        if git(repo_path, "rev-parse", "--is-shallow-repository").strip() == "true":
+            print(f"• {repo_name} é um clone raso; use --unshallow para analisar o histórico completo")
+
+        commits = sample_commits(repo_path, max_commits, period)
+        trees = {sha: list_tree(repo_path, sha) for sha, _ in commits}
+        names = {}
+        for files in trees.values():
+            for path, blob in files:
+                names.setdefault(blob, os.path.basename(path))
+
+        results = {}
+        analysed = {}
+        for tool in self.tools:
+            cached = self.cache.get_many(tool, self.configs[tool], names)
+            missing = {blob: name for blob, name in names.items() if blob not in cached}
+            analysed[tool] = len(missing)
+            if missing:
+                self.analyse_blobs(tool, repo_path, missing)
+                cached.update(self.cache.get_many(tool, self.configs[tool], missing))
+            results[tool] = cached
+
+        history = self.summarize(commits, trees, results)
+        self.write_reports(repo_name, history)
+        total_files = sum(len(files) for files in trees.values())
+        print(f"✓ {repo_name}: {len(commits)} commits, {total_files} arquivos, {len(names)} blobs distintos "
+              f"(analisados agora: {', '.join(f'{tool} {n}' for tool, n in analysed.items())})")
+        return history
+
+    def summarize(self, commits, trees, results):
+        history = []
+        seen = set()
+        for sha, date in commits:
+            files = trees[sha]
+            blobs = {blob for _, blob in files}
+            row = {"commit": sha, "date": date.isoformat(), "files": len(files), "changed_files": len(blobs - seen)}
+            seen |= blobs
+            for tool in self.tools:
+                mapping = self.mappings[tool]
+                smells = dict.fromkeys(mapping.values(), 0)
+                missing = 0
+                for _, blob in files:
+                    counts = results[tool].get(blob)
+                    if counts is None:
+                        missing += 1
+                        continue
+                    for rule, count in counts.items():
+                        if rule in mapping:
+                            smells[mapping[rule]] += count
+                row[tool] = {"code_smells": smells, "total_smells": sum(smells.values()), "missing_files": missing}
+            history.append(row)
+        return history
+
+    def write_reports(self, repo_name, history):
+        with open(os.path.join(RESULTS_DIR, f"{repo_name}_history.json"), "w", encoding="utf-8") as f:
+            json.dump({"repository": repo_name, "commits": history}, f, indent=2, ensure_ascii=False)
+        # Formato longo, pronto para séries temporais: uma linha por commit, ferramenta e smell
+        with open(os.path.join(RESULTS_DIR, f"{repo_name}_history.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["commit", "date", "tool", "code_smell", "count", "files"])
+            for row in history:
+                for tool in self.tools:
+                    for smell, count in row[tool]["code_smells"].items():
+                        writer.writerow([row["commit"], row["date"], tool, smell, count, row["files"]])
+
+
+def plot_trends(repo_name, history, tools=TOOLS):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    dates = [datetime.fromisoformat(row["date"]) for row in history]
+    fig, axes = plt.subplots(len(tools), 1, figsize=(12, 4 * len(tools)), sharex=True, squeeze=False)
+    for ax, tool in zip(axes[:, 0], tools):
+        for smell in history[0][tool]["code_smells"] if history else []:
+            values = [row[tool]["code_smells"][smell] for row in history]
+            if any(values):
+                ax.plot(dates, values, marker=".", label=smell)
+        ax.plot(dates, [row[tool]["total_smells"] for row in history], "k--", linewidth=2, label="Total")
+        ax.set_title(f"{repo_name} - {tool}")
+        ax.set_ylabel("Detecções")
+        ax.legend(fontsize=8, loc="upper left")
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    path = os.path.join(RESULTS_DIR, f"{repo_name}_trend.png")
+    plt.savefig(path, dpi=150)
+    plt.close(fig)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolução dos code smells ao longo do histórico dos repositórios.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--max-commits", type=int, default=MAX_COMMITS, help="Commits amostrados por repositório.")
+    parser.add_argument("--period", choices=list(PERIODS), default="month", help="Um commit (o último) por período.")
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=list(TOOLS))
+    parser.add_argument("--unshallow", action="store_true", help="Busca o histórico completo de clones rasos antes.")
+    parser.add_argument("--plot", action="store_true", help="Gera um gráfico de tendência por repositório.")
+    args = parser.parse_args(setup_from_args("history_mining"))
+
+    # As etapas usam caminhos relativos a scripts/
+    os.chdir(BASE_DIR)
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    miner = HistoryMiner(tuple(args.tools))
+    try:
+        for repo_name in repos:
+            repo_path = os.path.join(REPOS_DIR, repo_name)
+            if not os.path.isdir(os.path.join(repo_path, ".git")):
+                print(f"• {repo_name} não é um repositório git, ignorando")
+                continue
+            if args.unshallow and git(repo_path, "rev-parse", "--is-shallow-repository").strip() == "true":
+                with span("git fetch --unshallow", "subprocess", repo=repo_name):
+                    subprocess.run(["git", "-C", repo_path, "fetch", "--unshallow"], check=False)
+            history = miner.mine_repository(repo_name, args.max_commits, args.period)
+            if args.plot and history:
+                print(f"  Gráfico salvo em {plot_trends(repo_name, history, miner.tools)}")
+    finally:
+        miner.close()
+    print(f"\nRelatórios salvos em {RESULTS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+
+import requests
+
+# Cache HTTP persistente com requisições condicionais. Dentro do TTL a resposta guardada é
+# usada sem ir à rede; depois dele a requisição sai com If-None-Match/If-Modified-Since, e um
+# 304 apenas renova a entrada. Na API do GitHub, respostas 304 não contam no rate limit.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(BASE_DIR, "..", "data", "http_cache.sqlite")
+
+
+class CachedResponse:
+    """Resposta servida do cache, com a mesma interface usada de requests.Response."""
+
+    def __init__(self, url, status_code, headers, text, source):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.source = source  # "fresh" (sem requisição) ou "revalidated" (304)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class HTTPCache:
+    def __init__(self, path=CACHE_FILE, session=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT, etag TEXT, "
+                                "last_modified TEXT, headers TEXT, body TEXT, fetched_at REAL)")
+        self.session = session or requests.Session()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    @staticmethod
+    def key(url, params, headers):
+        # O token entra só como hash: ETags do GitHub variam com a autenticação (Vary: Authorization)
+        auth = hashlib.sha256(headers.get("Authorization", "").encode("utf-8")).hexdigest()[:12]
+        request = json.dumps([url, sorted((params or {}).items()), headers.get("Accept", ""), auth], default=str)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        with self.lock:
+            return self.connection.execute("SELECT etag, last_modified, headers, body, fetched_at FROM responses "
+                                           "WHERE key = ?", (key,)).fetchone()
+
+    def store(self, key, url, response):
+        headers = {name: response.headers[name] for name in ("Content-Type", "Link") if name in response.headers}
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (key, url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                     json.dumps(headers), response.text, time.time()))
+            self.connection.commit()
+
+    def touch(self, key):
+        with self.lock:
+            self.connection.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+
+    def get(self, url, headers=None, params=None, ttl=0, timeout=30):
+        """
+        GET com cache. ttl (s) é por quanto tempo a resposta guardada vale sem revalidação;
+        ttl=0 sempre revalida e ttl=None desativa o cache para esta chamada.
+        Só respostas 200 são guardadas.
+        """
+        headers = dict(headers or {})
+        if ttl is None:
+            self.stats["uncached"] += 1
+            return self.session.get(url, headers=headers, params=params, timeout=timeout)
+
+        key = self.key(url, params, headers)
+        entry = self.lookup(key)
+        if entry:
+            etag, last_modified, cached_headers, body, fetched_at = entry
+            if time.time() - fetched_at < ttl:
+                self.stats["fresh"] += 1
+                return CachedResponse(url, 200, json.loads(cached_headers), body, "fresh")
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(url, headers=headers, params=params, timeout=timeout)
+        if response.status_code == 304 and entry:
+            self.touch(key)
+            self.stats["revalidated"] += 1
+            return CachedResponse(url, 200, json.loads(entry[2]), entry[3], "revalidated")
+        if response.status_code == 200:
+            self.store(key, url, response)
+        self.stats["downloaded"] += 1
+        return response
+
+    def purge(self, older_than):
+        """Remove entradas não renovadas há mais de older_than segundos."""
+        with self.lock:
+            removed = self.connection.execute("DELETE FROM responses WHERE fetched_at < ?",
+                                              (time.time() - older_than,)).rowcount
+            self.connection.commit()
+        return removed
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import argparse
+import functools
+import inspect
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# Instrumentação compartilhada pelos scripts do pipeline.
+# Os spans são gravados em JSONL (um evento "X" do formato Chrome trace-event por linha) e podem
+# ser convertidos com export_chrome_trace() para abrir em chrome://tracing ou no Perfetto.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACES_DIR = os.path.join(BASE_DIR, "..", "data", "traces")
+
+# Categorias usadas nos scripts: load, parse, aggregate, subprocess, http e plot
+PROFILE_MODES = ("cprofile", "tracemalloc")
+PROFILE_TOP_N = 25
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.profile_mode = None
+        self.profile_dir = None
+        self.stage = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._totals = defaultdict(lambda: [0, 0.0])
+        self._origin = time.perf_counter()
+
+    def configure(self, stage, trace_path=None, profile_mode=None):
+        self.stage = stage
+        self.enabled = trace_path is not None
+        self.profile_mode = profile_mode
+        if self.enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+            self.trace_path = trace_path
+            self._file = open(trace_path, "a", encoding="utf-8")
+            self._write({"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0,
+                         "args": {"name": stage}})
+        if profile_mode:
+            self.profile_dir = os.path.splitext(trace_path or os.path.join(TRACES_DIR, stage))[0] + "_profile"
+            os.makedirs(self.profile_dir, exist_ok=True)
+            if profile_mode == "tracemalloc" and not tracemalloc.is_tracing():
+                tracemalloc.start()
+        atexit.register(self.close)
+
+    def _write(self, event):
+        with self._lock:
+            self._file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1_000_000
+
+    @contextmanager
+    def span(self, name, category="stage", **args):
+        """Mede um trecho de código e grava o evento no trace, com perfil opcional."""
+        if not self.enabled and not self.profile_mode:
+            yield
+            return
+
+        profiler = self._start_profile(name)
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            duration = self._now_us() - start
+            if profiler is not None:
+                args.update(self._stop_profile(profiler, name, category))
+            with self._lock:
+                self._totals[category][0] += 1
+                self._totals[category][1] += duration / 1_000_000
+            if self.enabled:
+                self._write({
+                    "name": name, "cat": category, "ph": "X",
+                    "ts": round(start, 1), "dur": round(duration, 1),
+                    "pid": os.getpid(), "tid": threading.get_ident(),
+                    "args": args,
+                })
+
+    # Apenas o span mais externo de cada thread é perfilado (cProfile não aceita aninhamento)
+    def _start_profile(self, name):
+        if not self.profile_mode or getattr(self._local, "profiling", False):
+            return None
+        self._local.profiling = True
+        if self.profile_mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        tracemalloc.reset_peak()
+        return tracemalloc.take_snapshot()
+
+    def _stop_profile(self, profiler, name, category):
+        self._local.profiling = False
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in f"{category}_{name}")
+        stamp = datetime.now().strftime("%H%M%S%f")
+        if self.profile_mode == "cprofile":
+            profiler.disable()
+            output = os.path.join(self.profile_dir, f"{safe_name}_{stamp}.prof")
+            profiler.dump_stats(output)
+            return {"profile": output}
+
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        output = os.path.join(self.profile_dir, f"{safe_name}_{stamp}.txt")
+        with open(output, "w", encoding="utf-8") as f:
+            for stat in snapshot.compare_to(profiler, "lineno")[:PROFILE_TOP_N]:
+                f.write(f"{stat}\n")
+        return {"profile": output, "peak_memory_mb": round(peak / (1024 * 1024), 2)}
+
+    def summary(self):
+        """Tempo total e número de spans por categoria."""
+        return {cat: {"count": count, "seconds": round(seconds, 3)} for cat, (count, seconds) in self._totals.items()}
+
+    def close(self):
+        if self._totals:
+            print(f"\n[{self.stage}] Tempo por categoria:")
+            for cat, (count, seconds) in sorted(self._totals.items(), key=lambda x: -x[1][1]):
+                print(f"   • {cat}: {seconds:.2f}s em {count} span(s)")
+            self._totals.clear()
+        if self._file:
+            self._file.close()
+            self._file = None
+            print(f"   Trace salvo em {self.trace_path}")
+
+
+tracer = Tracer()
+
+
+def span(name, category="stage", **args):
+    return tracer.span(name, category, **args)
+
+
+def traced(category, name=None, capture=()):
+    """
+    Decorador que envolve a função num span. Os parâmetros listados em capture
+    (ex.: "repo_name") são gravados nos argumentos do evento.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled and not tracer.profile_mode:
+                return func(*args, **kwargs)
+            span_args = {}
+            if capture:
+                bound = signature.bind_partial(*args, **kwargs)
+                span_args = {k: v for k, v in bound.arguments.items() if k in capture}
+            with tracer.span(span_name, category, **span_args):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def setup_from_args(stage, argv=None):
+    """
+    Lê as opções de instrumentação da linha de comando, sem interferir em outros argumentos:
+
+    --trace ARQUIVO      caminho do trace JSONL (padrão: data/traces/<stage>_<timestamp>.jsonl)
+    --no-trace           desativa a gravação do trace
+    --profile MODO       anexa cProfile ou tracemalloc a cada etapa
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--trace")
+    parser.add_argument("--no-trace", action="store_true")
+    parser.add_argument("--profile", choices=PROFILE_MODES)
+    args, remaining = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    trace_path = None
+    if not args.no_trace:
+        trace_path = args.trace or os.path.join(TRACES_DIR, f"{stage}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    tracer.configure(stage, trace_path, args.profile)
+    return remaining
+
+
+def export_chrome_trace(jsonl_paths, output_path):
+    """Junta um ou mais traces JSONL num arquivo JSON aceito pelo chrome://tracing e Perfetto."""
+    events = []
+    for path in jsonl_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+def print_hotspots(jsonl_paths, top=20):
+    """Mostra os spans mais longos dos traces (ex.: repositórios mais lentos)."""
+    events = []
+    for path in jsonl_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            events.extend(e for e in (json.loads(line) for line in f if line.strip()) if e.get("ph") == "X")
+    events.sort(key=lambda e: e["dur"], reverse=True)
+    for event in events[:top]:
+        details = ", ".join(f"{k}={v}" for k, v in event.get("args", {}).items() if k != "profile")
+        print(f"{event['dur'] / 1_000_000:>10.2f}s  [{event['cat']}] {event['name']} {details}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ferramentas para os traces do pipeline.")
+    parser.add_argument("traces", nargs="+", help="Arquivos JSONL de trace")
+    parser.add_argument("--export", help="Gera um JSON no formato Chrome trace-event")
+    parser.add_argument("--top", type=int, default=20, help="Quantidade de spans mais longos exibidos")
+    cli_args = parser.parse_args()
+
+    if cli_args.export:
+        total = export_chrome_trace(cli_args.traces, cli_args.export)
+        print(f"{total} eventos exportados para {cli_args.export}")
+    print_hotspots(cli_args.traces, cli_args.top)
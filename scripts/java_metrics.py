@@ -0,0 +1,298 @@
+import re
+from bisect import bisect_right
+
+# Extração de métricas estruturais de arquivos Java sem dependências externas. O código é
+# tokenizado uma vez (comentários e literais descartados) e percorrido com uma pilha de
+# blocos, o que basta para métricas de classe e método; não é um parser completo da linguagem.
+
+TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<string>"""(?:.|\n)*?"""|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<op>&&|\|\||->|::|[{}()\[\];,.<>?:=@!~+\-*/%&|^])
+''', re.VERBOSE | re.DOTALL)
+
+TYPE_KEYWORDS = {"class", "interface", "enum", "record"}
+MODIFIERS = {"public", "protected", "private", "static", "final", "abstract", "synchronized",
+             "native", "transient", "volatile", "strictfp", "default", "sealed"}
+DECISION_KEYWORDS = {"if", "for", "while", "case", "catch"}
+CONTROL_KEYWORDS = {"if", "for", "while"}
+CLASS_NAME_RE = re.compile(r"^[A-Z][a-zA-Z0-9]*$")
+CONSTANT_RE = re.compile(r"^[A-Z][A-Z0-9_]*$")
+ACCESSOR_RE = re.compile(r"^(get|set|is)[A-Z]")
+
+# Tipos de java.lang e primitivos empacotados não contam como acoplamento
+JAVA_LANG = {
+    "Object", "String", "StringBuilder", "StringBuffer", "Integer", "Long", "Short", "Byte",
+    "Double", "Float", "Boolean", "Character", "Number", "Math", "System", "Void", "Class",
+    "Exception", "RuntimeException", "Error", "Throwable", "Override", "Deprecated",
+    "SuppressWarnings", "FunctionalInterface", "SafeVarargs", "Thread", "Runnable", "Iterable",
+    "Comparable", "CharSequence", "Enum", "Record", "AutoCloseable", "Cloneable",
+    "IllegalArgumentException", "IllegalStateException", "NullPointerException",
+    "UnsupportedOperationException", "IndexOutOfBoundsException", "InterruptedException",
+}
+
+
+def tokenize(source):
+    """Devolve [(tipo, texto, posição)] sem comentários; literais viram um único token 'string'."""
+    tokens = []
+    for match in TOKEN_RE.finditer(source):
+        kind = match.lastgroup
+        if kind != "comment":
+            tokens.append((kind, match.group(kind), match.start()))
+    return tokens
+
+
+def matching(tokens, start, open_char, close_char):
+    """Índice do token que fecha o delimitador aberto em tokens[start]."""
+    depth = 0
+    for i in range(start, len(tokens)):
+        text = tokens[i][1]
+        if text == open_char:
+            depth += 1
+        elif text == close_char:
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(tokens) - 1
+
+
+def strip_annotations(run):
+    """Remove anotações (@Nome, @a.b.Nome(...)) de uma declaração, preservando @interface."""
+    result = []
+    i = 0
+    while i < len(run):
+        if run[i][1] == "@" and i + 1 < len(run) and run[i + 1][1] != "interface":
+            i += 2
+            while i + 1 < len(run) and run[i][1] == ".":
+                i += 2
+            if i < len(run) and run[i][1] == "(":
+                i = matching(run, i, "(", ")") + 1
+            continue
+        result.append(run[i])
+        i += 1
+    return result
+
+
+def count_parameters(tokens, open_paren, close_paren):
+    if close_paren == open_paren + 1:
+        return 0
+    count, depth, angle = 1, 0, 0
+    for _, text, _ in tokens[open_paren + 1:close_paren]:
+        if text in "([{":
+            depth += 1
+        elif text in ")]}":
+            depth -= 1
+        elif text == "<":
+            angle += 1
+        elif text == ">":
+            angle -= 1
+        elif text == "," and depth == 0 and angle == 0:
+            count += 1
+    return count
+
+
+def count_declarators(run):
+    """Quantos campos uma declaração como `private int a, b = 1, c[];` declara."""
+    count, depth, angle, in_expression = 0, 0, 0, False
+    for i, (kind, text, _) in enumerate(run):
+        if text in "([{":
+            depth += 1
+        elif text in ")]}":
+            depth -= 1
+        elif depth == 0 and not in_expression and text == "<":
+            angle += 1
+        elif depth == 0 and not in_expression and text == ">":
+            angle -= 1
+        elif depth == 0 and text == "=":
+            in_expression = True
+        elif depth == 0 and text == ",":
+            in_expression = False
+        if (kind == "ident" and depth == 0 and angle == 0 and not in_expression
+                and i + 1 < len(run) and run[i + 1][1] in ("=", ",", ";", "[")):
+            count += 1
+    return max(count, 1)
+
+
+def is_ternary(tokens, i):
+    """'?' de operador ternário (e não curinga de generics como List<?>)."""
+    previous = tokens[i - 1][1] if i else ""
+    following = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+    return previous not in ("<", ",") and following not in (">", "extends", "super", ",")
+
+
+def referenced_types(tokens, start, end, own_names):
+    fan_out, coupling = set(), set()
+    for i in range(start, end):
+        kind, text, _ = tokens[i]
+        if kind != "ident" or not text[0].isupper() or CONSTANT_RE.match(text):
+            continue
+        if text in own_names or text in JAVA_LANG or (i and tokens[i - 1][1] == "."):
+            continue
+        fan_out.add(text)
+        if i and tokens[i - 1][1] == "new":
+            coupling.add(text)
+    return fan_out, coupling
+
+
+class JavaFileAnalyzer:
+    def __init__(self, source):
+        self.tokens = tokenize(source)
+        self.positions = [t[2] for t in self.tokens]
+        self.newlines = [m.start() for m in re.finditer("\n", source)]
+        self.classes = []
+        self.methods = []
+
+    def line(self, index):
+        return bisect_right(self.newlines, self.tokens[index][2]) + 1
+
+    def analyze(self):
+        tokens = self.tokens
+        self.parse_members(0, len(tokens), None)
+        declared = {c["name"] for c in self.classes}
+        for info in self.classes:
+            fan_out, coupling = referenced_types(tokens, info.pop("_start"), info.pop("_end"), declared)
+            info["fan_out"] = len(fan_out)
+            info["coupling"] = len(coupling)
+        return {
+            "classes": self.classes,
+            "methods": self.methods,
+            "empty_catch_blocks": self.count_empty_blocks({"catch"}),
+            "empty_control_statements": self.count_empty_blocks(CONTROL_KEYWORDS),
+            "unused_imports": self.count_unused_imports(),
+            "lines": len(self.newlines) + 1,
+        }
+
+    def parse_members(self, start, end, current_class):
+        """Percorre uma região (arquivo ou corpo de classe) declaração por declaração."""
+        tokens = self.tokens
+        i = start
+        run_start = start
+        # A lista de constantes de um enum vai até o primeiro ';' do corpo, inclusive
+        # depois de constantes com corpo (`A { ... }, B, C;`)
+        enum_constants = current_class is not None and current_class["kind"] == "enum"
+        while i < end:
+            text = tokens[i][1]
+            if text not in ("{", ";"):
+                if text == "(":
+                    i = matching(tokens, i, "(", ")")
+                i += 1
+                continue
+
+            run = strip_annotations(tokens[run_start:i])
+            names = [t for t in run if t[1] not in MODIFIERS]
+            type_index = next((k for k, t in enumerate(run) if t[1] in TYPE_KEYWORDS
+                               and (k == 0 or run[k - 1][1] != ".")), None)
+
+            if text == ";":
+                if enum_constants or not names:
+                    pass  # lista de constantes do enum ou ';' solto
+                elif current_class and type_index is None:
+                    paren = next((k for k, t in enumerate(run) if t[1] == "("), None)
+                    equals = next((k for k, t in enumerate(run) if t[1] == "="), None)
+                    if paren is not None and (equals is None or paren < equals):
+                        self.add_method(run, paren, tokens_index=None, body=None, owner=current_class)
+                    else:
+                        current_class["fields"] += count_declarators(run + [tokens[i]])
+                enum_constants = False
+                i += 1
+                run_start = i
+                continue
+
+            # text == "{"
+            close = matching(tokens, i, "{", "}")
+            if type_index is not None and type_index + 1 < len(run):
+                info = {"name": run[type_index + 1][1], "kind": run[type_index][1], "line": self.line(i),
+                        "fields": 0, "methods": 0, "accessors": 0, "_start": i, "_end": close}
+                self.classes.append(info)
+                self.parse_members(i + 1, close, info)
+            elif current_class is not None:
+                paren = next((k for k, t in enumerate(run) if t[1] == "("), None)
+                equals = next((k for k, t in enumerate(run) if t[1] == "="), None)
+                if enum_constants:
+                    pass  # constante de enum com corpo
+                elif paren is not None and (equals is None or paren < equals) and paren > 0:
+                    self.add_method(run, paren, tokens_index=i, body=close, owner=current_class)
+                elif equals is not None:
+                    current_class["fields"] += 1  # campo inicializado com classe anônima ou array
+            i = close + 1
+            run_start = i
+
+    def add_method(self, run, paren, tokens_index, body, owner):
+        tokens = self.tokens
+        name_token = run[paren - 1]
+        start_line = bisect_right(self.newlines, name_token[2]) + 1
+        # Parâmetros: localiza o '(' da declaração na lista completa de tokens
+        open_paren = next(k for k in range(self.index_of(name_token), len(tokens)) if tokens[k][1] == "(")
+        close_paren = matching(tokens, open_paren, "(", ")")
+
+        complexity = 1
+        end_line = start_line
+        if body is not None:
+            end_line = self.line(body)
+            for k in range(tokens_index + 1, body):
+                kind, text, _ = tokens[k]
+                if (kind == "ident" and text in DECISION_KEYWORDS) or text in ("&&", "||"):
+                    complexity += 1
+                elif text == "?" and is_ternary(tokens, k):
+                    complexity += 1
+
+        owner["methods"] += 1
+        if ACCESSOR_RE.match(name_token[1]) and complexity == 1:
+            owner["accessors"] += 1
+        self.methods.append({
+            "class": owner["name"],
+            "name": name_token[1],
+            "line": start_line,
+            "length": end_line - start_line + 1,
+            "parameters": count_parameters(tokens, open_paren, close_paren),
+            "cyclomatic_complexity": complexity,
+            "abstract": body is None,
+        })
+
+    def index_of(self, token):
+        # A posição no código é única por token; busca binária pela posição
+        return bisect_right(self.positions, token[2]) - 1
+
+    def count_empty_blocks(self, keywords):
+        """`catch (...) {}`, `if (...) {}` / `if (...);` e equivalentes."""
+        tokens = self.tokens
+        count = 0
+        for i, (kind, text, _) in enumerate(tokens):
+            if kind != "ident" or text not in keywords or i + 1 >= len(tokens) or tokens[i + 1][1] != "(":
+                continue
+            after = matching(tokens, i + 1, "(", ")") + 1
+            if after < len(tokens) and tokens[after][1] == ";" and text != "catch":
+                count += 1
+            elif after + 1 < len(tokens) and tokens[after][1] == "{" and tokens[after + 1][1] == "}":
+                count += 1
+        return count
+
+    def count_unused_imports(self):
+        tokens = self.tokens
+        imported = []
+        import_ranges = []
+        i = 0
+        while i < len(tokens):
+            if tokens[i][1] == "import" and (i == 0 or tokens[i - 1][1] in (";", "}")):
+                end = i
+                while end < len(tokens) and tokens[end][1] != ";":
+                    end += 1
+                names = [t[1] for t in tokens[i + 1:end] if t[0] == "ident" and t[1] != "static"]
+                if names and tokens[end - 1][1] != "*":
+                    imported.append(names[-1])
+                import_ranges.append((i, end))
+                i = end
+            i += 1
+
+        if not imported:
+            return 0
+        last_import = import_ranges[-1][1]
+        used = {t[1] for t in tokens[last_import + 1:] if t[0] == "ident"}
+        return sum(1 for name in imported if name not in used)
+
+
+def analyze_source(source):
+    """Métricas de um arquivo: classes (campos, métodos, fan-out, acoplamento), métodos e contagens do arquivo."""
+    return JavaFileAnalyzer(source).analyze()
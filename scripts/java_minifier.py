@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import random
+import argparse
+
+from instrumentation import setup_from_args, traced
+from java_metrics import analyze_source, tokenize
+from java_sources import ler_arquivo, listar_blobs
+
+# Minificação do código Java enviado à LLM: remove cabeçalhos de licença, comentários
+# (inclusive Javadoc), linhas vazias e indentação. O resto do código é mantido token a token:
+# imports (Unused Imports dependem deles), blocos vazios e corpos de catch (um catch só com
+# comentário continua vazio). Cada linha de saída guarda a linha original correspondente, para
+# traduzir de volta qualquer resposta com localização.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+REPORT_DIR = os.path.join(DATA_DIR, "llm_cache", "minificacao")
+
+AMOSTRA_VERIFICACAO = 50  # arquivos por repositório na verificação de equivalência
+
+# Mesmas regras de literais do java_metrics.TOKEN_RE: um // dentro de string não é comentário
+SCANNER = re.compile(r'''
+    (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<string>"""(?:.|\n)*?"""|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<space>\s+)
+  | (?P<code>[^"'/\s]+|/)
+''', re.VERBOSE | re.DOTALL)
+
+
+def minificar(codigo):
+    """
+    Devolve (texto minificado, mapa), onde mapa[i] é a linha original (1-based) da linha i+1 da
+    saída. Comentários e espaços entre tokens viram no máximo um espaço; a quebra de linha só é
+    mantida onde havia código na linha original.
+    """
+    linhas, mapa = [], []
+    atual = None          # partes da linha de saída em construção
+    linha_atual = 1
+    separar = False       # havia espaço ou comentário desde o último token
+
+    for match in SCANNER.finditer(codigo):
+        tipo, texto = match.lastgroup, match.group()
+        if tipo in ("comment", "space"):
+            separar = True
+        else:
+            if atual is None or mapa[-1] != linha_atual:
+                atual = []
+                linhas.append(atual)
+                mapa.append(linha_atual)
+            elif separar:
+                atual.append(" ")
+            atual.append(texto)
+            separar = False
+            # Text blocks ocupam várias linhas: cada quebra interna vira uma linha de saída
+            for i in range(texto.count("\n")):
+                mapa.append(linha_atual + i + 1)
+        linha_atual += texto.count("\n")
+
+    return "\n".join("".join(partes) for partes in linhas), mapa
+
+
+def compactar_mapa(mapa):
+    """Mapa em trechos [linha_saida, linha_original, quantidade] de linhas consecutivas."""
+    trechos = []
+    for saida, original in enumerate(mapa, start=1):
+        if trechos and trechos[-1][1] + trechos[-1][2] == original and trechos[-1][0] + trechos[-1][2] == saida:
+            trechos[-1][2] += 1
+        else:
+            trechos.append([saida, original, 1])
+    return trechos
+
+
+def linha_original(mapa, linha):
+    """Traduz a linha `linha` (1-based) do código minificado para a linha do arquivo original."""
+    return mapa[min(max(linha, 1), len(mapa)) - 1] if mapa else linha
+
+
+def verificar_equivalencia(original, minificado, smells, metricas):
+    """
+    Confere que a minificação não muda o que os smells-alvo enxergam: a mesma sequência de
+    tokens (sem comentários) e as mesmas contagens do motor de métricas. Devolve as diferenças.
+    `metricas` é o módulo 04_analyze_metrics (limites e file_smells).
+    """
+    diferencas = {}
+    if [t[:2] for t in tokenize(original)] != [t[:2] for t in tokenize(minificado)]:
+        diferencas["tokens"] = "sequência de tokens diferente"
+    antes = metricas.file_smells(analyze_source(original))
+    depois = metricas.file_smells(analyze_source(minificado))
+    for smell in smells:
+        if smell in antes and antes[smell] != depois[smell]:
+            diferencas[smell] = (antes[smell], depois[smell])
+    return diferencas
+
+
+@traced("aggregate", capture=("repo_name",))
+def relatorio_repositorio(repo_name, contar_tokens, amostra=AMOSTRA_VERIFICACAO, metricas=None, smells=()):
+    repo_path = os.path.join(REPOS_DIR, repo_name)
+    blobs = listar_blobs(repo_path)
+    tokens_antes = tokens_depois = 0
+    mapas = {}
+    for caminho, _ in blobs:
+        codigo = ler_arquivo(repo_path, caminho)
+        minificado, mapa = minificar(codigo)
+        tokens_antes += contar_tokens(codigo)
+        tokens_depois += contar_tokens(minificado)
+        mapas[caminho] = compactar_mapa(mapa)
+
+    relatorio = {
+        "repository": repo_name,
+        "files": len(blobs),
+        "tokens_original": tokens_antes,
+        "tokens_minified": tokens_depois,
+        "savings": round(1 - tokens_depois / tokens_antes, 4) if tokens_antes else 0.0,
+    }
+    if metricas is not None and blobs:
+        # Mesma amostra em todas as execuções (semente pelo nome do repositório)
+        sorteados = random.Random(repo_name).sample(blobs, min(amostra, len(blobs)))
+        divergentes = {}
+        for caminho, _ in sorteados:
+            codigo = ler_arquivo(repo_path, caminho)
+            diferencas = verificar_equivalencia(codigo, minificar(codigo)[0], smells, metricas)
+            if diferencas:
+                divergentes[caminho] = diferencas
+        relatorio["verification"] = {"sample": len(sorteados), "mismatches": divergentes}
+    relatorio["line_maps"] = mapas
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a economia de tokens da minificação e verifica a equivalência numa amostra.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--amostra", type=int, default=AMOSTRA_VERIFICACAO, help="Arquivos verificados por repositório (0 desativa).")
+    args = parser.parse_args(setup_from_args("java_minifier"))
+
+    import llm_with_chatGPT as llm
+    from llm_multi_prompt import TIPOS_CODE_SMELLS
+    from pipeline import load_stage
+
+    metricas = load_stage("04_analyze_metrics") if args.amostra else None
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    os.makedirs(REPORT_DIR, exist_ok=True)
+
+    total_antes = total_depois = divergencias = 0
+    for repo_name in repos:
+        relatorio = relatorio_repositorio(repo_name, llm.contar_tokens, args.amostra, metricas, TIPOS_CODE_SMELLS)
+        with open(os.path.join(REPORT_DIR, f"{repo_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False)
+        total_antes += relatorio["tokens_original"]
+        total_depois += relatorio["tokens_minified"]
+        verificacao = relatorio.get("verification")
+        status = ""
+        if verificacao:
+            divergencias += len(verificacao["mismatches"])
+            status = (f", {'✓' if not verificacao['mismatches'] else '✗'} "
+                      f"{verificacao['sample'] - len(verificacao['mismatches'])}/{verificacao['sample']} equivalentes")
+        print(f"• {repo_name}: {relatorio['tokens_original']} → {relatorio['tokens_minified']} tokens "
+              f"(-{relatorio['savings']:.1%}){status}")
+        for caminho, diferencas in (verificacao or {}).get("mismatches", {}).items():
+            print(f"   ✗ {caminho}: {diferencas}")
+
+    if total_antes:
+        print(f"\nTotal: {total_antes} → {total_depois} tokens (-{1 - total_depois / total_antes:.1%}). "
+              f"Relatórios e mapas de linhas em {REPORT_DIR}")
+    if divergencias:
+        raise SystemExit(f"✗ {divergencias} arquivo(s) com contagens diferentes após a minificação")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import hashlib
+import subprocess
+
+from instrumentation import traced
+
+# Listagem dos arquivos .java de um repositório com o SHA do blob do git, compartilhada pelos
+# scripts que mantêm cache por arquivo (LLM, métricas).
+
+
+def blob_sha(conteudo):
+    """SHA-1 do blob, idêntico ao calculado pelo `git hash-object`."""
+    return hashlib.sha1(b"blob %d\0" % len(conteudo) + conteudo).hexdigest()
+
+
+def git_ls_files(repo_path, *opcoes):
+    """Caminhos .java que o `git ls-files` lista com as opções dadas (None fora de um repositório git)."""
+    result = subprocess.run(["git", "-C", repo_path, "ls-files", "-z", *opcoes, "--", "*.java"],
+                            capture_output=True)
+    if result.returncode != 0:
+        return None
+    return [c for c in result.stdout.decode("utf-8", errors="replace").split("\0") if c]
+
+
+def hash_arquivo(repo_path, caminho):
+    with open(os.path.join(repo_path, caminho), "rb") as f:
+        return blob_sha(f.read())
+
+
+@traced("load", capture=("repo_path",))
+def listar_blobs(repo_path):
+    """
+    Devolve [(caminho_relativo, sha)] dos arquivos .java da árvore de trabalho. Em repositórios
+    git os SHAs vêm do índice (`git ls-files -s`), sem ler os arquivos; os modificados e os não
+    rastreados são lidos e têm o SHA calculado a partir do conteúdo, para que o cache nunca
+    associe o conteúdo editado ao SHA original. Fora do git todos são calculados a partir do conteúdo.
+    """
+    indice = git_ls_files(repo_path, "-s")
+    if indice:
+        alterados = set(git_ls_files(repo_path, "-m") or ())
+        blobs = []
+        for entrada in indice:
+            info, caminho = entrada.split("\t", 1)
+            _, sha, _ = info.split(" ")
+            if caminho in alterados:
+                if not os.path.isfile(os.path.join(repo_path, caminho)):
+                    continue  # removido da árvore de trabalho
+                sha = hash_arquivo(repo_path, caminho)
+            blobs.append((caminho, sha))
+        for caminho in git_ls_files(repo_path, "--others", "--exclude-standard") or ():
+            blobs.append((caminho, hash_arquivo(repo_path, caminho)))
+        return blobs
+
+    blobs = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for file in files:
+            if file.endswith(".java"):
+                path = os.path.join(root, file)
+                blobs.append((os.path.relpath(path, repo_path).replace(os.sep, "/"), hash_arquivo(repo_path, path)))
+    return blobs
+
+
+def ler_arquivo(repo_path, caminho):
+    with open(os.path.join(repo_path, caminho), "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
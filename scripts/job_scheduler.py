@@ -0,0 +1,216 @@
+import os
+import time
+import heapq
+import sqlite3
+import argparse
+import threading
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import setup_from_args
+from module_shards import list_java_files
+
+# Escalonamento "maior tarefa primeiro" (LPT) para as etapas que processam um repositório por
+# vez. A duração de cada (etapa, repositório) é prevista pelas últimas execuções registradas
+# em data/job_durations.sqlite ou, sem histórico, pelo número e tamanho dos arquivos .java.
+# Os repositórios são despachados do maior para o menor, para que um repositório gigante não
+# fique para o fim com os demais workers ociosos. Cada execução grava as durações medidas e
+# compara o makespan com o ideal.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+DURATIONS_FILE = os.path.join(DATA_DIR, "job_durations.sqlite")
+
+HISTORY_RUNS = 5  # Execuções mais recentes usadas na previsão de um repositório
+
+
+def repo_size(repo_path):
+    """(arquivos .java, bytes) do repositório, sem entrar em .git."""
+    files = list_java_files(repo_path)
+    return len(files), sum(os.path.getsize(path) for path in files)
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class DurationHistory:
+    """Durações medidas por (etapa, repositório), com o tamanho do repositório na época."""
+
+    def __init__(self, path=DURATIONS_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS runs (stage TEXT, repo TEXT, seconds REAL, "
+                                "files INTEGER, bytes INTEGER, finished_at REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS runs_stage_repo ON runs (stage, repo, finished_at)")
+        self.lock = threading.Lock()
+        self.rates = {}
+
+    def record(self, stage, repo, seconds, size):
+        files, size_bytes = size
+        with self.lock:
+            self.connection.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                                    (stage, repo, seconds, files, size_bytes, time.time()))
+            self.connection.commit()
+            self.rates.pop(stage, None)
+
+    def stage_rates(self, stage):
+        """Segundos por byte e por arquivo na etapa, somando todas as execuções registradas."""
+        with self.lock:
+            if stage not in self.rates:
+                seconds, files, size_bytes = self.connection.execute(
+                    "SELECT SUM(seconds), SUM(files), SUM(bytes) FROM runs WHERE stage = ?", (stage,)).fetchone()
+                self.rates[stage] = (seconds / size_bytes if size_bytes else None,
+                                     seconds / files if files else None) if seconds else None
+            return self.rates[stage]
+
+    def predict(self, stage, repo, size):
+        """(segundos previstos ou None, origem da previsão)."""
+        files, size_bytes = size
+        with self.lock:
+            rows = self.connection.execute("SELECT seconds, bytes FROM runs WHERE stage = ? AND repo = ? "
+                                           "ORDER BY finished_at DESC LIMIT ?", (stage, repo, HISTORY_RUNS)).fetchall()
+        if rows:
+            # Mediana das últimas execuções, corrigida se o repositório cresceu ou diminuiu desde então
+            return median(seconds * size_bytes / recorded if recorded and size_bytes else seconds
+                          for seconds, recorded in rows), "histórico"
+
+        rates = self.stage_rates(stage)
+        if rates is None:
+            return None, "sem histórico"
+        estimates = [rate * amount for rate, amount in zip(rates, (size_bytes, files)) if rate is not None]
+        return sum(estimates) / len(estimates), "tamanho"
+
+    def close(self):
+        self.connection.close()
+
+
+def plan_longest_first(stage, repos, history, repos_dir=REPOS_DIR):
+    """
+    Ordena os repositórios pela duração prevista, da maior para a menor. Sem nenhum histórico
+    da etapa, a ordem é pelo tamanho em bytes. Devolve (ordem, {repo: previsão}).
+    """
+    predictions = {}
+    for repo in repos:
+        size = repo_size(os.path.join(repos_dir, repo))
+        seconds, source = history.predict(stage, repo, size)
+        predictions[repo] = {"size": size, "seconds": seconds, "source": source}
+    order = sorted(repos, key=lambda repo: (predictions[repo]["seconds"] or 0, predictions[repo]["size"][1],
+                                            predictions[repo]["size"][0]), reverse=True)
+    return order, predictions
+
+
+def simulate_makespan(durations, workers):
+    """Makespan de despachar `durations` nessa ordem, cada uma para o primeiro worker livre."""
+    finish = [0.0] * max(1, min(workers, len(durations)))
+    for duration in durations:
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
+
+
+def makespan_report(stage, makespan, durations, workers, original_order=None, predictions=None):
+    """
+    Compara o makespan medido com o ideal, max(soma / workers, maior tarefa). `original_order`
+    são as durações medidas na ordem antiga (a da lista recebida), para simular quanto ela teria levado.
+    `predictions` é [(previsto, medido)] para o erro da previsão.
+    """
+    total = sum(durations)
+    ideal = max(total / workers, max(durations)) if durations else 0.0
+    report = {
+        "stage": stage,
+        "jobs": len(durations),
+        "workers": workers,
+        "makespan": round(makespan, 3),
+        "ideal": round(ideal, 3),
+        "efficiency": round(ideal / makespan, 4) if makespan else None,
+        "original_order": round(simulate_makespan(original_order, workers), 3) if original_order else None,
+        "prediction_error": None,
+    }
+    errors = [abs(predicted - measured) / measured for predicted, measured in predictions or ()
+              if predicted is not None and measured]
+    if errors:
+        report["prediction_error"] = round(median(errors), 4)
+    return report
+
+
+def format_report(report):
+    text = (f"• {report['stage']}: {report['jobs']} tarefa(s) em {report['workers']} worker(s) | "
+            f"makespan {format_seconds(report['makespan'])} | ideal {format_seconds(report['ideal'])}")
+    if report["efficiency"] is not None:
+        text += f" ({report['efficiency']:.0%})"
+    if report["original_order"] is not None:
+        text += f" | na ordem original: {format_seconds(report['original_order'])} (simulado)"
+    if report["prediction_error"] is not None:
+        text += f" | erro mediano da previsão {report['prediction_error']:.0%}"
+    return text
+
+
+def run_longest_first(stage, repos, work, workers, repos_dir=REPOS_DIR, history=None):
+    """
+    Executa work(repo) para cada repositório em `workers` threads, do maior para o menor.
+    Só execuções bem-sucedidas (work não devolve False nem levanta exceção) entram no histórico.
+    Devolve {repo: resultado}.
+    """
+    history = history or DurationHistory()
+    order, predictions = plan_longest_first(stage, repos, history, repos_dir)
+    durations = {}
+
+    def timed(repo):
+        start = time.time()
+        result = work(repo)
+        durations[repo] = time.time() - start
+        if result is not False:
+            history.record(stage, repo, durations[repo], predictions[repo]["size"])
+        return result
+
+    start = time.time()
+    results = {}
+    # O executor atende as tarefas na ordem em que são submetidas
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {repo: executor.submit(timed, repo) for repo in order}
+    for repo, future in futures.items():
+        try:
+            results[repo] = future.result()
+        except Exception as e:
+            print(f"✗ {stage}: {repo}: {e}")
+            results[repo] = False
+    makespan = time.time() - start
+
+    measured = [durations[repo] for repo in repos if repo in durations]
+    print(format_report(makespan_report(stage, makespan, measured, workers, original_order=measured,
+                                        predictions=[(predictions[repo]["seconds"], durations[repo])
+                                                     for repo in repos if repo in durations])))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mostra a ordem e a duração prevista de uma etapa por repositório.")
+    parser.add_argument("--stage", required=True, help="Etapa (pmd, checkstyle, metrics, llm...).")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--workers", type=int, default=2, help="Workers para o makespan previsto.")
+    args = parser.parse_args(setup_from_args("job_scheduler"))
+
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    history = DurationHistory()
+    order, predictions = plan_longest_first(args.stage, repos, history)
+    for repo in order:
+        prediction = predictions[repo]
+        files, size_bytes = prediction["size"]
+        print(f"{repo:<50} {files:>7} arquivos {size_bytes / 1e6:>9.1f} MB "
+              f"{format_seconds(prediction['seconds']):>10} ({prediction['source']})")
+    durations = [predictions[repo]["seconds"] for repo in order]
+    if all(d is not None for d in durations) and durations:
+        print(f"\nMakespan previsto com {args.workers} worker(s): {format_seconds(simulate_makespan(durations, args.workers))} "
+              f"(ideal {format_seconds(max(sum(durations) / args.workers, max(durations)))})")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,13 @@
 import os
 import tiktoken
 
+from llm_ledger import PRECOS, medidas_do_modelo
+
 # Caminho para o diretório com seus arquivos .java
 CAMINHO_REPOSITORIO = "C:\\Users\\GUILHERME\\PycharmProjects\\code-smells-analysis\\data\\repositories\\TheAlgorithms_Java"
 
-# Preço por 1000 tokens para cada modelo
-PRECOS = {
-    "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
-    "gpt-4o": {"input": 0.005, "output": 0.015},
-    "gpt-4-turbo": {"input": 0.01, "output": 0.03},
-}
+# Razão saída/entrada usada enquanto o registro de uso (llm_ledger.py) não tem chamadas do modelo
+RAZAO_SAIDA_PADRAO = 0.25
 
 # Escolha seu modelo
 MODELO = "gpt-3.5-turbo"  # ou "gpt-4o", "gpt-4-turbo"
@@ -43,14 +41,24 @@ def main():
                 except Exception as e:
                     print(f"Erro ao ler {file}: {e}")
 
-    # Suposição: a saída da IA é 25% do total de tokens de entrada
-    total_tokens_output = int(total_tokens_input * 0.25)
+    # Razão saída/entrada e tempo por token medidos nas chamadas já feitas (data/llm_usage.jsonl)
+    medidas = medidas_do_modelo(MODELO)
+    razao_saida = medidas["razao_saida"] if medidas else RAZAO_SAIDA_PADRAO
+    total_tokens_output = int(total_tokens_input * razao_saida)
 
     # Cálculo do custo
     custo_total = estimar_custo(total_tokens_input, total_tokens_output, MODELO)
 
     print(f"\nTotal de tokens (entrada): {total_tokens_input}")
-    print(f"Tokens estimados de saída: {total_tokens_output}")
+    if medidas:
+        print(f"Tokens estimados de saída: {total_tokens_output} "
+              f"(razão {razao_saida:.1%} medida em {medidas['chamadas']} chamadas)")
+        if medidas["segundos_por_1k"]:
+            horas = total_tokens_input / 1000 * medidas["segundos_por_1k"] / 3600
+            print(f"Tempo estimado (uma requisição por vez): {horas:.1f} h")
+    else:
+        print(f"Tokens estimados de saída: {total_tokens_output} "
+              f"(razão suposta de {RAZAO_SAIDA_PADRAO:.0%}; nenhuma chamada de {MODELO} no registro de uso)")
     print(f"Custo estimado usando {MODELO}: U${custo_total:.4f}")
 
 if __name__ == "__main__":
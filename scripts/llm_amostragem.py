@@ -0,0 +1,156 @@
+import os
+import random
+import hashlib
+from statistics import NormalDist
+from collections import defaultdict
+
+import numpy as np
+
+# Amostragem estratificada de arquivos para a análise da LLM em repositórios muito grandes.
+# Os estratos combinam pacote (diretório) e faixa de tamanho em tokens; a alocação é
+# proporcional ao número de arquivos do estrato. As contagens por smell são extrapoladas
+# para o repositório inteiro (estimador de total estratificado) com intervalo de confiança.
+
+CONFIANCA = 0.95
+FAIXAS_TAMANHO = ("pequeno", "medio", "grande")
+
+
+def semente_repositorio(repo_name):
+    """Semente fixa por repositório: a mesma amostra é sorteada em todas as execuções (e reaproveita o cache)."""
+    return int(hashlib.sha256(repo_name.encode("utf-8")).hexdigest()[:16], 16)
+
+
+def pacote(caminho, profundidade):
+    partes = os.path.dirname(caminho).split("/")
+    return "/".join(partes[:profundidade]) if profundidade else ""
+
+
+def faixas_tamanho(tokens):
+    """Classifica cada arquivo em pequeno/médio/grande pelos tercis de tokens do repositório."""
+    limites = np.quantile(tokens, [1 / 3, 2 / 3]) if len(tokens) else [0, 0]
+    return [FAIXAS_TAMANHO[int(np.searchsorted(limites, t, side="left"))] for t in tokens]
+
+
+def estratificar(arquivos, tokens_por_conteudo, tamanho_amostra):
+    """
+    Agrupa [(caminho, blob, conteudo)] em estratos (pacote, faixa de tamanho). A profundidade do
+    pacote é reduzida até haver no máximo metade de tamanho_amostra estratos, para que cada
+    estrato receba ao menos dois arquivos (necessários para estimar a variância).
+    """
+    faixas = faixas_tamanho([tokens_por_conteudo[c] for _, _, c in arquivos])
+    profundidade_max = max((caminho.count("/") for caminho, _, _ in arquivos), default=0)
+    limite = max(1, tamanho_amostra // 2)
+
+    for profundidade in range(profundidade_max, -1, -1):
+        estratos = defaultdict(list)
+        for arquivo, faixa in zip(arquivos, faixas):
+            estratos[(pacote(arquivo[0], profundidade), faixa)].append(arquivo)
+        if len(estratos) <= limite:
+            break
+    return dict(estratos)
+
+
+def alocar(estratos, tamanho_amostra):
+    """
+    Alocação proporcional (maiores restos), com pelo menos um arquivo por estrato enquanto o
+    tamanho da amostra permitir. O total nunca passa de tamanho_amostra: com menos vagas que
+    estratos, os maiores estratos recebem um arquivo e os demais ficam sem amostra.
+    """
+    total = sum(len(a) for a in estratos.values())
+    tamanho_amostra = min(tamanho_amostra, total)
+    cotas = {h: tamanho_amostra * len(a) / total for h, a in estratos.items()}
+    alocacao = {h: min(len(estratos[h]), int(c)) for h, c in cotas.items()}
+
+    restantes = tamanho_amostra - sum(alocacao.values())
+    for h in sorted((h for h in cotas if not alocacao[h]), key=lambda h: cotas[h], reverse=True):
+        if restantes <= 0:
+            break
+        alocacao[h] = 1
+        restantes -= 1
+    for h in sorted(cotas, key=lambda h: cotas[h] - int(cotas[h]), reverse=True):
+        if restantes <= 0:
+            break
+        if alocacao[h] < len(estratos[h]):
+            alocacao[h] += 1
+            restantes -= 1
+    return alocacao
+
+
+def sortear_amostra(repo_name, arquivos, tokens_por_conteudo, fracao=None, orcamento_tokens=None):
+    """
+    Sorteia a amostra estratificada. O tamanho vem de `fracao` (dos arquivos) ou de
+    `orcamento_tokens` (quantos arquivos de tamanho médio cabem no orçamento).
+    Devolve (estratos, {estrato: arquivos sorteados}).
+    """
+    if not arquivos:
+        return {}, {}
+    if orcamento_tokens:
+        media = np.mean([tokens_por_conteudo[c] for _, _, c in arquivos]) or 1
+        tamanho_amostra = int(orcamento_tokens / media)
+    else:
+        tamanho_amostra = int(np.ceil(len(arquivos) * fracao))
+    tamanho_amostra = max(1, min(tamanho_amostra, len(arquivos)))
+
+    estratos = estratificar(arquivos, tokens_por_conteudo, tamanho_amostra)
+    alocacao = alocar(estratos, tamanho_amostra)
+    rng = random.Random(semente_repositorio(repo_name))
+    amostra = {h: rng.sample(sorted(estratos[h]), alocacao[h]) for h in estratos}
+    return estratos, amostra
+
+
+def estimar_totais(estratos, amostra, resultados, smells, confianca=CONFIANCA):
+    """
+    Estimador de total estratificado: Σ N_h · média_h, com variância
+    Σ N_h² (1 - n_h/N_h) s²_h / n_h. `resultados` é {conteudo: {smell: n}}; arquivos sorteados
+    sem resultado (falha da API) são ignorados no seu estrato. Estratos com um único arquivo
+    respondido usam a variância da amostra inteira; estratos sem nenhum usam a média geral.
+    O total de smells é estimado da mesma forma sobre a soma de cada arquivo, o que inclui a
+    covariância entre os smells no intervalo.
+    """
+    colunas = {smell: j for j, smell in enumerate(smells)}
+    # Última coluna: total de smells do arquivo
+    k = len(smells) + 1
+
+    def matriz(arquivos):
+        linhas = [[resultados[c].get(s, 0) for s in smells] for _, _, c in arquivos if c in resultados]
+        y = np.array(linhas, dtype=float).reshape(-1, len(smells))
+        return np.hstack([y, y.sum(axis=1, keepdims=True)])
+
+    por_estrato = {h: matriz(amostra.get(h, [])) for h in estratos}
+    todos = np.vstack(list(por_estrato.values())) if por_estrato else np.zeros((0, k))
+    media_geral = todos.mean(axis=0) if len(todos) else np.zeros(k)
+    variancia_geral = todos.var(axis=0, ddof=1) if len(todos) > 1 else np.zeros(k)
+
+    total = np.zeros(k)
+    variancia = np.zeros(k)
+    for h, arquivos in estratos.items():
+        n_pop, y = len(arquivos), por_estrato[h]
+        n = len(y)
+        if n == 0:
+            total += n_pop * media_geral
+            variancia += n_pop ** 2 * variancia_geral
+            continue
+        total += n_pop * y.mean(axis=0)
+        s2 = y.var(axis=0, ddof=1) if n > 1 else variancia_geral
+        variancia += n_pop ** 2 * (1 - n / n_pop) * s2 / n
+
+    z = NormalDist().inv_cdf(0.5 + confianca / 2)
+    margem = z * np.sqrt(variancia)
+    # O total nunca é menor que o que foi efetivamente observado na amostra
+    observado = todos.sum(axis=0)
+    baixo = np.maximum(total - margem, observado)
+    alto = total + margem
+
+    return {
+        "code_smells": {s: int(round(total[j])) for s, j in colunas.items()},
+        "total_smells": int(round(total[-1])),
+        "sampling": {
+            "confidence": confianca,
+            "files_sampled": int(sum(len(a) for a in amostra.values())),
+            "files_with_result": int(len(todos)),
+            "strata": len(estratos),
+            "code_smells_ci": {s: [round(float(baixo[j]), 1), round(float(alto[j]), 1)] for s, j in colunas.items()},
+            "code_smells_std_error": {s: round(float(np.sqrt(variancia[j])), 2) for s, j in colunas.items()},
+            "total_smells_ci": [round(float(baixo[-1]), 1), round(float(alto[-1]), 1)],
+        },
+    }
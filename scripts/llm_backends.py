@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, namedtuple
+
+import requests
+
+# Backends de LLM. Todos expõem completar(prompt) e devolvem uma RespostaLLM, de modo que
+# os scripts não dependem de um cliente específico. O backend é escolhido pela variável de
+# ambiente LLM_BACKEND ("openai", "local" ou "mock") ou passado explicitamente.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "data", "llm_cache", "responses")
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+MOCK_BASE_URL = "http://127.0.0.1:8089/v1"
+LOCAL_BASE_URL = "http://127.0.0.1:8080/v1"  # porta padrão do llama-server (llama.cpp)
+DEFAULT_MODEL = "gpt-3.5-turbo"
+LOCAL_MODEL = "local-cpu"
+
+TIMEOUT = 120
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+LOCAL_TIMEOUT = 900  # em CPU, um lote de 12k tokens pode levar minutos
+LOCAL_SLOTS = 4      # usado quando o servidor não informa total_slots em /props
+
+RespostaLLM = namedtuple(
+    "RespostaLLM",
+    ["conteudo", "modelo", "prompt_tokens", "completion_tokens", "latencia", "tentativas", "cache"],
+)
+
+# O que o MedidorBackend guarda de cada chamada (sem o texto da resposta)
+Chamada = namedtuple("Chamada", ["inicio", "fim", "latencia", "prompt_tokens", "completion_tokens", "cache"])
+
+
+class ErroLLM(Exception):
+    """Falha definitiva numa chamada ao backend (após esgotar as tentativas)."""
+
+
+class LLMBackend(ABC):
+    nome = "base"
+
+    @abstractmethod
+    def completar(self, prompt, temperature=0):
+        """Envia o prompt e devolve uma RespostaLLM; levanta ErroLLM em falha definitiva."""
+
+
+def percentil(valores, q):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * q / 100
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+
+def backend_http(backend):
+    """O backend HTTP por baixo dos wrappers (cache, medição)."""
+    while hasattr(backend, "backend"):
+        backend = backend.backend
+    return backend
+
+
+class OpenAIHTTPBackend(LLMBackend):
+    """
+    Cliente HTTP para qualquer servidor compatível com a API de chat completions da OpenAI.
+    Repete a chamada em 429 e 5xx com backoff exponencial, respeitando o Retry-After.
+    """
+    nome = "openai"
+
+    def __init__(self, base_url=OPENAI_BASE_URL, api_key=None, model=DEFAULT_MODEL,
+                 timeout=TIMEOUT, max_retries=MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # requests.Session não é thread-safe; uma por thread reaproveita as conexões
+        if not hasattr(self._local, "session"):
+            session = requests.Session()
+            if self.api_key:
+                session.headers["Authorization"] = f"Bearer {self.api_key}"
+            self._local.session = session
+        return self._local.session
+
+    def _espera(self, tentativa, response=None):
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), BACKOFF_MAX)
+            except ValueError:
+                pass
+        return min(BACKOFF_BASE * 2 ** (tentativa - 1), BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+    def _payload(self, prompt, temperature):
+        return {
+            "model": self.model,
+            "temperature": temperature,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+
+    def completar(self, prompt, temperature=0):
+        inicio = time.perf_counter()
+        ultimo_erro = None
+        for tentativa in range(1, self.max_retries + 1):
+            response = None
+            try:
+                response = self._post(self._payload(prompt, temperature))
+                if response.status_code == 429 or response.status_code >= 500:
+                    ultimo_erro = f"HTTP {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    dados = response.json()
+                    self._registrar(dados)
+                    uso = dados.get("usage") or {}
+                    return RespostaLLM(
+                        conteudo=dados["choices"][0]["message"]["content"],
+                        modelo=dados.get("model", self.model),
+                        prompt_tokens=uso.get("prompt_tokens"),
+                        completion_tokens=uso.get("completion_tokens"),
+                        latencia=time.perf_counter() - inicio,
+                        tentativas=tentativa,
+                        cache=False,
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                ultimo_erro = str(e)
+            if tentativa < self.max_retries:
+                time.sleep(self._espera(tentativa, response))
+        raise ErroLLM(f"{self.nome}: {ultimo_erro} após {self.max_retries} tentativas")
+
+    def _post(self, payload):
+        """Uma tentativa HTTP; as esperas do backoff ficam fora dela."""
+        return self.session.post(f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout)
+
+    def _registrar(self, dados):
+        """Ponto de extensão para campos extras da resposta (ex.: timings do llama-server)."""
+
+    def estatisticas(self):
+        return {}
+
+
+class LocalCPUBackend(OpenAIHTTPBackend):
+    """
+    Servidor de inferência local em CPU compatível com a OpenAI (llama-server do llama.cpp ou
+    similar), sem rede e sem limite de taxa. O servidor faz o batching contínuo entre os seus slots
+    (--parallel N): aqui as requisições em andamento são limitadas ao número de slots, então cada
+    lote entra assim que outro termina, sem fila no servidor estourando o timeout. Com
+    cache_prompt, o slot reaproveita o prefixo já processado (as instruções do prompt, que vêm
+    antes do código) e só avalia o trecho novo.
+    """
+    nome = "local"
+
+    def __init__(self, base_url=LOCAL_BASE_URL, model=LOCAL_MODEL, slots=None, cache_prompt=True,
+                 timeout=LOCAL_TIMEOUT, max_retries=MAX_RETRIES):
+        super().__init__(base_url, None, model, timeout, max_retries)
+        self.cache_prompt = cache_prompt
+        self.slots = slots or self.descobrir_slots()
+        self._vagas = threading.BoundedSemaphore(self.slots)
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def descobrir_slots(self):
+        """Número de slots do servidor (GET /props do llama-server); LOCAL_SLOTS se não informado."""
+        raiz = self.base_url[:-len("/v1")] if self.base_url.endswith("/v1") else self.base_url
+        try:
+            response = requests.get(f"{raiz}/props", timeout=5)
+            if response.ok:
+                return int(response.json().get("total_slots") or LOCAL_SLOTS)
+        except (requests.RequestException, ValueError):
+            pass
+        return LOCAL_SLOTS
+
+    def _payload(self, prompt, temperature):
+        payload = super()._payload(prompt, temperature)
+        payload["cache_prompt"] = self.cache_prompt
+        return payload
+
+    def _registrar(self, dados):
+        # timings.cache_n: tokens de prompt reaproveitados do slot; prompt_n: tokens avaliados
+        timings = dados.get("timings") or {}
+        with self._lock:
+            self._stats["prompt_tokens_cache"] += timings.get("cache_n", 0)
+            self._stats["prompt_tokens_avaliados"] += timings.get("prompt_n", 0)
+
+    def estatisticas(self):
+        with self._lock:
+            return {"slots": self.slots, "cache_prompt": self.cache_prompt, **self._stats}
+
+    def _post(self, payload):
+        # O slot só fica ocupado durante a requisição: no backoff após um 5xx ele fica livre para outro lote
+        with self._vagas:
+            return super()._post(payload)
+
+
+class CachingBackend(LLMBackend):
+    """Guarda as respostas em disco pelo hash de (modelo, prompt); repetições não chamam a API."""
+
+    def __init__(self, backend, cache_dir=CACHE_DIR):
+        self.backend = backend
+        self.nome = f"{backend.nome}+cache"
+        self.model = getattr(backend, "model", backend.nome)
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _caminho(self, prompt, temperature):
+        chave = hashlib.sha256(f"{self.model}\0{temperature}\0{prompt}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, chave[:2], f"{chave}.json")
+
+    def completar(self, prompt, temperature=0):
+        caminho = self._caminho(prompt, temperature)
+        if os.path.exists(caminho):
+            with open(caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            return RespostaLLM(**{**dados, "latencia": 0.0, "tentativas": 0, "cache": True})
+
+        resposta = self.backend.completar(prompt, temperature)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(resposta._asdict(), f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+        return resposta
+
+
+class MedidorBackend(LLMBackend):
+    """Registra latência, tokens e falhas de cada chamada para o relatório de vazão do backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.nome = backend.nome
+        self.model = getattr(backend, "model", backend.nome)
+        self._lock = threading.Lock()
+        self.chamadas = []  # Chamada, sem o texto das respostas (que ficaria em memória a execução toda)
+        self.falhas = 0
+
+    def completar(self, prompt, temperature=0):
+        inicio = time.time()
+        try:
+            resposta = self.backend.completar(prompt, temperature)
+        except ErroLLM:
+            with self._lock:
+                self.falhas += 1
+            raise
+        with self._lock:
+            self.chamadas.append(Chamada(inicio, time.time(), resposta.latencia, resposta.prompt_tokens,
+                                         resposta.completion_tokens, resposta.cache))
+        return resposta
+
+    def relatorio(self):
+        """Vazão e latência das chamadas feitas ao servidor (respostas do cache em disco só são contadas)."""
+        with self._lock:
+            chamadas = list(self.chamadas)
+            falhas = self.falhas
+        remotas = [c for c in chamadas if not c.cache]
+        segundos = max(c.fim for c in remotas) - min(c.inicio for c in remotas) if remotas else 0.0
+        prompt_tokens = sum(c.prompt_tokens or 0 for c in remotas)
+        completion_tokens = sum(c.completion_tokens or 0 for c in remotas)
+        latencias = [c.latencia for c in remotas]
+        return {
+            "backend": self.nome,
+            "modelo": self.model,
+            "requisicoes": len(remotas),
+            "cache": len(chamadas) - len(remotas),
+            "falhas": falhas,
+            "segundos": round(segundos, 3),
+            "req_s": round(len(remotas) / segundos, 3) if segundos else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "prompt_tokens_s": round(prompt_tokens / segundos, 1) if segundos else None,
+            "completion_tokens_s": round(completion_tokens / segundos, 1) if segundos else None,
+            "latencia_p50": percentil(latencias, 50),
+            "latencia_p95": percentil(latencias, 95),
+            "latencia_max": max(latencias, default=None),
+            **backend_http(self).estatisticas(),
+        }
+
+
+def formatar_relatorio(relatorio):
+    """Uma linha com a vazão e a latência de MedidorBackend.relatorio()."""
+    if not relatorio["requisicoes"]:
+        return f"• {relatorio['backend']} ({relatorio['modelo']}): nenhuma requisição ao servidor (cache {relatorio['cache']})"
+    linha = (f"• {relatorio['backend']} ({relatorio['modelo']}): {relatorio['requisicoes']} req em {relatorio['segundos']:.1f}s | "
+             f"{relatorio['req_s']:.2f} req/s | {relatorio['prompt_tokens_s']:.0f} tok/s de prompt | "
+             f"{relatorio['completion_tokens_s']:.1f} tok/s gerados | p50 {relatorio['latencia_p50']:.2f}s | "
+             f"p95 {relatorio['latencia_p95']:.2f}s | falhas {relatorio['falhas']} | cache {relatorio['cache']}")
+    if "slots" in relatorio:
+        reaproveitado = relatorio["prompt_tokens_cache"] / relatorio["prompt_tokens"] if relatorio["prompt_tokens"] else 0
+        linha += f" | {relatorio['slots']} slots | prefixo reaproveitado {reaproveitado:.0%}"
+    return linha
+
+
+def criar_backend(nome=None, model=DEFAULT_MODEL, usar_cache=None, base_url=None):
+    """
+    Cria o backend configurado:
+
+    - LLM_BACKEND: "openai" (padrão), "local" (servidor de inferência local em CPU, ex.: llama-server)
+      ou "mock" (servidor local de mock_llm_server.py)
+    - LLM_BASE_URL: URL base compatível com a OpenAI (substitui o padrão do backend; `base_url` tem precedência)
+    - OPENAI_API_KEY: chave da API
+    - LLM_LOCAL_MODEL: nome do modelo local (separa cache e resultados dos do modelo hospedado)
+    - LLM_LOCAL_SLOTS: requisições simultâneas no servidor local (padrão: total_slots de /props)
+    - LLM_CACHE_PROMPT=0: desativa o reaproveitamento do prefixo do prompt no servidor local
+    - LLM_CACHE=1: ativa o cache de respostas em disco
+    """
+    nome = nome or os.environ.get("LLM_BACKEND", "openai")
+    if nome == "openai":
+        base_url = base_url or os.environ.get("LLM_BASE_URL", OPENAI_BASE_URL)
+        backend = OpenAIHTTPBackend(base_url, os.environ.get("OPENAI_API_KEY", "TOKEN"), model)
+    elif nome == "local":
+        backend = LocalCPUBackend(base_url or os.environ.get("LLM_BASE_URL", LOCAL_BASE_URL),
+                                  os.environ.get("LLM_LOCAL_MODEL", LOCAL_MODEL),
+                                  slots=int(os.environ.get("LLM_LOCAL_SLOTS", 0)) or None,
+                                  cache_prompt=os.environ.get("LLM_CACHE_PROMPT") != "0")
+    elif nome == "mock":
+        backend = OpenAIHTTPBackend(base_url or os.environ.get("LLM_BASE_URL", MOCK_BASE_URL), "mock", model)
+        backend.nome = "mock"
+    else:
+        raise ValueError(f"Backend de LLM desconhecido: {nome}")
+
+    if usar_cache is None:
+        usar_cache = os.environ.get("LLM_CACHE") == "1"
+    return MedidorBackend(CachingBackend(backend) if usar_cache else backend)
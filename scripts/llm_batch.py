@@ -0,0 +1,339 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+import llm_ledger
+import llm_with_chatGPT as llm
+from instrumentation import setup_from_args, span, traced
+from llm_backends import ErroLLM, backend_http, criar_backend
+from llm_multi_prompt import (LLM_RESULTS_DIR, REPOS_DIR, SECOES_PROMPT, carregar_prompts, construir_prompt_variante,
+                              gravar_resultado, preparar_lotes, repositorio_concluido)
+
+# Modo Batch API: todos os lotes de todos os repositórios e variantes vão para arquivos JSONL
+# (uma requisição por linha, com custom_id estável), enviados como jobs assíncronos de
+# /v1/batches. O script acompanha os jobs, reenvia as requisições que falharam e junta as
+# respostas em llm_results/<repo>/<variante>.json, no mesmo formato do llm_multi_prompt.py.
+# O estado fica em data/llm_batch/estado.json: se a execução for interrompida, rodar de novo
+# retoma os jobs já enviados em vez de criar outros.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BATCH_DIR = os.path.join(BASE_DIR, "..", "data", "llm_batch")
+ESTADO_FILE = os.path.join(BATCH_DIR, "estado.json")
+
+ENDPOINT = "/v1/chat/completions"
+JANELA = "24h"
+# Limites da API por arquivo de entrada
+MAX_REQUISICOES_POR_ARQUIVO = 50000
+MAX_BYTES_POR_ARQUIVO = 190 * 1024 * 1024
+INTERVALO_CONSULTA = 30  # segundos entre consultas ao status dos jobs
+MAX_RODADAS = 3          # envio inicial + reenvios das requisições que falharam
+STATUS_FINAIS = {"completed", "failed", "expired", "cancelled"}
+
+
+class ClienteBatch:
+    """Endpoints /files e /batches da API compatível com a OpenAI, usando a sessão do backend HTTP."""
+
+    def __init__(self, backend):
+        self.backend = backend_http(backend)
+        self.base_url = self.backend.base_url
+
+    def _verificar(self, response):
+        if response.status_code >= 400:
+            raise ErroLLM(f"{response.request.method} {response.url}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def enviar_arquivo(self, caminho):
+        with open(caminho, "rb") as f:
+            response = self.backend.session.post(f"{self.base_url}/files", data={"purpose": "batch"},
+                                                 files={"file": (os.path.basename(caminho), f)},
+                                                 timeout=self.backend.timeout)
+        return self._verificar(response).json()["id"]
+
+    def criar_batch(self, file_id, metadata=None):
+        response = self.backend.session.post(f"{self.base_url}/batches", timeout=self.backend.timeout, json={
+            "input_file_id": file_id, "endpoint": ENDPOINT, "completion_window": JANELA, "metadata": metadata or {},
+        })
+        return self._verificar(response).json()
+
+    def consultar_batch(self, batch_id):
+        response = self.backend.session.get(f"{self.base_url}/batches/{batch_id}", timeout=self.backend.timeout)
+        return self._verificar(response).json()
+
+    def baixar_arquivo(self, file_id, destino):
+        with self.backend.session.get(f"{self.base_url}/files/{file_id}/content", stream=True,
+                                      timeout=self.backend.timeout) as response:
+            self._verificar(response)
+            with open(destino, "wb") as f:
+                for bloco in response.iter_content(1 << 20):
+                    f.write(bloco)
+        return destino
+
+
+def custom_id(repo_name, variante, lote, prompt):
+    """Estável entre execuções; o hash do prompt distingue lotes cujo código mudou."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:10]
+    return f"{repo_name}|{variante}|{lote:05d}|{digest}"
+
+
+def chave_de(custom_id_):
+    repo_name, variante, _, _ = custom_id_.split("|")
+    return f"{repo_name}|{variante}"
+
+
+def linha_requisicao(custom_id_, prompt):
+    return {
+        "custom_id": custom_id_, "method": "POST", "url": ENDPOINT,
+        "body": {"model": llm.MODEL, "temperature": 0, "messages": [{"role": "user", "content": prompt}]},
+    }
+
+
+class GravadorJSONL:
+    """Escreve as linhas em arquivos numerados, abrindo um novo ao atingir os limites da API."""
+
+    def __init__(self, prefixo):
+        self.prefixo = prefixo
+        self.arquivos = []
+        self.f = None
+
+    def escrever(self, linha):
+        dados = (json.dumps(linha, ensure_ascii=False) + "\n").encode("utf-8")
+        if self.f is None or self.linhas >= MAX_REQUISICOES_POR_ARQUIVO or self.bytes + len(dados) > MAX_BYTES_POR_ARQUIVO:
+            self.fechar()
+            self.arquivos.append(f"{self.prefixo}-{len(self.arquivos) + 1:03d}.jsonl")
+            self.f = open(self.arquivos[-1], "wb")
+            self.linhas = self.bytes = 0
+        self.f.write(dados)
+        self.linhas += 1
+        self.bytes += len(dados)
+
+    def fechar(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+@traced("load")
+def preparar_requisicoes(repos, prompts, prefixo):
+    """Gera os JSONL de entrada repositório por repositório. Retorna (arquivos, {repo|variante: nº de lotes})."""
+    gravador = GravadorJSONL(prefixo)
+    esperados = {}
+    for repo_name in repos:
+        codigos = preparar_lotes(os.path.join(REPOS_DIR, repo_name))
+        print(f"{repo_name}: {len(codigos)} lote(s) × {len(prompts)} variante(s)")
+        for variante, template in prompts.items():
+            esperados[f"{repo_name}|{variante}"] = len(codigos)
+            for i, codigo in enumerate(codigos):
+                prompt = construir_prompt_variante(template, repo_name, codigo)
+                gravador.escrever(linha_requisicao(custom_id(repo_name, variante, i + 1, prompt), prompt))
+    gravador.fechar()
+    return gravador.arquivos, esperados
+
+
+def carregar_estado():
+    if os.path.exists(ESTADO_FILE):
+        with open(ESTADO_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def salvar_estado(estado):
+    temporario = ESTADO_FILE + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, ESTADO_FILE)
+
+
+def ler_jsonl(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def enviar_jobs(cliente, estado):
+    for job in estado["jobs"]:
+        if job.get("batch_id"):
+            continue
+        with span("batch upload", "http", arquivo=os.path.basename(job["arquivo"])):
+            job["file_id"] = cliente.enviar_arquivo(job["arquivo"])
+            batch = cliente.criar_batch(job["file_id"], {"arquivo": os.path.basename(job["arquivo"])})
+        job.update(batch_id=batch["id"], status=batch.get("status"))
+        salvar_estado(estado)
+        print(f"✓ {os.path.basename(job['arquivo'])} enviado como {batch['id']}")
+
+
+def acompanhar_jobs(cliente, estado, intervalo):
+    """Consulta os jobs até todos terminarem e baixa os arquivos de saída e de erros."""
+    while True:
+        pendentes = [job for job in estado["jobs"] if job.get("status") not in STATUS_FINAIS]
+        for job in pendentes:
+            batch = cliente.consultar_batch(job["batch_id"])
+            job.update(status=batch["status"], request_counts=batch.get("request_counts"))
+            baixados = []
+            for campo, sufixo in (("output_file_id", "saida"), ("error_file_id", "erros")):
+                if job["status"] in STATUS_FINAIS and batch.get(campo):
+                    destino = job["arquivo"].replace(".jsonl", f".{sufixo}.jsonl")
+                    job[sufixo] = cliente.baixar_arquivo(batch[campo], destino)
+                    baixados.append(job[sufixo])
+            if baixados:
+                # O estado final é salvo antes do registro de uso: uma execução interrompida entre os
+                # dois não baixa nem registra os mesmos arquivos de novo ao ser retomada
+                salvar_estado(estado)
+                for caminho in baixados:
+                    registrar_uso(caminho, cliente.backend.nome)
+        salvar_estado(estado)
+
+        pendentes = [job for job in estado["jobs"] if job.get("status") not in STATUS_FINAIS]
+        if not pendentes:
+            return
+        contagens = [job.get("request_counts") or {} for job in pendentes]
+        feitas = sum(c.get("completed", 0) + c.get("failed", 0) for c in contagens)
+        total = sum(c.get("total", 0) for c in contagens)
+        print(f"• {len(pendentes)} job(s) em andamento ({feitas}/{total} requisições). Nova consulta em {intervalo}s.")
+        time.sleep(intervalo)
+
+
+def registrar_uso(caminho, backend):
+    """Registra no llm_ledger cada requisição de um arquivo de saída/erros, com o preço da Batch API."""
+    for linha in ler_jsonl(caminho):
+        repo_name, variante, lote, _ = linha["custom_id"].split("|")
+        response = linha.get("response") or {}
+        corpo = response.get("body") or {}
+        uso = corpo.get("usage") or {}
+        modelo = corpo.get("model", llm.MODEL)
+        llm_ledger.registrar({
+            "repo": repo_name, "variante": variante, "lote": int(lote), "modo": "batch", "backend": backend,
+            "modelo": modelo, "status": "ok" if response.get("status_code") == 200 and not linha.get("error") else "erro",
+            "prompt_tokens": uso.get("prompt_tokens"), "completion_tokens": uso.get("completion_tokens"),
+            "latencia": None, "tentativas": 1, "cache": False,
+            "custo": llm_ledger.custo(modelo, uso.get("prompt_tokens"), uso.get("completion_tokens"), batch=True),
+        })
+
+
+def coletar_respostas(estado):
+    """Lê as saídas de todos os jobs. Retorna ({custom_id: JSON da resposta}, {custom_id: erro})."""
+    respostas, erros = {}, {}
+    for job in estado["jobs"]:
+        for caminho in (job.get("saida"), job.get("erros")):
+            if not caminho or not os.path.exists(caminho):
+                continue
+            for linha in ler_jsonl(caminho):
+                id_ = linha["custom_id"]
+                response = linha.get("response") or {}
+                try:
+                    if linha.get("error") or response.get("status_code") != 200:
+                        raise ErroLLM(linha.get("error") or f"HTTP {response.get('status_code')}")
+                    conteudo = response["body"]["choices"][0]["message"]["content"]
+                    respostas[id_] = llm.extrair_json(conteudo)
+                    erros.pop(id_, None)
+                except (ErroLLM, KeyError, IndexError, ValueError) as e:
+                    if id_ not in respostas:
+                        erros[id_] = str(e)
+        # Requisições de jobs que expiraram ou foram cancelados sem linha de saída
+        if job.get("status") in STATUS_FINAIS and job.get("status") != "completed":
+            for linha in ler_jsonl(job["arquivo"]):
+                if linha["custom_id"] not in respostas:
+                    erros.setdefault(linha["custom_id"], f"job {job['status']}")
+    return respostas, erros
+
+
+def preparar_reenvio(estado, erros):
+    """Copia as linhas das requisições que falharam para um novo JSONL e o registra como job."""
+    rodada = estado["rodada"] + 1
+    gravador = GravadorJSONL(os.path.join(estado["dir"], f"reenvio{rodada}"))
+    vistos = set()
+    for job in list(estado["jobs"]):
+        for linha in ler_jsonl(job["arquivo"]):
+            if linha["custom_id"] in erros and linha["custom_id"] not in vistos:
+                vistos.add(linha["custom_id"])
+                gravador.escrever(linha)
+    gravador.fechar()
+    estado["jobs"].extend({"arquivo": arquivo, "rodada": rodada} for arquivo in gravador.arquivos)
+    estado["rodada"] = rodada
+    salvar_estado(estado)
+    print(f"Reenviando {len(vistos)} requisição(ões) que falharam (rodada {rodada}).")
+
+
+@traced("aggregate")
+def consolidar(estado, respostas):
+    """Agrupa as respostas por repositório/variante, na ordem dos lotes, e grava os resultados."""
+    por_chave = defaultdict(dict)
+    for id_, resposta in respostas.items():
+        _, _, lote, _ = id_.split("|")
+        por_chave[chave_de(id_)][int(lote)] = resposta
+    for chave, esperados in estado["esperados"].items():
+        repo_name, variante = chave.split("|")
+        lotes = por_chave.get(chave, {})
+        gravar_resultado(repo_name, variante, [lotes.get(i) for i in range(1, esperados + 1)])
+
+
+def novo_estado(repos, prompts):
+    execucao = datetime.now().strftime("%Y%m%d_%H%M%S")
+    dir_execucao = os.path.join(BATCH_DIR, execucao)
+    os.makedirs(dir_execucao, exist_ok=True)
+    arquivos, esperados = preparar_requisicoes(repos, prompts, os.path.join(dir_execucao, "requisicoes"))
+    estado = {"execucao": execucao, "dir": dir_execucao, "modelo": llm.MODEL, "rodada": 1,
+              "esperados": esperados, "jobs": [{"arquivo": arquivo, "rodada": 1} for arquivo in arquivos]}
+    salvar_estado(estado)
+    total = sum(esperados.values())
+    print(f"{total} requisição(ões) em {len(arquivos)} arquivo(s) JSONL em {dir_execucao}")
+    return estado
+
+
+def executar(estado, cliente, intervalo=INTERVALO_CONSULTA, max_rodadas=MAX_RODADAS):
+    while True:
+        enviar_jobs(cliente, estado)
+        acompanhar_jobs(cliente, estado, intervalo)
+        respostas, erros = coletar_respostas(estado)
+        if not erros or estado["rodada"] >= max_rodadas:
+            break
+        preparar_reenvio(estado, erros)
+
+    consolidar(estado, respostas)
+    if erros:
+        print(f"✗ {len(erros)} requisição(ões) sem resposta após {estado['rodada']} rodada(s); contadas como failed_batches.")
+    # Execução concluída: o estado é arquivado junto com os JSONL e a próxima execução começa do zero
+    os.replace(ESTADO_FILE, os.path.join(estado["dir"], "estado.json"))
+    print(f"✓ {len(respostas)} resposta(s) consolidadas em {LLM_RESULTS_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa as variantes de prompt da LLM pela Batch API (assíncrona).")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--variantes", nargs="+", choices=list(SECOES_PROMPT.values()), help="Variantes a executar (padrão: todas).")
+    parser.add_argument("--force", action="store_true", help="Inclui repositórios que já têm todos os resultados.")
+    parser.add_argument("--minificar", action="store_true", help="Remove comentários, licenças e indentação do código enviado (ver java_minifier.py).")
+    parser.add_argument("--apenas-preparar", action="store_true", help="Só gera os JSONL, sem enviar.")
+    parser.add_argument("--descartar", action="store_true", help="Ignora uma execução anterior não concluída.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_CONSULTA, help="Segundos entre consultas de status.")
+    parser.add_argument("--max-rodadas", type=int, default=MAX_RODADAS, help="Envio inicial + reenvios das falhas.")
+    args = parser.parse_args(setup_from_args("llm_batch"))
+    if args.minificar:
+        llm.MINIFICAR_CODIGO = True
+
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    estado = None if args.descartar else carregar_estado()
+    if estado:
+        print(f"Retomando a execução {estado['execucao']} ({len(estado['jobs'])} job(s)).")
+    else:
+        prompts = carregar_prompts()
+        if args.variantes:
+            prompts = {v: t for v, t in prompts.items() if v in args.variantes}
+        repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+        if not args.force:
+            repos = [r for r in repos if not repositorio_concluido(r, prompts)]
+        print(f"{len(repos)} repositório(s) a analisar com as variantes: {', '.join(prompts)}")
+        estado = novo_estado(repos, prompts)
+
+    if args.apenas_preparar:
+        print("JSONL gerados; rode de novo sem --apenas-preparar para enviar.")
+        return
+    executar(estado, ClienteBatch(criar_backend(model=llm.MODEL)), args.intervalo, args.max_rodadas)
+
+
+if __name__ == "__main__":
+    main()
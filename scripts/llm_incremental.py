@@ -0,0 +1,227 @@
+import os
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import llm_with_chatGPT as llm
+from content_index import IndiceConteudo, imprimir_relatorio, salvar_relatorio
+from instrumentation import setup_from_args, span, traced
+from java_sources import ler_arquivo
+from llm_amostragem import estimar_totais, sortear_amostra
+from llm_backends import formatar_relatorio
+from llm_multi_prompt import (LLM_RESULTS_DIR, MAX_REQUISICOES_SIMULTANEAS, REPOS_DIR, SECOES_PROMPT,
+                              TIPOS_CODE_SMELLS, analisar_com_retentativas, carregar_prompts,
+                              construir_prompt_variante)
+
+# Análise incremental por arquivo: o modelo devolve as contagens de cada arquivo do lote, e o
+# resultado é guardado pelo hash do conteúdo normalizado (ver content_index.py). Numa nova
+# execução só os arquivos cujo conteúdo mudou são enviados, cópias do mesmo arquivo em outros
+# repositórios reaproveitam o resultado, e os totais são recalculados localmente a partir do cache.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "data", "llm_cache", "files")
+
+MARCADOR_ARQUIVO = "// === ARQUIVO {id} ==="
+
+INSTRUCOES_POR_ARQUIVO = """
+### Formato da resposta (por arquivo)
+
+O código abaixo contém vários arquivos, cada um precedido por um marcador `// === ARQUIVO <id> ===`.
+Em vez do JSON acima, informe as contagens **de cada arquivo separadamente**, usando os ids dos marcadores,
+e retorne **APENAS** um objeto JSON com a estrutura:
+
+```json
+{{
+  "arquivos": {{
+    "{exemplo}": {{
+{campos}
+    }}
+  }}
+}}
+```
+"""
+
+
+class CacheConteudo:
+    """
+    Resultados por conteúdo em data/llm_cache/files/<modelo>/<variante>-<hash do template>/.
+    Alterar o modelo ou o texto do prompt invalida o cache automaticamente.
+    """
+
+    def __init__(self, variante, template, modelo=llm.backend.model, cache_dir=CACHE_DIR):
+        versao = hashlib.sha256(template.encode("utf-8")).hexdigest()[:8]
+        # Resultados com código minificado ficam separados dos obtidos com o código original
+        sufixo = "-min" if llm.MINIFICAR_CODIGO else ""
+        self.dir = os.path.join(cache_dir, modelo, f"{variante}-{versao}{sufixo}")
+
+    def caminho(self, conteudo):
+        return os.path.join(self.dir, conteudo[:2], f"{conteudo}.json")
+
+    def obter(self, conteudo):
+        caminho = self.caminho(conteudo)
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def gravar(self, conteudo, contagens):
+        caminho = self.caminho(conteudo)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(contagens, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+
+def construir_prompt_por_arquivo(template, repo_name, itens, smells=TIPOS_CODE_SMELLS):
+    """Monta o prompt de um lote. `itens` é [(id, codigo)]; cada arquivo é precedido pelo seu marcador."""
+    campos = ",\n".join(f'      "{smell}": <int>' for smell in smells)
+    instrucoes = INSTRUCOES_POR_ARQUIVO.format(exemplo=itens[0][0], campos=campos)
+    codigo = "\n\n".join(f"{MARCADOR_ARQUIVO.format(id=id_)}\n{texto}" for id_, texto in itens)
+    return construir_prompt_variante(f"{template}\n{instrucoes}", repo_name, codigo)
+
+
+def normalizar_contagens(contagens, smells=TIPOS_CODE_SMELLS):
+    return {smell: int(contagens.get(smell, 0) or 0) for smell in smells}
+
+
+def analisar_lote_por_arquivo(template, repo_name, itens, **span_args):
+    """Envia um lote de (hash, codigo) e devolve {hash: contagens} dos arquivos presentes na resposta."""
+    ids = {f"F{i + 1}": conteudo for i, (conteudo, _) in enumerate(itens)}
+    prompt = construir_prompt_por_arquivo(template, repo_name, [(f"F{i + 1}", codigo) for i, (_, codigo) in enumerate(itens)])
+    resposta = analisar_com_retentativas(prompt, **span_args)
+    por_arquivo = resposta.get("arquivos", {})
+    return {ids[id_]: normalizar_contagens(contagens) for id_, contagens in por_arquivo.items()
+            if id_ in ids and isinstance(contagens, dict)}
+
+
+def analisar_repositorio(executor, repo_name, prompts, indice, force=False, fracao=None, orcamento_tokens=None):
+    """
+    Envia uma única vez cada conteúdo do repositório ainda sem resultado em cache e grava os totais
+    de cada variante. Conteúdos já analisados em outro repositório vêm do cache. Com `fracao` ou
+    `orcamento_tokens`, só uma amostra estratificada é analisada e os totais são extrapolados.
+    """
+    repo_path = os.path.join(REPOS_DIR, repo_name)
+    arquivos = indice.indexar_repositorio(repo_name, repo_path)
+    estratos = amostra = None
+    selecionados = arquivos
+    if fracao or orcamento_tokens:
+        estratos, amostra = sortear_amostra(repo_name, arquivos, indice.tokens, fracao, orcamento_tokens)
+        selecionados = [arquivo for sorteados in amostra.values() for arquivo in sorteados]
+        print(f"{repo_name}: amostra de {len(selecionados)}/{len(arquivos)} arquivos em {len(estratos)} estratos")
+    caminho_por_conteudo = {conteudo: caminho for caminho, _, conteudo in selecionados}
+
+    futures = {}
+    pendentes_por_variante = {}
+    caches = {}
+    for variante, template in prompts.items():
+        cache = caches[variante] = CacheConteudo(variante, template)
+        pendentes = [c for c in sorted(caminho_por_conteudo) if force or cache.obter(c) is None]
+        pendentes_por_variante[variante] = len(pendentes)
+        if not pendentes:
+            continue
+
+        with span("preparar_lotes", "load", repo=repo_name, variante=variante, arquivos=len(pendentes)):
+            itens = [(c, llm.preparar_codigo(ler_arquivo(repo_path, caminho_por_conteudo[c]))) for c in pendentes]
+            lotes = llm.agrupar_por_token_limite(itens, llm.MAX_TOKENS_POR_CHAMADA,
+                                                 texto=lambda item: item[1], chave=lambda item: item[0])
+        for i, lote in enumerate(lotes):
+            future = executor.submit(analisar_lote_por_arquivo, template, repo_name, lote,
+                                     repo=repo_name, variante=variante, lote=i + 1)
+            futures[future] = (variante, {conteudo for conteudo, _ in lote})
+
+    falhas = {variante: 0 for variante in prompts}
+    for future in as_completed(futures):
+        variante, enviados = futures[future]
+        try:
+            resultados = future.result()
+        except Exception as e:
+            print(f"Erro num lote de {repo_name} ({variante}): {e}")
+            falhas[variante] += len(enviados)
+            continue
+        for conteudo, contagens in resultados.items():
+            caches[variante].gravar(conteudo, contagens)
+        # Arquivos sem resposta ficam fora do cache e são reenviados na próxima execução
+        falhas[variante] += len(enviados - resultados.keys())
+
+    for variante in prompts:
+        consolidar_repositorio(repo_name, variante, selecionados, caches[variante],
+                               enviados=pendentes_por_variante[variante], falhas=falhas[variante],
+                               total_arquivos=len(arquivos), estratos=estratos, amostra=amostra)
+
+
+@traced("aggregate", capture=("repo_name", "variante"))
+def consolidar_repositorio(repo_name, variante, arquivos, cache, enviados, falhas,
+                           total_arquivos=None, estratos=None, amostra=None):
+    """
+    Distribui os resultados do cache para todos os arquivos analisados (inclusive cópias de
+    arquivos de outros repositórios) e grava <variante>.json e <variante>_arquivos.json.
+    Na amostragem, os totais gravados são a extrapolação com intervalos de confiança.
+    """
+    resultado_total = {smell: 0 for smell in TIPOS_CODE_SMELLS}
+    por_arquivo = {}
+    resultados = {}
+    for caminho, blob, conteudo in arquivos:
+        contagens = cache.obter(conteudo)
+        if contagens is None:
+            continue
+        resultados[conteudo] = contagens
+        por_arquivo[caminho] = {"blob": blob, "content_hash": conteudo, "code_smells": contagens}
+        for smell, qtd in contagens.items():
+            resultado_total[smell] = resultado_total.get(smell, 0) + qtd
+
+    repo_dir = os.path.join(LLM_RESULTS_DIR, repo_name)
+    os.makedirs(repo_dir, exist_ok=True)
+    resultado = {
+        "repository": repo_name,
+        "code_smells": resultado_total,
+        "total_smells": sum(resultado_total.values()),
+        "files": total_arquivos if total_arquivos is not None else len(arquivos),
+        "files_analyzed": len(por_arquivo),
+        "files_sent": enviados,
+        "failed_files": falhas,
+    }
+    if amostra is not None:
+        resultado.update(estimar_totais(estratos, amostra, resultados, TIPOS_CODE_SMELLS))
+    with open(os.path.join(repo_dir, f"{variante}.json"), "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(repo_dir, f"{variante}_arquivos.json"), "w", encoding="utf-8") as f:
+        json.dump(por_arquivo, f, indent=2, ensure_ascii=False)
+    print(f"✓ {repo_name} ({variante}): {len(por_arquivo)}/{len(arquivos)} arquivos, "
+          f"{enviados} enviados, {falhas} com falha")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise incremental da LLM por arquivo, com cache por conteúdo.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--variantes", nargs="+", choices=list(SECOES_PROMPT.values()), help="Variantes a executar (padrão: todas).")
+    parser.add_argument("--workers", type=int, default=MAX_REQUISICOES_SIMULTANEAS, help="Requisições simultâneas.")
+    parser.add_argument("--force", action="store_true", help="Ignora o cache e reenvia todos os arquivos.")
+    parser.add_argument("--minificar", action="store_true", help="Remove comentários, licenças e indentação do código enviado (ver java_minifier.py).")
+    amostragem = parser.add_mutually_exclusive_group()
+    amostragem.add_argument("--fracao", type=float, help="Analisa uma amostra estratificada com esta fração dos arquivos (ex.: 0.1).")
+    amostragem.add_argument("--orcamento-tokens", type=int, help="Analisa uma amostra estratificada que caiba neste orçamento de tokens por repositório.")
+    args = parser.parse_args(setup_from_args("llm_incremental"))
+    if args.minificar:
+        llm.MINIFICAR_CODIGO = True
+
+    prompts = carregar_prompts()
+    if args.variantes:
+        prompts = {v: t for v, t in prompts.items() if v in args.variantes}
+
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    indice = IndiceConteudo()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for repo_name in repos:
+            analisar_repositorio(executor, repo_name, prompts, indice, args.force, args.fracao, args.orcamento_tokens)
+            indice.salvar()
+
+    relatorio = indice.relatorio_economia()
+    imprimir_relatorio(relatorio)
+    salvar_relatorio(relatorio)
+    print(formatar_relatorio(llm.backend.relatorio()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import json
+import argparse
+import threading
+from datetime import datetime
+from collections import defaultdict
+
+from instrumentation import setup_from_args
+from llm_backends import percentil
+
+# Registro de uso da LLM: cada chamada (síncrona ou da Batch API) acrescenta uma linha JSON a
+# data/llm_usage.jsonl com repositório, lote, variante, modelo, tokens, latência, tentativas e
+# custo. Os tokens vêm do campo usage da resposta, não de estimativas. O llmGPT_pryce.py usa
+# essas medidas (razão saída/entrada, segundos por 1000 tokens) no lugar da suposição fixa.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+LEDGER_FILE = os.path.join(DATA_DIR, "llm_usage.jsonl")
+
+# Preço por 1000 tokens (US$). Modelos fora da tabela (locais, mock) não têm custo.
+PRECOS = {
+    "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
+    "gpt-4o": {"input": 0.005, "output": 0.015},
+    "gpt-4-turbo": {"input": 0.01, "output": 0.03},
+}
+DESCONTO_BATCH = 0.5  # a Batch API cobra metade do preço das chamadas síncronas
+
+_lock = threading.Lock()
+
+
+def preco_do_modelo(modelo):
+    """Preço pelo prefixo mais longo: a API responde com versões, ex.: gpt-3.5-turbo-0125."""
+    for nome in sorted(PRECOS, key=len, reverse=True):
+        if (modelo or "").startswith(nome):
+            return PRECOS[nome]
+    return None
+
+
+def custo(modelo, prompt_tokens, completion_tokens, batch=False):
+    preco = preco_do_modelo(modelo)
+    if preco is None:
+        return 0.0
+    valor = (prompt_tokens or 0) / 1000 * preco["input"] + (completion_tokens or 0) / 1000 * preco["output"]
+    return round(valor * (DESCONTO_BATCH if batch else 1), 8)
+
+
+def registrar(registro, arquivo=LEDGER_FILE):
+    """Acrescenta um registro ao arquivo (uma linha por chamada; seguro entre threads)."""
+    linha = json.dumps({"ts": datetime.now().isoformat(timespec="seconds"), **registro}, ensure_ascii=False)
+    with _lock:
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        with open(arquivo, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+
+
+def registrar_resposta(resposta, backend, **contexto):
+    """Registra uma RespostaLLM. `contexto` traz repo, variante, lote etc. (os mesmos campos do span)."""
+    registrar({
+        **contexto,
+        "modo": "sync",
+        "backend": backend.nome,
+        "modelo": resposta.modelo,
+        "status": "ok",
+        "prompt_tokens": resposta.prompt_tokens,
+        "completion_tokens": resposta.completion_tokens,
+        "latencia": round(resposta.latencia, 4),
+        "tentativas": resposta.tentativas,
+        "cache": resposta.cache,
+        "custo": 0.0 if resposta.cache else custo(resposta.modelo, resposta.prompt_tokens, resposta.completion_tokens),
+    })
+
+
+def registrar_falha(erro, backend, **contexto):
+    registrar({**contexto, "modo": "sync", "backend": backend.nome, "modelo": getattr(backend, "model", None),
+               "status": "erro", "erro": str(erro)[:300], "custo": 0.0})
+
+
+def ler_registros(arquivo=LEDGER_FILE, desde=None):
+    if not os.path.exists(arquivo):
+        return
+    with open(arquivo, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue  # linha incompleta de uma execução interrompida
+            if desde is None or registro.get("ts", "") >= desde:
+                yield registro
+
+
+def resumir(registros):
+    """Totais de um grupo de registros. Latência e tokens/s só contam chamadas que foram ao servidor."""
+    ok = [r for r in registros if r.get("status") == "ok"]
+    remotas = [r for r in ok if not r.get("cache")]
+    latencias = [r["latencia"] for r in remotas if r.get("latencia") is not None]
+    prompt_tokens = sum(r.get("prompt_tokens") or 0 for r in remotas)
+    completion_tokens = sum(r.get("completion_tokens") or 0 for r in remotas)
+    # Vazão só com as chamadas síncronas, que têm latência medida (a Batch API não tem)
+    sincronas = [r for r in remotas if r.get("latencia")]
+    segundos = sum(r["latencia"] for r in sincronas)
+    prompt_sincronas = sum(r.get("prompt_tokens") or 0 for r in sincronas)
+    completion_sincronas = sum(r.get("completion_tokens") or 0 for r in sincronas)
+    return {
+        "chamadas": len(registros),
+        "falhas": len(registros) - len(ok),
+        "cache": len(ok) - len(remotas),
+        "novas_tentativas": sum(max((r.get("tentativas") or 1) - 1, 0) for r in remotas),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "razao_saida": round(completion_tokens / prompt_tokens, 4) if prompt_tokens else None,
+        "latencia_p50": percentil(latencias, 50),
+        "latencia_p95": percentil(latencias, 95),
+        "tokens_s": round(completion_sincronas / segundos, 1) if segundos else None,
+        "segundos_por_1k": round(segundos / prompt_sincronas * 1000, 4) if prompt_sincronas else None,
+        "custo": round(sum(r.get("custo") or 0 for r in registros), 4),
+    }
+
+
+def agregar(registros, por="repo"):
+    grupos = defaultdict(list)
+    for registro in registros:
+        grupos[str(registro.get(por) or "-")].append(registro)
+    return {chave: resumir(grupo) for chave, grupo in sorted(grupos.items())}
+
+
+def medidas_do_modelo(modelo, arquivo=LEDGER_FILE):
+    """Resumo das chamadas já feitas com `modelo` (ou versões dele), ou None se ainda não houver."""
+    registros = [r for r in ler_registros(arquivo) if (r.get("modelo") or "").startswith(modelo)]
+    resumo = resumir(registros)
+    return resumo if resumo["prompt_tokens"] else None
+
+
+def formatar(chave, resumo):
+    p50, p95 = resumo["latencia_p50"], resumo["latencia_p95"]
+    return (f"{chave:<40} {resumo['chamadas']:>7} {resumo['falhas']:>6} {resumo['cache']:>6} "
+            f"{resumo['prompt_tokens']:>11} {resumo['completion_tokens']:>10} "
+            f"{f'{p50:.2f}s' if p50 is not None else '-':>8} {f'{p95:.2f}s' if p95 is not None else '-':>8} "
+            f"{resumo['tokens_s'] if resumo['tokens_s'] is not None else '-':>8} {resumo['custo']:>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrega o registro de uso da LLM (latência, tokens/s e custo).")
+    parser.add_argument("--por", default="repo", choices=["repo", "variante", "modelo", "backend", "modo"], help="Campo de agrupamento.")
+    parser.add_argument("--desde", help="Só registros a partir desta data (ex.: 2024-05-01).")
+    parser.add_argument("--arquivo", default=LEDGER_FILE)
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args(setup_from_args("llm_ledger"))
+
+    registros = list(ler_registros(args.arquivo, args.desde))
+    if not registros:
+        print(f"Nenhum registro em {args.arquivo}")
+        return
+    grupos = agregar(registros, args.por)
+    total = resumir(registros)
+    if args.json:
+        print(json.dumps({"por": args.por, "grupos": grupos, "total": total}, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{args.por:<40} {'chamadas':>7} {'falhas':>6} {'cache':>6} {'tok prompt':>11} {'tok saída':>10} "
+          f"{'p50':>8} {'p95':>8} {'tok/s':>8} {'US$':>10}")
+    for chave, resumo in grupos.items():
+        print(formatar(chave, resumo))
+    print(formatar("TOTAL", total))
+    if total["razao_saida"] is not None:
+        print(f"\nRazão saída/entrada medida: {total['razao_saida']:.1%} ({total['novas_tentativas']} novas tentativas)")
+
+
+if __name__ == "__main__":
+    main()
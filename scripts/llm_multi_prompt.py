@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import time
+import argparse
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_with_chatGPT as llm
+from instrumentation import setup_from_args, span
+from job_scheduler import DurationHistory, format_report, makespan_report, plan_longest_first
+from llm_backends import formatar_relatorio
+
+# Executa as três variantes de prompt (zero_shot, one_shot, prompt_calibrado) numa única
+# passagem pelo corpus: cada repositório é lido, tokenizado e dividido em lotes uma vez, e os
+# mesmos lotes são enviados para todas as variantes em paralelo.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+LLM_RESULTS_DIR = os.path.join(DATA_DIR, "llm_results")
+PROMPTS_FILE = os.path.join(DATA_DIR, "prompt_code_smells_llm.md")
+
+# Seções do arquivo de prompts e o nome do arquivo de resultado esperado pelo analyze_results.py
+SECOES_PROMPT = {
+    "Zero-Shot": "zero_shot",
+    "One-Shot": "one_shot",
+    "Especializado": "prompt_calibrado",
+}
+
+TIPOS_CODE_SMELLS = [
+    "Empty Catch Block",
+    "Unnecessary Import (Unused Imports)",
+    "Unnecessary Local Before Return (Unused Local Variables)",
+    "Cyclomatic Complexity",
+    "God Class",
+    "Class Naming Conventions",
+    "Empty Control Statement",
+    "Too Many Fields",
+    "Too Many Methods",
+]
+
+MAX_REQUISICOES_SIMULTANEAS = 6
+MAX_TENTATIVAS = 3
+ESPERA_BASE = 2.0
+# Repositórios já lidos e com requisições em andamento ao mesmo tempo
+REPOS_EM_ANDAMENTO = 2
+
+
+def carregar_prompts(caminho=PROMPTS_FILE):
+    """Lê as seções '## ...' do arquivo de prompts e devolve {variante: texto}."""
+    with open(caminho, "r", encoding="utf-8") as f:
+        conteudo = f.read()
+
+    prompts = {}
+    for secao in re.split(r"^## ", conteudo, flags=re.MULTILINE)[1:]:
+        titulo, _, texto = secao.partition("\n")
+        variante = SECOES_PROMPT.get(titulo.strip())
+        if variante:
+            prompts[variante] = texto.strip()
+    return prompts
+
+
+def construir_prompt_variante(template, repo_name, codigo):
+    """Preenche o template com o repositório e anexa o código do lote."""
+    slug = repo_name.replace("_", "/", 1)
+    texto = template.replace("NOVO_REPOSITORIO_AQUI", slug)
+    for marcador in ("<nome_repositorio>", "NOME_DO_REPOSITORIO", "owner_repositorio"):
+        texto = texto.replace(marcador, repo_name)
+    return f"{texto}\n\nCódigo:\n{codigo}"
+
+
+def analisar_com_retentativas(prompt, **span_args):
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        try:
+            return llm.analisar_lote(prompt, **span_args)
+        except Exception as e:
+            if tentativa == MAX_TENTATIVAS:
+                raise
+            espera = ESPERA_BASE * 2 ** (tentativa - 1)
+            print(f"Erro em {span_args} (tentativa {tentativa}): {e}. Nova tentativa em {espera:.0f}s.")
+            time.sleep(espera)
+
+
+def preparar_lotes(repo_path):
+    """Lê e tokeniza o repositório uma única vez; os lotes são compartilhados pelas variantes."""
+    with span("preparar_lotes", "load", repo=os.path.basename(repo_path)):
+        arquivos = llm.carregar_arquivos_java(repo_path)
+        lotes = llm.agrupar_por_token_limite(arquivos, llm.MAX_TOKENS_POR_CHAMADA)
+    return ["\n\n".join(lote) for lote in lotes]
+
+
+def analisar_cronometrado(duracoes, prompt, **span_args):
+    """analisar_com_retentativas que anota em `duracoes` quanto o lote levou (None se falhou)."""
+    inicio = time.time()
+    try:
+        resposta = analisar_com_retentativas(prompt, **span_args)
+    except Exception:
+        duracoes.append(None)
+        raise
+    duracoes.append(time.time() - inicio)
+    return resposta
+
+
+def submeter_repositorio(executor, repo_name, codigos, prompts, duracoes=None):
+    """
+    Submete todos os lotes do repositório para todas as variantes. Retorna {variante: [futures]}.
+    Com `duracoes` (lista), a duração de cada lote é acrescentada a ela.
+    """
+    analisar = analisar_com_retentativas if duracoes is None else partial(analisar_cronometrado, duracoes)
+    futures = {}
+    for variante, template in prompts.items():
+        futures[variante] = [
+            executor.submit(analisar,
+                            construir_prompt_variante(template, repo_name, codigo),
+                            repo=repo_name, variante=variante, lote=i + 1)
+            for i, codigo in enumerate(codigos)
+        ]
+    return futures
+
+
+def consolidar_repositorio(repo_name, futures):
+    """Soma os lotes de cada variante e grava llm_results/<repo>/<variante>.json."""
+    for variante, lotes in futures.items():
+        respostas = []
+        for i, future in enumerate(lotes):
+            try:
+                respostas.append(future.result())
+            except Exception as e:
+                respostas.append(None)
+                print(f"Erro no lote {i + 1} de {repo_name} ({variante}): {e}")
+        gravar_resultado(repo_name, variante, respostas)
+
+
+def gravar_resultado(repo_name, variante, respostas):
+    """Soma as respostas dos lotes (None = lote que falhou) e grava llm_results/<repo>/<variante>.json."""
+    repo_dir = os.path.join(LLM_RESULTS_DIR, repo_name)
+    os.makedirs(repo_dir, exist_ok=True)
+
+    resultado_total = {smell: 0 for smell in TIPOS_CODE_SMELLS}
+    total_geral = 0
+    falhas = 0
+    for resposta in respostas:
+        if resposta is None:
+            falhas += 1
+            continue
+        try:
+            total_geral += llm.somar_resposta(resultado_total, resposta)
+        except Exception as e:
+            falhas += 1
+            print(f"Resposta inválida em {repo_name} ({variante}): {e}")
+
+    resultado = {
+        "repository": repo_name,
+        "code_smells": resultado_total,
+        "total_smells": total_geral,
+        "batches": len(respostas),
+        "failed_batches": falhas,
+    }
+    output_path = os.path.join(repo_dir, f"{variante}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultado salvo em: {output_path}")
+    if falhas:
+        print(f"✗ {repo_name} ({variante}): {falhas}/{len(respostas)} lote(s) com falha; "
+              f"o repositório será refeito na próxima execução.")
+    return output_path
+
+
+def repositorio_concluido(repo_name, variantes):
+    """Todas as variantes têm resultado e nenhum lote falhou (senão os totais ficam subcontados)."""
+    repo_dir = os.path.join(LLM_RESULTS_DIR, repo_name)
+    for variante in variantes:
+        try:
+            with open(os.path.join(repo_dir, f"{variante}.json"), "r", encoding="utf-8") as f:
+                resultado = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if resultado.get("failed_batches", 0):
+            return False
+    return True
+
+
+def executar(repos, prompts, max_workers=MAX_REQUISICOES_SIMULTANEAS):
+    """
+    Percorre o corpus uma vez. Enquanto as requisições de um repositório estão em andamento,
+    o próximo já é lido e tokenizado; no máximo REPOS_EM_ANDAMENTO ficam em memória.
+    Os repositórios saem do maior para o menor pela duração prevista (ver job_scheduler.py), para
+    que um repositório grande não fique sozinho no fim da execução.
+    """
+    historico = DurationHistory()
+    repos, previsoes = plan_longest_first("llm", repos, historico, REPOS_DIR)
+    duracoes = {}
+    pendentes = deque()
+    inicio = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for repo_name in repos:
+            codigos = preparar_lotes(os.path.join(REPOS_DIR, repo_name))
+            print(f"{repo_name}: {len(codigos)} lote(s) × {len(prompts)} variante(s)")
+            if not codigos:
+                continue
+            duracoes[repo_name] = []
+            pendentes.append((repo_name, submeter_repositorio(executor, repo_name, codigos, prompts, duracoes[repo_name])))
+
+            while len(pendentes) >= REPOS_EM_ANDAMENTO:
+                consolidar_repositorio(*pendentes.popleft())
+
+        while pendentes:
+            consolidar_repositorio(*pendentes.popleft())
+    makespan = time.time() - inicio
+
+    # A duração de um repositório é a soma dos seus lotes por variante, para que o histórico
+    # sirva a execuções com qualquer número de variantes. Repositórios com lote falho ficam de fora.
+    medidas = {repo_name: sum(lotes) / len(prompts) for repo_name, lotes in duracoes.items() if None not in lotes}
+    for repo_name, segundos in medidas.items():
+        historico.record("llm", repo_name, segundos, previsoes[repo_name]["size"])
+    lotes = [d for lista in duracoes.values() for d in lista if d is not None]
+    if lotes:
+        print(format_report(makespan_report("llm", makespan, lotes, max_workers,
+                                            predictions=[(previsoes[r]["seconds"], s) for r, s in medidas.items()])))
+    historico.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa todas as variantes de prompt da LLM numa única passagem pelo corpus.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios em data/repositories (padrão: todos).")
+    parser.add_argument("--variantes", nargs="+", choices=list(SECOES_PROMPT.values()), help="Variantes a executar (padrão: todas).")
+    parser.add_argument("--workers", type=int, default=MAX_REQUISICOES_SIMULTANEAS, help="Requisições simultâneas.")
+    parser.add_argument("--force", action="store_true", help="Refaz repositórios que já têm todos os resultados.")
+    parser.add_argument("--minificar", action="store_true", help="Remove comentários, licenças e indentação do código enviado (ver java_minifier.py).")
+    args = parser.parse_args(setup_from_args("llm_multi_prompt"))
+    if args.minificar:
+        llm.MINIFICAR_CODIGO = True
+
+    prompts = carregar_prompts()
+    if args.variantes:
+        prompts = {v: t for v, t in prompts.items() if v in args.variantes}
+
+    repos = args.repos or sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+    if not args.force:
+        repos = [r for r in repos if not repositorio_concluido(r, prompts)]
+    print(f"{len(repos)} repositório(s) a analisar com as variantes: {', '.join(prompts)}")
+
+    executar(repos, prompts, args.workers)
+    print(formatar_relatorio(llm.backend.relatorio()))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,11 @@ import os
 import json
 import tiktoken
 import time
-from openai import OpenAI
 
-client = OpenAI(api_key="TOKEN")
+from instrumentation import setup_from_args, span, traced
+from java_minifier import minificar
+from llm_backends import criar_backend
+import llm_ledger
 
 REPO_NAME = "TheAlgorithms_Java"
 REPO_PATH = "C:\\Users\\GUILHERME\\PycharmProjects\\code-smells-analysis\\data\\repositories\\TheAlgorithms_Java"
@@ -16,10 +18,16 @@ TIPOS_CODE_SMELLS = [
 MODEL = "gpt-3.5-turbo"
 MAX_TOKENS_POR_CHAMADA = 12000
 tokenizer = tiktoken.encoding_for_model(MODEL)
+# LLM_MINIFICAR=1 (ou --minificar nos scripts com CLI) remove comentários, licenças e indentação
+# do código antes de montar os lotes; ver java_minifier.py
+MINIFICAR_CODIGO = os.environ.get("LLM_MINIFICAR") == "1"
+# Backend escolhido por LLM_BACKEND ("openai" ou "mock"); ver llm_backends.py
+backend = criar_backend(model=MODEL)
 
 def contar_tokens(texto):
     return len(tokenizer.encode(texto))
 
+@traced("load", capture=("caminho",))
 def carregar_arquivos_java(caminho):
     arquivos = []
     for root, _, files in os.walk(caminho):
@@ -27,17 +35,20 @@ def carregar_arquivos_java(caminho):
             if file.endswith(".java"):
                 path = os.path.join(root, file)
                 with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    arquivos.append(f.read())
+                    arquivos.append(preparar_codigo(f.read()))
     return arquivos
 
-def construir_prompt(codigo):
+def preparar_codigo(codigo):
+    return minificar(codigo)[0] if MINIFICAR_CODIGO else codigo
+
+def construir_prompt(codigo, repo_name=REPO_NAME):
     return f"""
 Você é um especialista em detectar code smells em código Java. Analise o código abaixo e conte quantos code smells de cada tipo você encontra. Tipos a considerar: God Class, Long Method, Feature Envy, Data Class, Duplicated Code, Primitive Obsession, Long Parameter List, Shotgun Surgery, Speculative Generality.
 
 Retorne APENAS um JSON no formato:
 
 {{
-  "repository": "{REPO_NAME}",
+  "repository": "{repo_name}",
   "code_smells": {{
     "God Class": 0,
     "Long Method": 0,
@@ -56,13 +67,24 @@ Código:
 {codigo}
 """
 
-def agrupar_por_token_limite(arquivos, limite_tokens):
+@traced("aggregate")
+def agrupar_por_token_limite(arquivos, limite_tokens, texto=None, chave=None):
+    """
+    Agrupa os arquivos em lotes de até limite_tokens. `texto` extrai o código quando os itens não
+    são strings; com `chave` (ex.: hash do conteúdo), arquivos repetidos entram em um único lote.
+    """
     lotes = []
     lote_atual = []
     tokens_atual = 0
+    vistos = set()
 
     for arquivo in arquivos:
-        tokens = contar_tokens(arquivo)
+        if chave:
+            k = chave(arquivo)
+            if k in vistos:
+                continue
+            vistos.add(k)
+        tokens = contar_tokens(texto(arquivo) if texto else arquivo)
         if tokens > limite_tokens:
             continue
 
@@ -78,7 +100,31 @@ def agrupar_por_token_limite(arquivos, limite_tokens):
         lotes.append(lote_atual)
     return lotes
 
-def analisar_code_smells(arquivos_java):
+def extrair_json(conteudo):
+    """Lê o JSON da resposta, aceitando também respostas dentro de um bloco ```json."""
+    conteudo = conteudo.strip()
+    if conteudo.startswith("```"):
+        conteudo = conteudo.split("\n", 1)[1].rsplit("```", 1)[0]
+    return json.loads(conteudo)
+
+def analisar_lote(prompt, **span_args):
+    """Envia um lote para o modelo e devolve o JSON da resposta. Toda chamada vai para o llm_ledger."""
+    with span("chat.completions", "http", backend=backend.nome, **span_args):
+        try:
+            response = backend.completar(prompt, temperature=0)
+        except Exception as e:
+            llm_ledger.registrar_falha(e, backend, **span_args)
+            raise
+    llm_ledger.registrar_resposta(response, backend, **span_args)
+    return extrair_json(response.conteudo)
+
+def somar_resposta(resultado_total, resposta):
+    """Acumula as contagens de um lote e devolve o total de smells informado pelo modelo."""
+    for smell, qtd in resposta["code_smells"].items():
+        resultado_total[smell] = resultado_total.get(smell, 0) + qtd
+    return resposta.get("total_smells", sum(resposta["code_smells"].values()))
+
+def analisar_code_smells(arquivos_java, repo_name=REPO_NAME):
     lotes = agrupar_por_token_limite(arquivos_java, MAX_TOKENS_POR_CHAMADA)
     resultado_total = {smell: 0 for smell in TIPOS_CODE_SMELLS}
     total_geral = 0
@@ -87,22 +133,11 @@ def analisar_code_smells(arquivos_java):
         print(f"Analisando lote {i+1} com {len(lote)} arquivos...")
 
         codigo = "\n\n".join(lote)
-        prompt = construir_prompt(codigo)
+        prompt = construir_prompt(codigo, repo_name)
 
         try:
-            response = client.chat.completions.create(
-                model=MODEL,
-                temperature=0,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            resposta = json.loads(response.choices[0].message.content)
-            smells_lote = resposta["code_smells"]
-
-            for smell, qtd in smells_lote.items():
-                resultado_total[smell] += qtd
-
-            total_geral += resposta["total_smells"]
+            resposta = analisar_lote(prompt, repo=repo_name, lote=i + 1, arquivos=len(lote))
+            total_geral += somar_resposta(resultado_total, resposta)
 
         except Exception as e:
             print(f"Erro no lote {i+1}: {e}")
@@ -111,12 +146,13 @@ def analisar_code_smells(arquivos_java):
         time.sleep(1.5)
 
     return {
-        "repository": REPO_NAME,
+        "repository": repo_name,
         "code_smells": resultado_total,
         "total_smells": total_geral
     }
 
 if __name__ == "__main__":
+    setup_from_args("llm_with_chatGPT")
     print(f"Procurando arquivos .java em: {REPO_PATH}")
     arquivos_java = carregar_arquivos_java(REPO_PATH)
     print(f"{len(arquivos_java)} arquivos Java encontrados.")
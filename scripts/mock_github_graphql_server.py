@@ -0,0 +1,157 @@
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor local que imita o endpoint GraphQL do GitHub para a triagem em lote do
+# 01_clone_repos.py (consultas com um alias `repository(owner:, name:)` por candidato).
+# Os dados de cada repositório são determinísticos; nomes que começam com "missing"
+# simulam repositórios inexistentes (nó null + erro NOT_FOUND, como na API real).
+
+HOST = "127.0.0.1"
+PORT = 9020
+
+LATENCY = 0.2           # segundos por requisição, independente do número de aliases
+BUILD_FILE_RATIO = 0.7  # fração dos repositórios com pom.xml ou build.gradle(.kts)
+MAX_ALIASES = 100
+
+REPOSITORY_RE = re.compile(r'(\w+)\s*:\s*repository\(owner:\s*("(?:[^"\\]|\\.)*")\s*,\s*name:\s*("(?:[^"\\]|\\.)*")\)')
+OBJECT_RE = re.compile(r'(\w+)\s*:\s*object\(expression:\s*"HEAD:([^"]+)"\)')
+
+
+class MockGraphQLServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=LATENCY, seed=42, quiet=True):
+        super().__init__(address, MockGraphQLHandler)
+        self.latency = latency
+        self.seed = seed
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.remaining = 5000
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def repository(self, owner, name, objects):
+        digest = hashlib.sha256(f"{self.seed}:{owner}/{name}".encode("utf-8")).digest()
+        has_build = digest[0] / 255 < BUILD_FILE_RATIO
+        build_file = ["pom.xml", "build.gradle", "build.gradle.kts"][digest[1] % 3]
+        node = {
+            "stargazerCount": 100 + int.from_bytes(digest[2:5], "big") % 100000,
+            "diskUsage": int.from_bytes(digest[5:8], "big") % 500000,
+            "defaultBranchRef": {"name": "main" if digest[8] % 2 else "master"},
+        }
+        for alias, path in objects:
+            node[alias] = {"__typename": "Blob"} if has_build and path == build_file else None
+        return node
+
+    def register(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+
+class MockGraphQLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.server.lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/graphql":
+            self._send_json(404, {"message": "Not Found"})
+            return
+        if not self.headers.get("Authorization", "").lower().startswith("bearer "):
+            self._send_json(401, {"message": "This endpoint requires you to be authenticated."})
+            return
+        try:
+            query = json.loads(body)["query"]
+        except (ValueError, KeyError):
+            self._send_json(400, {"message": "Problems parsing JSON"})
+            return
+
+        server.register("requests")
+        time.sleep(server.latency)
+        # Cada alias vai da sua declaração até a próxima; os campos object() dentro dele são os arquivos pedidos
+        matches = list(REPOSITORY_RE.finditer(query))
+        if len(matches) > MAX_ALIASES:
+            self._send_json(200, {"errors": [{"message": f"Query has more than {MAX_ALIASES} repositories"}]})
+            return
+
+        data, errors = {}, []
+        for i, match in enumerate(matches):
+            alias, owner, name = match.group(1), json.loads(match.group(2)), json.loads(match.group(3))
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(query)
+            objects = OBJECT_RE.findall(query[match.end():end])
+            server.register("repositories")
+            if name.startswith("missing"):
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias],
+                               "message": f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+            else:
+                data[alias] = server.repository(owner, name, objects)
+        if "rateLimit" in query:
+            with server.lock:
+                server.remaining -= 1
+                data["rateLimit"] = {"cost": 1, "remaining": server.remaining}
+        response = {"data": data}
+        if errors:
+            response["errors"] = errors
+        self._send_json(200, response)
+
+
+def start_in_thread(host=HOST, port=0, **config):
+    """Sobe o servidor numa thread daemon (port=0 escolhe uma porta livre). Use server.shutdown() para parar."""
+    server = MockGraphQLServer((host, port), **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que simula o endpoint GraphQL do GitHub para testes offline.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Latência por requisição (s).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Mostra o log de cada requisição.")
+    args = parser.parse_args()
+
+    server = MockGraphQLServer((args.host, args.port), latency=args.latency, seed=args.seed, quiet=not args.verbose)
+    print(f"GraphQL mock em {server.url} (latência {args.latency}s)")
+    print("Use GITHUB_GRAPHQL_URL no 01_clone_repos.py. Ctrl+C para encerrar.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nEstatísticas: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor local compatível com /v1/chat/completions da OpenAI, para testar carga, novas
+# tentativas e cache sem rede e sem custo. A resposta é um JSON de code smells válido e
+# determinístico: o mesmo prompt sempre recebe as mesmas contagens. Também implementa a
+# Batch API (/v1/files e /v1/batches), processando cada job numa thread em segundo plano.
+# Com --slots, imita um servidor local (llama-server): no máximo N requisições processadas ao
+# mesmo tempo, /props com total_slots e reaproveitamento do prefixo com cache_prompt.
+
+HOST = "127.0.0.1"
+PORT = 8089
+MODEL = "mock-code-smells"
+
+LATENCIA = 0.2          # segundos por requisição
+LATENCIA_POR_1K = 0.0   # segundos adicionais por 1000 tokens de prompt
+JITTER = 0.1            # fração de variação aleatória da latência
+TAXA_ERRO = 0.0         # fração de respostas 500
+TAXA_429 = 0.0          # fração de respostas 429
+RETRY_AFTER = 1
+LATENCIA_BATCH = 0.01   # segundos por requisição dentro de um job da Batch API
+SLOTS = 0               # requisições processadas ao mesmo tempo (0 = sem limite)
+
+SMELLS_PADRAO = [
+    "Empty Catch Block",
+    "Unnecessary Import (Unused Imports)",
+    "Unnecessary Local Before Return (Unused Local Variables)",
+    "Cyclomatic Complexity",
+    "God Class",
+    "Class Naming Conventions",
+    "Empty Control Statement",
+    "Too Many Fields",
+    "Too Many Methods",
+]
+
+BLOCO_SMELLS = re.compile(r'"code_smells"\s*:\s*\{(.*?)\}', re.DOTALL)
+CHAVE_JSON = re.compile(r'"([^"]+)"\s*:')
+REPOSITORIO = re.compile(r'"repository"\s*:\s*"([^"]*)"')
+MARCADOR_ARQUIVO = re.compile(r"^// === ARQUIVO (\S+) ===$", re.MULTILINE)
+
+
+def contar_tokens(texto):
+    # Aproximação de ~4 caracteres por token; suficiente para o campo usage
+    return max(1, len(texto) // 4)
+
+
+def contagens_deterministicas(texto, smells):
+    semente = int(hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16], 16)
+    rng = random.Random(semente)
+    return {smell: rng.randint(0, 20) for smell in smells}
+
+
+def resposta_code_smells(prompt):
+    """
+    Monta o JSON esperado pelo prompt (mesmos nomes de smells), com contagens derivadas do hash do
+    prompt. Se o código vier separado por marcadores de arquivo, responde por arquivo, com contagens
+    derivadas do conteúdo de cada um (o mesmo arquivo recebe o mesmo resultado em qualquer lote).
+    """
+    instrucoes, _, codigo = prompt.partition("Código:")
+    bloco = BLOCO_SMELLS.search(instrucoes)
+    smells = CHAVE_JSON.findall(bloco.group(1)) if bloco else []
+    smells = smells or SMELLS_PADRAO
+    repositorio = REPOSITORIO.search(instrucoes)
+
+    partes = MARCADOR_ARQUIVO.split(codigo)
+    if len(partes) > 1:
+        # split com grupo: [antes, id1, código1, id2, código2, ...]
+        arquivos = dict(zip(partes[1::2], partes[2::2]))
+        return {"arquivos": {id_: contagens_deterministicas(texto.strip(), smells) for id_, texto in arquivos.items()}}
+
+    contagens = contagens_deterministicas(prompt, smells)
+    return {
+        "repository": repositorio.group(1) if repositorio else "",
+        "code_smells": contagens,
+        "total_smells": sum(contagens.values()),
+    }
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latencia=LATENCIA, latencia_por_1k=LATENCIA_POR_1K, jitter=JITTER,
+                 taxa_erro=TAXA_ERRO, taxa_429=TAXA_429, retry_after=RETRY_AFTER, latencia_batch=LATENCIA_BATCH,
+                 slots=SLOTS, seed=42, quiet=True):
+        super().__init__(address, MockLLMHandler)
+        self.latencia = latencia
+        self.latencia_por_1k = latencia_por_1k
+        self.jitter = jitter
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.latencia_batch = latencia_batch
+        self.slots = slots
+        self.vagas = threading.BoundedSemaphore(slots) if slots else None
+        self.prompts_recentes = deque(maxlen=slots or 1)  # o que cada slot ainda tem no KV cache
+        self.quiet = quiet
+        # Sequência de falhas reprodutível para a mesma ordem de requisições
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.em_andamento = 0
+        self.arquivos = {}
+        self.batches = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def sortear(self):
+        """Decide o desfecho da próxima requisição: 'ok', '429' ou '500'."""
+        with self.lock:
+            sorteio = self.rng.random()
+            jitter = self.rng.uniform(-self.jitter, self.jitter)
+        if sorteio < self.taxa_429:
+            return "429", jitter
+        if sorteio < self.taxa_429 + self.taxa_erro:
+            return "500", jitter
+        return "ok", jitter
+
+    def registrar(self, chave, valor=1):
+        with self.lock:
+            self.stats[chave] += valor
+
+    def prefixo_em_cache(self, prompt):
+        """Tokens do maior prefixo comum com um prompt processado recentemente (cache_prompt)."""
+        with self.lock:
+            recentes = list(self.prompts_recentes)
+        prefixo = max((os.path.commonprefix([prompt, anterior]) for anterior in recentes), key=len, default="")
+        return contar_tokens(prefixo)
+
+    def novo_id(self, prefixo):
+        with self.lock:
+            self.stats[f"ids_{prefixo}"] += 1
+            return f"{prefixo}-mock-{self.stats[f'ids_{prefixo}']:06d}"
+
+    def guardar_arquivo(self, nome, conteudo, purpose):
+        file_id = self.novo_id("file")
+        with self.lock:
+            self.arquivos[file_id] = {"id": file_id, "object": "file", "bytes": len(conteudo), "filename": nome,
+                                      "purpose": purpose, "created_at": int(time.time()), "conteudo": conteudo}
+        return file_id
+
+    def processar_batch(self, batch_id):
+        """Executa as linhas do job em sequência; falhas sorteadas vão para o arquivo de erros."""
+        batch = self.batches[batch_id]
+        linhas = [json.loads(l) for l in self.arquivos[batch["input_file_id"]]["conteudo"].splitlines() if l.strip()]
+        with self.lock:
+            batch.update(status="in_progress", in_progress_at=int(time.time()))
+            batch["request_counts"]["total"] = len(linhas)
+        saida, erros = [], []
+        for linha in linhas:
+            time.sleep(self.latencia_batch)
+            prompt = "\n".join(m.get("content", "") for m in linha["body"].get("messages", []))
+            desfecho, _ = self.sortear()
+            registro = {"id": self.novo_id("batch_req"), "custom_id": linha["custom_id"]}
+            if desfecho != "ok":
+                registro.update(response={"status_code": 500, "body": {"error": {"message": "Erro interno (simulado)"}}},
+                                error=None)
+                erros.append(registro)
+                contador = "failed"
+            else:
+                conteudo = json.dumps(resposta_code_smells(prompt), ensure_ascii=False)
+                prompt_tokens, completion_tokens = contar_tokens(prompt), contar_tokens(conteudo)
+                registro.update(error=None, response={"status_code": 200, "body": {
+                    "object": "chat.completion", "model": linha["body"].get("model", MODEL),
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": conteudo}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens}}})
+                saida.append(registro)
+                contador = "completed"
+                self.registrar("prompt_tokens", prompt_tokens)
+                self.registrar("completion_tokens", completion_tokens)
+            self.registrar(f"batch_{contador}")
+            with self.lock:
+                batch["request_counts"][contador] += 1
+
+        def jsonl(registros):
+            return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros).encode("utf-8")
+
+        output_file_id = self.guardar_arquivo(f"{batch_id}_output.jsonl", jsonl(saida), "batch_output") if saida else None
+        error_file_id = self.guardar_arquivo(f"{batch_id}_error.jsonl", jsonl(erros), "batch_output") if erros else None
+        with self.lock:
+            batch.update(status="completed", completed_at=int(time.time()),
+                         output_file_id=output_file_id, error_file_id=error_file_id)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _enviar_json(self, status, dados, headers=None):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _ler_json(self):
+        tamanho = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(tamanho) or b"{}")
+
+    def do_GET(self):
+        server = self.server
+        partes = self.path.strip("/").split("/")
+        if len(partes) == 3 and partes[:2] == ["v1", "batches"]:
+            with server.lock:
+                batch = dict(server.batches.get(partes[2]) or {})
+            if batch:
+                self._enviar_json(200, batch)
+            else:
+                self._enviar_json(404, {"error": {"message": f"Batch desconhecido: {partes[2]}"}})
+        elif len(partes) == 4 and partes[:2] == ["v1", "files"] and partes[3] == "content":
+            arquivo = server.arquivos.get(partes[2])
+            if not arquivo:
+                self._enviar_json(404, {"error": {"message": f"Arquivo desconhecido: {partes[2]}"}})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/jsonl")
+            self.send_header("Content-Length", str(len(arquivo["conteudo"])))
+            self.end_headers()
+            self.wfile.write(arquivo["conteudo"])
+        elif self.path in ("/health", "/v1/health"):
+            self._enviar_json(200, {"status": "ok"})
+        elif self.path == "/props":
+            self._enviar_json(200, {"total_slots": self.server.slots or None, "model_path": MODEL})
+        elif self.path == "/v1/models":
+            self._enviar_json(200, {"object": "list", "data": [{"id": MODEL, "object": "model"}]})
+        elif self.path == "/stats":
+            with self.server.lock:
+                stats = dict(self.server.stats, em_andamento=self.server.em_andamento)
+            self._enviar_json(200, stats)
+        else:
+            self._enviar_json(404, {"error": {"message": f"Rota desconhecida: {self.path}"}})
+
+    def enviar_arquivo(self):
+        """POST /v1/files (multipart/form-data com os campos purpose e file)."""
+        tamanho = int(self.headers.get("Content-Length", 0))
+        cabecalho = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("utf-8")
+        mensagem = BytesParser().parsebytes(cabecalho + self.rfile.read(tamanho))
+        campos = {}
+        for parte in mensagem.get_payload() if mensagem.is_multipart() else []:
+            nome = parte.get_param("name", header="content-disposition")
+            campos[nome] = (parte.get_filename(), parte.get_payload(decode=True))
+        if "file" not in campos:
+            self._enviar_json(400, {"error": {"message": "Campo 'file' ausente"}})
+            return
+        nome, conteudo = campos["file"]
+        purpose = (campos.get("purpose") or (None, b"batch"))[1].decode("utf-8")
+        file_id = self.server.guardar_arquivo(nome, conteudo, purpose)
+        self.server.registrar("arquivos")
+        self._enviar_json(200, {k: v for k, v in self.server.arquivos[file_id].items() if k != "conteudo"})
+
+    def criar_batch(self):
+        server = self.server
+        corpo = self._ler_json()
+        if corpo.get("input_file_id") not in server.arquivos:
+            self._enviar_json(400, {"error": {"message": "input_file_id inválido"}})
+            return
+        batch_id = server.novo_id("batch")
+        batch = {"id": batch_id, "object": "batch", "endpoint": corpo.get("endpoint"), "status": "validating",
+                 "input_file_id": corpo["input_file_id"], "completion_window": corpo.get("completion_window"),
+                 "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+                 "request_counts": Counter(total=0, completed=0, failed=0), "metadata": corpo.get("metadata")}
+        with server.lock:
+            server.batches[batch_id] = batch
+        server.registrar("batches")
+        threading.Thread(target=server.processar_batch, args=(batch_id,), daemon=True).start()
+        self._enviar_json(200, batch)
+
+    def do_POST(self):
+        if self.path == "/v1/files":
+            self.enviar_arquivo()
+            return
+        if self.path == "/v1/batches":
+            self.criar_batch()
+            return
+        if self.path != "/v1/chat/completions":
+            self._enviar_json(404, {"error": {"message": f"Rota desconhecida: {self.path}"}})
+            return
+
+        server = self.server
+        server.registrar("requisicoes")
+        try:
+            corpo = self._ler_json()
+            prompt = "\n".join(m.get("content", "") for m in corpo.get("messages", []))
+        except (ValueError, AttributeError):
+            server.registrar("400")
+            self._enviar_json(400, {"error": {"message": "JSON inválido"}})
+            return
+
+        desfecho, jitter = server.sortear()
+        if desfecho == "429":
+            server.registrar("429")
+            self._enviar_json(429, {"error": {"message": "Rate limit (simulado)", "type": "rate_limit_exceeded"}},
+                              headers={"Retry-After": str(server.retry_after)})
+            return
+
+        prompt_tokens = contar_tokens(prompt)
+        if server.vagas:
+            server.vagas.acquire()
+        with server.lock:
+            server.em_andamento += 1
+        try:
+            cache_n = server.prefixo_em_cache(prompt) if corpo.get("cache_prompt") else 0
+            latencia = (server.latencia + server.latencia_por_1k * (prompt_tokens - cache_n) / 1000) * (1 + jitter)
+            time.sleep(max(0.0, latencia))
+        finally:
+            with server.lock:
+                server.em_andamento -= 1
+                server.prompts_recentes.append(prompt)
+            if server.vagas:
+                server.vagas.release()
+
+        if desfecho == "500":
+            server.registrar("500")
+            self._enviar_json(500, {"error": {"message": "Erro interno (simulado)", "type": "server_error"}})
+            return
+
+        conteudo = json.dumps(resposta_code_smells(prompt), ensure_ascii=False)
+        completion_tokens = contar_tokens(conteudo)
+        server.registrar("200")
+        server.registrar("prompt_tokens", prompt_tokens)
+        server.registrar("completion_tokens", completion_tokens)
+        server.registrar("prompt_tokens_cache", cache_n)
+        self._enviar_json(200, {
+            "id": f"chatcmpl-mock-{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": corpo.get("model", MODEL),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": conteudo}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+            "timings": {"prompt_n": prompt_tokens - cache_n, "cache_n": cache_n, "predicted_n": completion_tokens},
+        })
+
+
+def iniciar_em_thread(host=HOST, port=0, **config):
+    """Sobe o servidor numa thread daemon (port=0 escolhe uma porta livre). Use server.shutdown() para parar."""
+    server = MockLLMServer((host, port), **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que simula a API de chat completions para testes offline.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=LATENCIA, help="Latência base por requisição (s).")
+    parser.add_argument("--latency-per-1k", type=float, default=LATENCIA_POR_1K, help="Latência adicional por 1000 tokens de prompt (s).")
+    parser.add_argument("--jitter", type=float, default=JITTER, help="Variação relativa da latência (0.1 = ±10%%).")
+    parser.add_argument("--error-rate", type=float, default=TAXA_ERRO, help="Fração de respostas 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=TAXA_429, help="Fração de respostas 429.")
+    parser.add_argument("--retry-after", type=int, default=RETRY_AFTER, help="Valor do cabeçalho Retry-After nas respostas 429.")
+    parser.add_argument("--batch-latency", type=float, default=LATENCIA_BATCH, help="Latência por requisição nos jobs da Batch API (s).")
+    parser.add_argument("--slots", type=int, default=SLOTS, help="Requisições processadas ao mesmo tempo, como no llama-server (0 = sem limite).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Mostra o log de cada requisição.")
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), latencia=args.latency, latencia_por_1k=args.latency_per_1k,
+                           jitter=args.jitter, taxa_erro=args.error_rate, taxa_429=args.rate_limit_rate,
+                           retry_after=args.retry_after, latencia_batch=args.batch_latency, slots=args.slots, seed=args.seed,
+                           quiet=not args.verbose)
+    print(f"Servidor mock em {server.url} (latência {args.latency}s, erros {args.error_rate:.0%}, 429 {args.rate_limit_rate:.0%})")
+    print(f"Use LLM_BACKEND={'local' if args.slots else 'mock'} nos scripts da LLM. Ctrl+C para encerrar.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nEstatísticas: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor local que imita a parte da Web API do SonarQube usada pelo 07_analyze_sonarqube.py
+# (/api/issues/search paginado com createdAfter e facets, /api/ce/task, /api/system/status),
+# para testar a sincronização sem uma instância real. Cada projeto recebe um conjunto
+# determinístico de issues na primeira consulta.
+
+HOST = "127.0.0.1"
+PORT = 9010
+
+LATENCY = 0.05          # segundos por requisição
+ISSUES_PER_PROJECT = 1200
+PAGE_SIZE_MAX = 500
+MAX_RESULTS = 10000
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+RULES = [
+    "java:S2486", "java:S1128", "java:S1481", "java:S1488", "java:S1541", "java:S6539",
+    "java:S1200", "java:S101", "java:S108", "java:S1820", "java:S1448",
+    # Regras não mapeadas, que o cliente não deve receber
+    "java:S1192", "java:S125",
+]
+HISTORY_START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_date(value):
+    """Aceita as duas formas da API: '2024-01-31' e '2024-01-31T10:00:00+0000'."""
+    if "T" in value:
+        return datetime.strptime(value, DATE_FORMAT)
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+class MockSonarQubeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=LATENCY, issues_per_project=ISSUES_PER_PROJECT, seed=42, quiet=True):
+        super().__init__(address, MockSonarQubeHandler)
+        self.latency = latency
+        self.issues_per_project = issues_per_project
+        self.seed = seed
+        self.quiet = quiet
+        self.lock = threading.Lock()
+        self.projects = {}
+        self.stats = Counter()
+        self.in_flight = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def project_issues(self, project):
+        with self.lock:
+            if project not in self.projects:
+                seed = int(hashlib.sha256(f"{self.seed}:{project}".encode("utf-8")).hexdigest()[:16], 16)
+                rng = random.Random(seed)
+                issues = [self.new_issue(project, rng, HISTORY_START + timedelta(minutes=rng.randrange(525600)))
+                          for _ in range(self.issues_per_project)]
+                self.projects[project] = sorted(issues, key=lambda i: (i["creationDate"], i["key"]))
+            return self.projects[project]
+
+    @staticmethod
+    def new_issue(project, rng, created):
+        return {
+            "key": "AY" + "".join(rng.choice("0123456789abcdef") for _ in range(18)),
+            "rule": rng.choice(RULES),
+            "project": project,
+            "component": f"{project}:src/main/java/File{rng.randrange(200)}.java",
+            "line": rng.randrange(1, 500),
+            "status": "OPEN",
+            "creationDate": created.strftime(DATE_FORMAT),
+        }
+
+    def simulate_analysis(self, project, new=0, resolve=0):
+        """Simula uma nova análise: cria `new` issues com a data atual e fecha `resolve` das existentes."""
+        issues = self.project_issues(project)
+        with self.lock:
+            rng = random.Random(f"{project}:{len(issues)}")
+            now = datetime.now(timezone.utc)
+            issues.extend(self.new_issue(project, rng, now) for _ in range(new))
+            for issue in rng.sample([i for i in issues if i["status"] == "OPEN"], resolve):
+                issue["status"] = "CLOSED"
+            issues.sort(key=lambda i: (i["creationDate"], i["key"]))
+
+    def register(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+
+class MockSonarQubeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send_json(status, {"errors": [{"msg": message}]})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        server = self.server
+        server.register("requests")
+        with server.lock:
+            server.in_flight += 1
+            server.stats["max_in_flight"] = max(server.stats["max_in_flight"], server.in_flight)
+        try:
+            time.sleep(server.latency)
+            if url.path == "/api/system/status":
+                self._send_json(200, {"status": "UP", "version": "mock"})
+            elif url.path == "/api/ce/task":
+                self._send_json(200, {"task": {"id": params.get("id"), "status": "SUCCESS"}})
+            elif url.path == "/api/issues/search":
+                self.search(params)
+            elif url.path == "/stats":
+                with server.lock:
+                    self._send_json(200, dict(server.stats))
+            else:
+                self._error(404, f"Rota desconhecida: {url.path}")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def do_POST(self):
+        # POST /api/test/analysis?project=...&new=N&resolve=M (só no mock)
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path != "/api/test/analysis" or "project" not in params:
+            self._error(404, f"Rota desconhecida: {url.path}")
+            return
+        self.server.simulate_analysis(params["project"], int(params.get("new", 0)), int(params.get("resolve", 0)))
+        self._send_json(200, {"project": params["project"]})
+
+    def search(self, params):
+        self.server.register("issues_search")
+        project = params.get("projects") or params.get("componentKeys")
+        page, page_size = int(params.get("p", 1)), int(params.get("ps", 100))
+        if not project:
+            self._error(400, "O parâmetro 'projects' é obrigatório")
+            return
+        if page_size > PAGE_SIZE_MAX:
+            self._error(400, f"'ps' value ({page_size}) must be less than {PAGE_SIZE_MAX}")
+            return
+        if page * page_size > MAX_RESULTS:
+            self._error(400, f"Can return only the first {MAX_RESULTS} results. {page * page_size}th result asked.")
+            return
+
+        issues = self.server.project_issues(project)
+        with self.server.lock:
+            selected = list(issues)
+        if params.get("resolved") == "false":
+            selected = [i for i in selected if i["status"] == "OPEN"]
+        if params.get("rules"):
+            rules = set(params["rules"].split(","))
+            selected = [i for i in selected if i["rule"] in rules]
+        if params.get("createdAfter"):
+            after = parse_date(params["createdAfter"])
+            selected = [i for i in selected if parse_date(i["creationDate"]) >= after]
+        if params.get("asc") == "false":
+            selected.reverse()
+
+        response = {
+            "total": len(selected), "p": page, "ps": page_size,
+            "paging": {"pageIndex": page, "pageSize": page_size, "total": len(selected)},
+            "issues": selected[(page - 1) * page_size:page * page_size],
+        }
+        if "rules" in params.get("facets", "").split(","):
+            counts = Counter(i["rule"] for i in selected)
+            response["facets"] = [{"property": "rules",
+                                   "values": [{"val": r, "count": c} for r, c in counts.most_common()]}]
+        self._send_json(200, response)
+
+
+def start_in_thread(host=HOST, port=0, **config):
+    """Sobe o servidor numa thread daemon (port=0 escolhe uma porta livre). Use server.shutdown() para parar."""
+    server = MockSonarQubeServer((host, port), **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que simula a Web API do SonarQube para testes offline.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Latência por requisição (s).")
+    parser.add_argument("--issues", type=int, default=ISSUES_PER_PROJECT, help="Issues geradas por projeto.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Mostra o log de cada requisição.")
+    args = parser.parse_args()
+
+    server = MockSonarQubeServer((args.host, args.port), latency=args.latency, issues_per_project=args.issues,
+                                 seed=args.seed, quiet=not args.verbose)
+    print(f"SonarQube mock em {server.url} ({args.issues} issues por projeto, latência {args.latency}s)")
+    print("Use --host-url ou SONAR_HOST_URL no 07_analyze_sonarqube.py (com --skip-scan). Ctrl+C para encerrar.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nEstatísticas: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
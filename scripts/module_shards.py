@@ -0,0 +1,127 @@
+import os
+import re
+import heapq
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import traced
+
+# Divisão de um repositório grande em shards para o PMD e o Checkstyle. Os shards seguem os
+# módulos Maven (<modules> do pom.xml) ou Gradle (include do settings.gradle); sem módulos, ou
+# quando um módulo sozinho passa da fatia de um shard, os arquivos são repartidos pelo tamanho.
+# Cada shard roda num processo separado e os relatórios parciais são juntados depois.
+
+SHARD_MIN_FILES = 1500  # Repositórios menores são analisados numa única chamada, como antes
+SHARD_WORKERS = 4       # Processos por repositório (o pipeline já roda alguns repositórios em paralelo)
+
+GRADLE_INCLUDE_RE = re.compile(r"\binclude\s*\(?((?:\s*[\"'][^\"']+[\"']\s*,?)+)\)?")
+GRADLE_PROJECT_DIR_RE = re.compile(
+    r"project\(\s*[\"']:?([^\"']+)[\"']\s*\)\.projectDir\s*=\s*(?:new\s+File\(\s*settingsDir\s*,\s*|file\(\s*)[\"']([^\"']+)[\"']")
+QUOTED_RE = re.compile(r"[\"']([^\"']+)[\"']")
+
+
+def maven_modules(repo_path, module=""):
+    """Módulos declarados no pom.xml, seguindo os <modules> dos submódulos recursivamente."""
+    module_dir = os.path.join(repo_path, module)
+    pom = os.path.join(module_dir, "pom.xml")
+    if not os.path.isfile(pom):
+        return []
+    try:
+        root = ET.parse(pom).getroot()
+    except ET.ParseError:
+        return []
+
+    found = []
+    # O namespace do POM varia; <module> pode estar no projeto ou em <profiles>
+    for element in root.iter():
+        if element.tag.rsplit("}", 1)[-1] != "module" or not (element.text or "").strip():
+            continue
+        path = element.text.strip()
+        if path.endswith(".xml"):
+            path = os.path.dirname(path)
+        child = os.path.normpath(os.path.join(module, path)).replace(os.sep, "/")
+        if child.startswith("..") or child in found or not os.path.isdir(os.path.join(repo_path, child)):
+            continue
+        found.append(child)
+        found.extend(m for m in maven_modules(repo_path, child) if m not in found)
+    return found
+
+
+def gradle_modules(repo_path):
+    """Projetos incluídos no settings.gradle(.kts), respeitando projectDir quando declarado."""
+    for name in ("settings.gradle", "settings.gradle.kts"):
+        settings = os.path.join(repo_path, name)
+        if os.path.isfile(settings):
+            break
+    else:
+        return []
+    with open(settings, "r", encoding="utf-8", errors="ignore") as f:
+        text = re.sub(r"//.*", "", f.read())
+
+    project_dirs = {project.replace(":", "/"): path for project, path in GRADLE_PROJECT_DIR_RE.findall(text)}
+    found = []
+    for group in GRADLE_INCLUDE_RE.findall(text):
+        for project in QUOTED_RE.findall(group):
+            path = project.lstrip(":").replace(":", "/")
+            path = os.path.normpath(project_dirs.get(path, path)).replace(os.sep, "/")
+            if path not in found and os.path.isdir(os.path.join(repo_path, path)):
+                found.append(path)
+    return found
+
+
+def discover_modules(repo_path):
+    return maven_modules(repo_path) or gradle_modules(repo_path)
+
+
+def list_java_files(target_path):
+    files = []
+    for root, dirs, names in os.walk(target_path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        files.extend(os.path.join(root, name) for name in names if name.endswith(".java"))
+    return files
+
+
+def balance(units, shards):
+    """Distribui (tamanho, arquivos) entre `shards` grupos, do maior para o menor, sempre no grupo mais leve."""
+    heap = [(0, i, []) for i in range(shards)]
+    for size, files in sorted(units, key=lambda unit: -unit[0]):
+        load, i, group = heapq.heappop(heap)
+        group.extend(files)
+        heapq.heappush(heap, (load + size, i, group))
+    return [group for _, _, group in sorted(heap, key=lambda entry: entry[1]) if group]
+
+
+@traced("load", capture=("repo_path",))
+def plan_shards(repo_path, target_path=None, shards=SHARD_WORKERS, min_files=SHARD_MIN_FILES):
+    """
+    Lista de shards (listas de arquivos .java sob target_path) ou None quando o repositório
+    é pequeno o bastante para uma única execução.
+    """
+    files = list_java_files(target_path or repo_path)
+    if shards < 2 or len(files) < min_files:
+        return None
+
+    sizes = {path: os.path.getsize(path) for path in files}
+    # Cada arquivo fica no módulo mais interno que o contém; o que sobra fica na raiz ("")
+    modules = sorted(discover_modules(repo_path), key=len, reverse=True)
+    groups = {}
+    for path in files:
+        relative = os.path.relpath(path, repo_path).replace(os.sep, "/")
+        module = next((m for m in modules if relative.startswith(m + "/")), "")
+        groups.setdefault(module, []).append(path)
+
+    share = sum(sizes.values()) / shards
+    units = []
+    for module_files in groups.values():
+        module_size = sum(sizes[path] for path in module_files)
+        if len(groups) > 1 and module_size <= share:
+            units.append((module_size, module_files))
+        else:
+            units.extend((sizes[path], [path]) for path in module_files)
+    return balance(units, shards)
+
+
+def run_shards(shards, work, workers=SHARD_WORKERS):
+    """Executa work(indice, arquivos) para cada shard em paralelo e devolve os resultados na ordem."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(work, range(len(shards)), shards))
@@ -0,0 +1,444 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import importlib
+import subprocess
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import query_results
+from instrumentation import setup_from_args, span
+from job_scheduler import DurationHistory, format_report, makespan_report, repo_size
+from report_files import compressed_name
+
+# Orquestrador do pipeline: cada par (etapa, repositório) é uma tarefa com entradas, saídas e
+# dependências declaradas. Uma tarefa só é refeita quando o hash das suas entradas muda.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPOS_DIR = os.path.join(DATA_DIR, "repositories")
+STATE_FILE = os.path.join(DATA_DIR, "pipeline_state.json")
+
+PMD_REPORTS_DIR = os.path.join(DATA_DIR, "pmd_reports")
+CHECKSTYLE_REPORTS_DIR = os.path.join(DATA_DIR, "checkstyle_reports")
+METRICS_REPORTS_DIR = os.path.join(DATA_DIR, "metrics_reports")
+SONARQUBE_REPORTS_DIR = os.path.join(DATA_DIR, "sonarqube_reports")
+LLM_RESULTS_DIR = os.path.join(DATA_DIR, "llm_results")
+ANALYSIS_DIR = os.path.join(BASE_DIR, "analysis_results")
+
+PMD_RULESET = os.path.join(BASE_DIR, "rulesets", "custom_ruleset.xml")
+CHECKSTYLE_CONFIG = os.path.join(BASE_DIR, "..", "config", "checkstyle-config.xml")
+
+MAX_WORKERS = 4
+# Limite de tarefas simultâneas por etapa (PMD e Checkstyle sobem uma JVM cada)
+STAGE_CONCURRENCY = {
+    "pmd": 2,
+    "checkstyle": 2,
+    # O motor de métricas já usa todos os núcleos
+    "metrics": 1,
+    "sonarqube": 1,
+    "analyze": 1,
+}
+HASH_CHUNK = 1024 * 1024
+
+STAGES = ("pmd", "pmd_summary", "checkstyle", "checkstyle_summary", "metrics", "sonarqube", "analyze")
+# Etapas que dependem de um serviço externo e só rodam quando pedidas em --stages
+OPTIONAL_STAGES = ("sonarqube",)
+
+
+# --- Hashes de conteúdo ---
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_values(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(str(value).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def hash_repository(repo_path):
+    """
+    Impressão digital do código de um repositório: árvore do HEAD mais o conteúdo das alterações
+    locais (diff em relação ao HEAD e arquivos .java não rastreados) quando é um clone git, ou
+    tamanho e data de modificação dos arquivos .java caso contrário.
+    """
+    tree = subprocess.run(["git", "rev-parse", "HEAD^{tree}"], cwd=repo_path, capture_output=True, text=True)
+    if tree.returncode == 0:
+        diff = subprocess.run(["git", "diff", "HEAD", "--binary"], cwd=repo_path, capture_output=True)
+        untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard", "--", "*.java"],
+                                   cwd=repo_path, capture_output=True, text=True).stdout
+        blobs = ""
+        if untracked:
+            blobs = subprocess.run(["git", "hash-object", "--stdin-paths"], input=untracked,
+                                   cwd=repo_path, capture_output=True, text=True).stdout
+        return hash_values(tree.stdout.strip(), hashlib.sha256(diff.stdout).hexdigest(), untracked, blobs)
+
+    entries = []
+    for root, _, files in os.walk(repo_path):
+        for file in files:
+            if file.endswith(".java"):
+                stat = os.stat(os.path.join(root, file))
+                entries.append((os.path.relpath(os.path.join(root, file), repo_path), stat.st_size, stat.st_mtime_ns))
+    return hash_values(*sorted(entries))
+
+
+def hash_directory(path, suffix):
+    entries = []
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for file in sorted(files):
+                if file.endswith(suffix):
+                    file_path = os.path.join(root, file)
+                    entries.append((os.path.relpath(file_path, path), hash_file(file_path)))
+    return hash_values(*sorted(entries))
+
+
+# --- Scripts das etapas ---
+def load_stage(module_name):
+    """Importa um script numerado (ex.: 02_analyze_pmd), que usa caminhos relativos a scripts/."""
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    return importlib.import_module(module_name)
+
+
+# --- Tarefas ---
+class Task:
+    def __init__(self, stage, repo, action, inputs, outputs, deps=(), require_deps=True):
+        self.stage = stage
+        self.repo = repo
+        self.action = action
+        self.inputs = inputs      # função que devolve o hash das entradas (avaliada na hora de executar)
+        self.outputs = outputs    # caminhos produzidos pela tarefa
+        self.deps = list(deps)
+        # Quando False, a tarefa roda mesmo se alguma dependência falhar (ex.: análise do corpus)
+        self.require_deps = require_deps
+
+    @property
+    def id(self):
+        return f"{self.stage}:{self.repo}" if self.repo else self.stage
+
+    def __repr__(self):
+        return f"Task({self.id})"
+
+
+def build_tasks(repos, stages):
+    pmd = load_stage("02_analyze_pmd")
+    pmd_summary = load_stage("03_total_smells_pmd")
+    checkstyle = load_stage("05_analyze_checkstyle")
+    checkstyle_summary = load_stage("06_total_smells_checkstyle")
+    metrics = load_stage("04_analyze_metrics")
+    sonarqube = load_stage("07_analyze_sonarqube") if "sonarqube" in stages else None
+
+    tasks = {}
+
+    def add(task):
+        tasks[task.id] = task
+        return task
+
+    summary_tasks = []
+    for repo in repos:
+        repo_path = os.path.join(REPOS_DIR, repo)
+        pmd_csv = compressed_name(os.path.join(PMD_REPORTS_DIR, f"{repo}_pmd_report.csv"))
+        checkstyle_xml = compressed_name(os.path.join(CHECKSTYLE_REPORTS_DIR, f"{repo}_checkstyle_raw.xml"))
+
+        if "pmd" in stages:
+            add(Task("pmd", repo,
+                     action=lambda repo=repo, repo_path=repo_path: pmd.run_pmd_on_repo(repo_path, repo),
+                     inputs=lambda repo_path=repo_path: hash_values(hash_repository(repo_path), hash_file(PMD_RULESET)),
+                     outputs=[pmd_csv]))
+        if "pmd_summary" in stages:
+            summary_tasks.append(add(Task(
+                "pmd_summary", repo,
+                action=lambda pmd_csv=pmd_csv: pmd_summary.summarize_pmd_report(pmd_csv) is not None,
+                inputs=lambda pmd_csv=pmd_csv: hash_values(hash_file(pmd_csv),
+                                                           hash_file(os.path.join(BASE_DIR, "03_total_smells_pmd.py"))),
+                outputs=[os.path.join(PMD_REPORTS_DIR, "summaries", f"{repo}_summary.json")],
+                deps=[f"pmd:{repo}"] if "pmd" in stages else [])))
+
+        if "checkstyle" in stages:
+            add(Task("checkstyle", repo,
+                     action=lambda repo=repo: checkstyle.process_repository(repo),
+                     inputs=lambda repo_path=repo_path: hash_values(hash_repository(repo_path), hash_file(CHECKSTYLE_CONFIG)),
+                     outputs=[checkstyle_xml]))
+        if "checkstyle_summary" in stages:
+            summary_tasks.append(add(Task(
+                "checkstyle_summary", repo,
+                action=lambda repo=repo, xml=checkstyle_xml: summarize_checkstyle(checkstyle_summary, repo, xml),
+                inputs=lambda xml=checkstyle_xml: hash_values(hash_file(xml),
+                                                              hash_file(os.path.join(BASE_DIR, "06_total_smells_checkstyle.py"))),
+                outputs=[os.path.join(CHECKSTYLE_REPORTS_DIR, "summaries", f"{repo}_summary.json")],
+                deps=[f"checkstyle:{repo}"] if "checkstyle" in stages else [])))
+
+        if "metrics" in stages:
+            summary_tasks.append(add(Task(
+                "metrics", repo,
+                action=lambda repo=repo: run_metrics(metrics, repo),
+                inputs=lambda repo_path=repo_path: hash_values(hash_repository(repo_path),
+                                                               hash_file(os.path.join(BASE_DIR, "java_metrics.py")),
+                                                               hash_file(os.path.join(BASE_DIR, "04_analyze_metrics.py"))),
+                outputs=[os.path.join(METRICS_REPORTS_DIR, "summaries", f"{repo}_summary.json")])))
+
+        if "sonarqube" in stages:
+            summary_tasks.append(add(Task(
+                "sonarqube", repo,
+                action=lambda repo=repo: run_sonarqube(sonarqube, repo),
+                inputs=lambda repo_path=repo_path: hash_values(hash_repository(repo_path),
+                                                               hash_file(os.path.join(BASE_DIR, "..", "config", "sonarqube-config.properties")),
+                                                               hash_file(os.path.join(BASE_DIR, "07_analyze_sonarqube.py"))),
+                outputs=[os.path.join(SONARQUBE_REPORTS_DIR, "summaries", f"{repo}_summary.json")])))
+
+    if "analyze" in stages:
+        add(Task("analyze", None,
+                 action=run_analysis,
+                 inputs=lambda: hash_values(
+                     hash_directory(os.path.join(PMD_REPORTS_DIR, "summaries"), ".json"),
+                     hash_directory(os.path.join(CHECKSTYLE_REPORTS_DIR, "summaries"), ".json"),
+                     hash_directory(os.path.join(METRICS_REPORTS_DIR, "summaries"), ".json"),
+                     hash_directory(os.path.join(SONARQUBE_REPORTS_DIR, "summaries"), ".json"),
+                     hash_directory(LLM_RESULTS_DIR, ".json"),
+                     hash_file(os.path.join(BASE_DIR, "analyze_results.py"))),
+                 outputs=[os.path.join(ANALYSIS_DIR, "summary_metrics.csv"),
+                          os.path.join(ANALYSIS_DIR, "detailed_by_repository.csv")],
+                 deps=[t.id for t in summary_tasks],
+                 require_deps=False))
+    return tasks
+
+
+def summarize_checkstyle(module, repo, xml_path):
+    module.generate_summary_json(repo, module.parse_checkstyle_report(xml_path))
+    return True
+
+
+def run_metrics(module, repo):
+    cache = module.MetricsCache()
+    try:
+        with module.ProcessPoolExecutor() as executor:
+            module.analyze_repository(repo, executor, cache)
+    finally:
+        cache.close()
+    return True
+
+
+def run_sonarqube(module, repo):
+    client, host_url, token = module.create_client()
+    with module.ThreadPoolExecutor(max_workers=module.MAX_PAGE_REQUESTS) as executor:
+        return module.process_repository(repo, client, executor, host_url, token)
+
+
+def run_analysis():
+    result = subprocess.run([sys.executable, os.path.join(BASE_DIR, "analyze_results.py"), "--no-trace"],
+                            cwd=BASE_DIR, env={**os.environ, "MPLBACKEND": "Agg"})
+    # Mantém o índice do query_results.py em dia com os sumários que acabaram de ser refeitos
+    query_results.build_index()
+    return result.returncode == 0
+
+
+# --- Estado persistido entre execuções ---
+def load_state():
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Aviso: estado inválido em {STATE_FILE}, todas as tarefas serão refeitas.")
+    return {}
+
+
+def save_state(state):
+    temp_file = STATE_FILE + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(temp_file, STATE_FILE)
+
+
+def is_up_to_date(task, input_hash, state):
+    record = state.get(task.id)
+    if not record or record.get("inputs") != input_hash:
+        return False
+    for path in task.outputs:
+        if not os.path.exists(path) or record.get("outputs", {}).get(path) != hash_file(path):
+            return False
+    return True
+
+
+# --- Execução ---
+class Scheduler:
+    def __init__(self, tasks, state, max_workers=MAX_WORKERS, force=False, dry_run=False, history=None):
+        self.tasks = tasks
+        self.state = state
+        self.max_workers = max_workers
+        self.force = force
+        self.dry_run = dry_run
+        self.running_per_stage = Counter()
+        self.state_lock = threading.Lock()
+        self.status = {}
+        # Durações de execuções anteriores (job_scheduler.py): as tarefas mais longas saem primeiro
+        self.history = history
+        self.sizes = {}
+        self.predictions = {}
+        self.timings = {}
+
+    def _predict(self):
+        """Duração prevista de cada tarefa por repositório; sem histórico, vale o tamanho do repositório."""
+        for task in self.tasks.values():
+            if task.repo is None:
+                continue
+            if task.repo not in self.sizes:
+                self.sizes[task.repo] = repo_size(os.path.join(REPOS_DIR, task.repo))
+            self.predictions[task.id] = self.history.predict(task.stage, task.repo, self.sizes[task.repo])[0]
+
+    def _priority(self, task):
+        if task.repo is None:
+            return (0, 0)
+        return (self.predictions.get(task.id) or 0, self.sizes[task.repo][1])
+
+    def _execute(self, task):
+        """Executa a tarefa se as entradas mudaram. Retorna 'ok', 'cached', 'failed' ou, no dry-run, 'would run'."""
+        if self.dry_run and any(self.status.get(dep) == "would run" for dep in task.deps):
+            # As entradas dependem de saídas que o dry-run não produz
+            return "would run"
+        try:
+            input_hash = task.inputs()
+        except OSError as e:
+            print(f"✗ {task.id}: entradas indisponíveis ({e})")
+            return "failed"
+
+        if not self.force and is_up_to_date(task, input_hash, self.state):
+            return "cached"
+        if self.dry_run:
+            return "would run"
+
+        start = time.time()
+        try:
+            with span(task.id, "task", stage=task.stage, repo=task.repo):
+                success = task.action()
+        except Exception as e:
+            print(f"✗ {task.id}: {e}")
+            success = False
+        end = time.time()
+
+        if not success or not all(os.path.exists(p) for p in task.outputs):
+            return "failed"
+        self.timings[task.id] = (start, end)
+        if self.history is not None and task.repo is not None:
+            self.history.record(task.stage, task.repo, end - start, self.sizes[task.repo])
+
+        with self.state_lock:
+            self.state[task.id] = {
+                "inputs": input_hash,
+                "outputs": {path: hash_file(path) for path in task.outputs},
+            }
+            save_state(self.state)
+        return "ok"
+
+    def run(self):
+        if self.history is not None:
+            self._predict()
+            # A ordem de `pending` decide qual das tarefas prontas é submetida primeiro
+            pending = dict(sorted(self.tasks.items(), key=lambda item: self._priority(item[1]), reverse=True))
+        else:
+            pending = dict(self.tasks)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for task_id, task in list(pending.items()):
+                    deps_status = [self.status.get(dep) for dep in task.deps if dep in self.tasks]
+                    if task.require_deps and any(s in ("failed", "skipped") for s in deps_status):
+                        self.status[task_id] = "skipped"
+                        print(f"- {task_id}: ignorada (dependência falhou)")
+                        del pending[task_id]
+                    elif all(s is not None for s in deps_status):
+                        limit = STAGE_CONCURRENCY.get(task.stage, self.max_workers)
+                        if self.running_per_stage[task.stage] >= limit:
+                            continue
+                        self.running_per_stage[task.stage] += 1
+                        running[executor.submit(self._execute, task)] = task
+                        del pending[task_id]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    self.running_per_stage[task.stage] -= 1
+                    self.status[task.id] = future.result()
+                    if self.status[task.id] == "would run":
+                        print(f"• {task.id} seria executada")
+                        continue
+                    symbol = {"ok": "✓", "cached": "=", "failed": "✗"}[self.status[task.id]]
+                    print(f"{symbol} {task.id} ({self.status[task.id]})")
+        return self.status
+
+    def makespan_reports(self):
+        """Makespan de cada etapa por repositório executada nesta rodada, comparado ao ideal."""
+        reports = []
+        for stage in STAGES:
+            executed = [task for task in self.tasks.values()
+                        if task.stage == stage and task.repo is not None and task.id in self.timings]
+            if not executed:
+                continue
+            timings = [self.timings[task.id] for task in executed]
+            durations = [end - start for start, end in timings]
+            makespan = max(end for _, end in timings) - min(start for start, _ in timings)
+            workers = min(STAGE_CONCURRENCY.get(stage, self.max_workers), self.max_workers)
+            reports.append(makespan_report(stage, makespan, durations, workers, original_order=durations,
+                                           predictions=[(self.predictions.get(task.id), duration)
+                                                        for task, duration in zip(executed, durations)]))
+        return reports
+
+
+def list_repositories():
+    if not os.path.isdir(REPOS_DIR):
+        return []
+    return sorted(d for d in os.listdir(REPOS_DIR) if os.path.isdir(os.path.join(REPOS_DIR, d)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa o pipeline de análise refazendo apenas o que mudou.")
+    parser.add_argument("--repos", nargs="+", help="Repositórios a processar (padrão: todos em data/repositories).")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=[s for s in STAGES if s not in OPTIONAL_STAGES],
+                        help=f"Etapas a executar (padrão: todas exceto {', '.join(OPTIONAL_STAGES)}).")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Tarefas executadas em paralelo.")
+    parser.add_argument("--force", action="store_true", help="Refaz as tarefas mesmo sem mudanças nas entradas.")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas lista as tarefas que seriam executadas.")
+    args = parser.parse_args(setup_from_args("pipeline"))
+
+    # Os scripts das etapas usam caminhos relativos a scripts/
+    os.chdir(BASE_DIR)
+
+    repos = args.repos or list_repositories()
+    tasks = build_tasks(repos, set(args.stages))
+    print(f"{len(tasks)} tarefas para {len(repos)} repositório(s).")
+
+    history = DurationHistory()
+    scheduler = Scheduler(tasks, load_state(), args.workers, args.force, args.dry_run, history)
+    status = scheduler.run()
+    history.close()
+
+    counts = {s: list(status.values()).count(s) for s in ("ok", "cached", "failed", "skipped", "would run")}
+    if args.dry_run:
+        print(f"\nSeriam executadas: {counts['would run']} | Em cache: {counts['cached']} | "
+              f"Falharam: {counts['failed']} | Ignoradas: {counts['skipped']}")
+    else:
+        print(f"\nExecutadas: {counts['ok']} | Em cache: {counts['cached']} | "
+              f"Falharam: {counts['failed']} | Ignoradas: {counts['skipped']}")
+    for report in scheduler.makespan_reports():
+        print(format_report(report))
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
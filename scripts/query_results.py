@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+
+from smell_names import COMMON_CODE_SMELLS, normalize_smell_name
+
+# Consultas rápidas aos resultados (PMD, Checkstyle, métricas, SonarQube e variantes da LLM)
+# sem rodar o analyze_results.py. As contagens ficam num índice SQLite em
+# data/results_index.sqlite, montado a partir dos sumários; o matplotlib só é importado com
+# --plot. Exemplos:
+#
+#   python scripts/query_results.py --repo apache_kafka --smell EmptyCatchBlock --source pmd zero_shot
+#   python scripts/query_results.py --smell god_class --top 10
+#   python scripts/query_results.py --repo apache_kafka
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+INDEX_FILE = os.path.join(DATA_DIR, "results_index.sqlite")
+
+TOOL_SOURCES = {
+    "pmd": os.path.join(DATA_DIR, "pmd_reports", "summaries"),
+    "checkstyle": os.path.join(DATA_DIR, "checkstyle_reports", "summaries"),
+    "metrics": os.path.join(DATA_DIR, "metrics_reports", "summaries"),
+    "sonarqube": os.path.join(DATA_DIR, "sonarqube_reports", "summaries"),
+}
+LLM_RESULTS_DIR = os.path.join(DATA_DIR, "llm_results")
+LLM_VARIANTS = ("zero_shot", "one_shot", "prompt_calibrado")
+SOURCES = list(TOOL_SOURCES) + list(LLM_VARIANTS)
+
+
+def fingerprint():
+    """
+    Número de sumários e maior mtime por fonte. Os scripts reescrevem os sumários no lugar, o que
+    não muda o mtime dos diretórios, então a comparação é feita arquivo a arquivo (os.scandir sobre
+    algumas centenas de arquivos leva poucos milissegundos).
+    """
+    stamps = {}
+    for source, path in TOOL_SOURCES.items():
+        mtimes = []
+        if os.path.isdir(path):
+            mtimes = [entry.stat().st_mtime_ns for entry in os.scandir(path)
+                      if entry.name.endswith(".json") and entry.is_file()]
+        stamps[source] = [len(mtimes), max(mtimes, default=0)]
+
+    llm_mtimes = {variant: [] for variant in LLM_VARIANTS}
+    if os.path.isdir(LLM_RESULTS_DIR):
+        for repo_dir in os.scandir(LLM_RESULTS_DIR):
+            if not repo_dir.is_dir():
+                continue
+            for entry in os.scandir(repo_dir.path):
+                variant = entry.name[:-len(".json")]
+                if entry.name.endswith(".json") and variant in llm_mtimes:
+                    llm_mtimes[variant].append(entry.stat().st_mtime_ns)
+    for variant, mtimes in llm_mtimes.items():
+        stamps[variant] = [len(mtimes), max(mtimes, default=0)]
+    return stamps
+
+
+def build_index(index_file=INDEX_FILE):
+    """Lê todos os sumários (sem filtrar smells) e grava o índice. Devolve o número de contagens."""
+    from smell_data import load_llm_data_for_prompt, load_tool_data
+
+    # Antes da leitura: um sumário reescrito durante a montagem torna o índice desatualizado
+    stamps = fingerprint()
+    rows = []
+    datasets = [(source, load_tool_data(path, filter_common=False)) for source, path in TOOL_SOURCES.items()]
+    datasets += [(variant, load_llm_data_for_prompt(LLM_RESULTS_DIR, variant, filter_common=False))
+                 for variant in LLM_VARIANTS]
+    for source, data in datasets:
+        for repo, content in data.items():
+            rows.extend((source, repo, smell, count) for smell, count in content["code_smells"].items())
+
+    tmp_file = f"{index_file}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    conn = sqlite3.connect(tmp_file)
+    with conn:
+        conn.execute("CREATE TABLE counts (source TEXT, repo TEXT, smell TEXT, count REAL)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO counts VALUES (?, ?, ?, ?)", rows)
+        conn.execute("CREATE INDEX counts_repo ON counts (repo, smell)")
+        conn.execute("CREATE INDEX counts_smell ON counts (smell, repo)")
+        conn.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (json.dumps(stamps),))
+    conn.close()
+    os.replace(tmp_file, index_file)
+    return len(rows)
+
+
+def open_index(index_file=INDEX_FILE, rebuild=False):
+    """Abre o índice, reconstruindo-o se não existir, se --rebuild ou se algum sumário mudou."""
+    if not rebuild and os.path.exists(index_file):
+        conn = sqlite3.connect(index_file)
+        stored = conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if stored and json.loads(stored[0]) == fingerprint():
+            return conn
+        conn.close()
+        print("• Resultados mudaram desde o último índice, reconstruindo...", file=sys.stderr)
+    count = build_index(index_file)
+    print(f"• Índice com {count} contagens salvo em {index_file}", file=sys.stderr)
+    return sqlite3.connect(index_file)
+
+
+def query(conn, repos=None, smells=None, sources=None, all_smells=False):
+    """
+    Soma as contagens por (linha, fonte). As linhas são os smells quando a consulta é sobre um
+    único repositório sem --smell, e os repositórios nos demais casos. Sem --smell, só entram os
+    smells comuns (COMMON_CODE_SMELLS), como no analyze_results.py, a menos que all_smells.
+    """
+    by_smell = repos is not None and len(repos) == 1 and not smells
+    conditions, params = [], []
+    for column, values in (("repo", repos), ("source", sources)):
+        if values:
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    smell_filter = [normalize_smell_name(s) for s in smells] if smells else (None if all_smells else sorted(COMMON_CODE_SMELLS))
+    if smell_filter:
+        conditions.append(f"smell IN ({', '.join('?' * len(smell_filter))})")
+        params.extend(smell_filter)
+
+    row_column = "smell" if by_smell else "repo"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    table = {}
+    for row, source, total in conn.execute(
+            f"SELECT {row_column}, source, SUM(count) FROM counts {where} GROUP BY {row_column}, source", params):
+        table.setdefault(row, {})[source] = total
+    return row_column, table
+
+
+def format_number(value):
+    if value is None:
+        return "-"
+    return f"{value:.0f}" if float(value).is_integer() else f"{value:.1f}"
+
+
+def print_table(row_column, table, sources):
+    width = max([len(row_column), len("TOTAL")] + [len(row) for row in table])
+    print(f"{row_column:<{width}} " + " ".join(f"{source:>16}" for source in sources))
+    for row, values in table.items():
+        print(f"{row:<{width}} " + " ".join(f"{format_number(values.get(source)):>16}" for source in sources))
+    totals = {source: sum(values.get(source) or 0 for values in table.values()) for source in sources}
+    print(f"{'TOTAL':<{width}} " + " ".join(f"{format_number(totals[source]):>16}" for source in sources))
+
+
+def plot_table(row_column, table, sources, output):
+    """Barras agrupadas por linha; matplotlib só é importado aqui."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    rows = list(table)
+    width = 0.8 / max(len(sources), 1)
+    fig, ax = plt.subplots(figsize=(max(8, len(rows) * 0.6), 5))
+    for i, source in enumerate(sources):
+        ax.bar([x + i * width for x in range(len(rows))], [table[row].get(source) or 0 for row in rows],
+               width=width, label=source)
+    ax.set_xticks([x + width * (len(sources) - 1) / 2 for x in range(len(rows))])
+    ax.set_xticklabels(rows, rotation=45, ha="right")
+    ax.set_xlabel(row_column)
+    ax.set_ylabel("Code smells")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output, dpi=150)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta as contagens de code smells por repositório, smell e fonte.")
+    parser.add_argument("--repo", nargs="+", help="Repositórios (padrão: todos).")
+    parser.add_argument("--smell", nargs="+", help="Smells, em qualquer grafia (ex.: EmptyCatchBlock, empty_catch_block).")
+    parser.add_argument("--source", nargs="+", choices=SOURCES, help="Fontes (padrão: todas com resultados).")
+    parser.add_argument("--all-smells", action="store_true", help="Sem --smell, soma todos os smells em vez de só os comuns.")
+    parser.add_argument("--top", type=int, help="Mantém as N linhas com mais smells (somando as fontes exibidas).")
+    parser.add_argument("--list", choices=["repos", "smells", "sources"], help="Lista os valores existentes no índice.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    parser.add_argument("--plot", metavar="ARQUIVO", help="Salva um gráfico de barras (importa matplotlib).")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstrói o índice a partir dos sumários.")
+    args = parser.parse_args()
+
+    conn = open_index(rebuild=args.rebuild)
+    if args.list:
+        column = args.list[:-1]
+        for (value,) in conn.execute(f"SELECT DISTINCT {column} FROM counts ORDER BY {column}"):
+            print(value)
+        return
+
+    row_column, table = query(conn, args.repo, args.smell, args.source, args.all_smells)
+    sources = args.source or [s for s in SOURCES if any(s in values for values in table.values())]
+    if not table:
+        print("Nenhum resultado para a consulta.")
+        return
+    rows = sorted(table)
+    if args.top:
+        rows = sorted(rows, key=lambda row: -sum(table[row].get(source) or 0 for source in sources))[:args.top]
+    table = {row: table[row] for row in rows}
+
+    if args.json:
+        print(json.dumps({"rows": row_column, "sources": sources, "counts": table}, indent=2, ensure_ascii=False))
+    else:
+        print_table(row_column, table, sources)
+    if args.plot:
+        plot_table(row_column, table, sources, args.plot)
+        print(f"✓ Gráfico salvo em {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import io
+import os
+import gzip
+import shutil
+import argparse
+
+from instrumentation import setup_from_args
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional; sem ele os relatórios usam gzip
+    zstandard = None
+
+# Relatórios brutos (CSV do PMD, XML do Checkstyle) comprimidos em disco. Os caminhos usados
+# pelos scripts continuam sendo os nomes "lógicos" (ex.: repo_pmd_report.csv); o arquivo real
+# ganha o sufixo da compressão, e os leitores descomprimem em streaming.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+REPORT_DIRS = [os.path.join(DATA_DIR, "pmd_reports"), os.path.join(DATA_DIR, "checkstyle_reports")]
+
+REPORT_COMPRESSION = "gzip"  # "gzip", "zstd" (requer o pacote zstandard) ou None
+GZIP_LEVEL = 6               # O nível 9 quase não reduz mais o XML e é bem mais lento
+ZSTD_LEVEL = 10
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+CHUNK_SIZE = 1 << 20
+
+
+def compression():
+    if REPORT_COMPRESSION == "zstd" and zstandard is None:
+        return "gzip"
+    return REPORT_COMPRESSION
+
+
+def compressed_name(path):
+    """Caminho real em disco para o relatório lógico `path`, segundo a compressão configurada."""
+    return path + SUFFIXES.get(compression(), "")
+
+
+def report_base(path):
+    """Remove o sufixo de compressão (repo_pmd_report.csv.gz -> repo_pmd_report.csv)."""
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def variants(path):
+    base = report_base(path)
+    return [base] + [base + suffix for suffix in SUFFIXES.values()]
+
+
+def find_report(path):
+    """Arquivo existente (plano ou comprimido) do relatório lógico `path`; o mais recente se houver vários."""
+    existing = [p for p in variants(path) if os.path.exists(p)]
+    if not existing:
+        return compressed_name(report_base(path))
+    return max(existing, key=os.path.getmtime)
+
+
+def open_report(path, mode="rt"):
+    """Abre um relatório pelo sufixo, descomprimindo/comprimindo em streaming. Modos: rt, rb, wt, wb."""
+    text = "t" in mode
+    if path.endswith(".gz"):
+        # mtime=0 deixa o arquivo determinístico: mesmo conteúdo, mesmo hash no pipeline
+        stream = gzip.GzipFile(path, mode[0] + "b", compresslevel=GZIP_LEVEL, mtime=0)
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="") if text else stream
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} está em zstd; instale o pacote zstandard (pip install zstandard)")
+        raw = open(path, mode[0] + "b")
+        if mode[0] == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="") if text else stream
+    if text:
+        return open(path, mode, encoding="utf-8", newline="")
+    return open(path, mode)
+
+
+def remove_variants(path, keep=None):
+    for variant in variants(path):
+        if variant != keep and os.path.exists(variant):
+            os.remove(variant)
+
+
+def create_report(path, mode="wt"):
+    """Abre para escrita o arquivo comprimido do relatório lógico `path`, removendo versões antigas."""
+    target = compressed_name(report_base(path))
+    remove_variants(path, keep=target)
+    return open_report(target, mode)
+
+
+def finalize_report(path):
+    """Comprime o arquivo plano escrito por uma ferramenta externa e devolve o caminho final."""
+    target = compressed_name(report_base(path))
+    if target == path or not os.path.exists(path):
+        return find_report(path)
+    with open(path, "rb") as source, open_report(target, "wb") as destination:
+        shutil.copyfileobj(source, destination, CHUNK_SIZE)
+    remove_variants(path, keep=target)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprime os relatórios brutos já existentes (PMD e Checkstyle).")
+    parser.add_argument("dirs", nargs="*", default=REPORT_DIRS, help="Diretórios com os relatórios.")
+    args = parser.parse_args(setup_from_args("report_files"))
+
+    before = after = 0
+    for directory in args.dirs:
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not name.endswith((".csv", ".xml")) or not os.path.isfile(path):
+                continue
+            size = os.path.getsize(path)
+            final = finalize_report(path)
+            before, after = before + size, after + os.path.getsize(final)
+            print(f"✓ {name}: {size / 1024:.0f} KB → {os.path.getsize(final) / 1024:.0f} KB")
+    if before:
+        print(f"\nTotal: {before / 2**20:.1f} MB → {after / 2**20:.1f} MB ({after / before:.1%})")
+
+
+if __name__ == "__main__":
+    main()
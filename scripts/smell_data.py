@@ -0,0 +1,101 @@
+import os
+import json
+import glob
+
+from instrumentation import traced
+from smell_names import COMMON_CODE_SMELLS, normalize_smell_name
+
+# Leitura dos sumários (PMD, Checkstyle, métricas, SonarQube) e dos resultados da LLM, com os
+# nomes dos smells normalizados. Fica separado do analyze_results.py para que o índice do
+# query_results.py seja montado sem importar pandas/matplotlib.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
+
+PMD_REPORTS_DIR = os.path.join(DATA_DIR, 'pmd_reports', 'summaries')
+CHECKSTYLE_REPORTS_DIR = os.path.join(DATA_DIR, 'checkstyle_reports', 'summaries')
+METRICS_REPORTS_DIR = os.path.join(DATA_DIR, 'metrics_reports', 'summaries')
+SONARQUBE_REPORTS_DIR = os.path.join(DATA_DIR, 'sonarqube_reports', 'summaries')
+LLM_RESULTS_DIR = os.path.join(DATA_DIR, 'llm_results')
+
+# --- 2. Carregamento de Dados ---
+def load_json_file(file_path):
+    """Carrega um único arquivo JSON."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Aviso: Erro ao carregar {file_path}: {e}")
+        return None
+
+@traced("load", capture=("tool_summaries_path",))
+def load_tool_data(tool_summaries_path, filter_common=True):
+    """
+    Carrega dados de ferramentas como PMD ou CheckStyle.
+    """
+    data = {}
+    if not os.path.isdir(tool_summaries_path):
+        print(f"Aviso: Diretório não encontrado {tool_summaries_path}")
+        return data
+
+    for file_path in glob.glob(os.path.join(tool_summaries_path, '*.json')):
+        content = load_json_file(file_path)
+        if content and 'repository' in content:
+            repo_name = content['repository']
+            normalized_smells = {}
+            
+            for k, v in content.get('code_smells', {}).items():
+                normalized_name = normalize_smell_name(k)
+                if normalized_name and (not filter_common or normalized_name in COMMON_CODE_SMELLS):
+                    normalized_smells[normalized_name] = normalized_smells.get(normalized_name, 0) + v
+            
+            data[repo_name] = {
+                "code_smells": normalized_smells,
+                "total_smells": sum(normalized_smells.values())
+            }
+    return data
+
+@traced("load", capture=("prompt_type",))
+def load_llm_data_for_prompt(llm_base_path, prompt_type, filter_common=True):
+    """
+    Carrega dados da LLM para um tipo de prompt específico.
+    """
+    data = {}
+    if not os.path.isdir(llm_base_path):
+        print(f"Aviso: Diretório base da LLM não encontrado {llm_base_path}")
+        return data
+
+    for repo_folder_name in os.listdir(llm_base_path):
+        repo_folder_path = os.path.join(llm_base_path, repo_folder_name)
+        if os.path.isdir(repo_folder_path):
+            repo_name = repo_folder_name
+            file_path = os.path.join(repo_folder_path, f"{prompt_type}.json")
+            content = load_json_file(file_path)
+            
+            if content:
+                if 'repository' not in content:
+                    content['repository'] = repo_name
+
+                normalized_smells = {}
+                for k, v in content.get('code_smells', {}).items():
+                    normalized_name = normalize_smell_name(k)
+                    if normalized_name and (not filter_common or normalized_name in COMMON_CODE_SMELLS):
+                        normalized_smells[normalized_name] = normalized_smells.get(normalized_name, 0) + v
+                
+                data[repo_name] = {
+                    "code_smells": normalized_smells,
+                    "total_smells": sum(normalized_smells.values())
+                }
+                
+                # Resultados por amostragem (llm_incremental.py --fracao): intervalo do total
+                # filtrado, somando os limites de cada smell (conservador)
+                smells_ci = content.get('sampling', {}).get('code_smells_ci')
+                if smells_ci:
+                    low, high = 0.0, 0.0
+                    for k, (ci_low, ci_high) in smells_ci.items():
+                        normalized_name = normalize_smell_name(k)
+                        if normalized_name and (not filter_common or normalized_name in COMMON_CODE_SMELLS):
+                            low += ci_low
+                            high += ci_high
+                    data[repo_name]["total_smells_ci"] = (low, high)
+    return data
@@ -0,0 +1,42 @@
+# Nomes normalizados dos code smells, comuns a todas as fontes. Sem dependências, para que
+# qualquer script (inclusive o query_results.py) possa importar sem custo.
+
+# --- Code Smells Comuns entre PMD e CheckStyle ---
+COMMON_CODE_SMELLS = {
+    "empty_catch_block",
+    "unused_import",
+    "cyclomatic_complexity",
+    "god_class",
+    "naming_conventions",
+    "class_naming_conventions",
+    "empty_control_statement",
+    "too_many_fields"
+}
+
+# --- 1. Normalização de Nomes de Code Smells ---
+def normalize_smell_name(name):
+    """
+    Normaliza os nomes dos code smells para comparação.
+    """
+    name = name.lower()
+    name = name.replace('-', '_').replace(' ', '_')
+    
+    # Mapeamentos específicos
+    mappings = {
+        "empty_catch_block": ["empty_catch_block", "emptycatchblock"],
+        "cyclomatic_complexity": ["cyclomatic_complexity", "cyclomaticcomplexity"],
+        "god_class": ["god_class", "godclass", "classfanoutcomplexity"],
+        "class_naming_conventions": ["class_naming_conventions", "classnamingconventions", "typename"],
+        "too_many_fields": ["too_many_fields", "toomanyfields", "classdataabstractioncoupling"],
+        "too_many_methods": ["too_many_methods", "toomanymethods"],
+        "unused_import": ["unused_import", "unnecessary_import", "unnecessaryimport", "unusedimports"],
+        "empty_control_statement": ["empty_control_statement", "emptycontrolstatement", "emptystatement"],
+        "naming_conventions": ["naming_conventions", "namingconventions", "typename"],
+        "unused_local_variable": ["unused_local_variable", "unnecessarylocalbeforereturn"]
+    }
+    
+    for normalized, variations in mappings.items():
+        if any(var in name for var in variations):
+            return normalized
+    
+    return name
@@ -0,0 +1,197 @@
+import warnings
+
+import numpy as np
+
+# Estatísticas vetorizadas sobre matrizes alinhadas repositório × code smell.
+# Todas as funções de concordância reduzem sobre o eixo -2 (repositórios), então aceitam
+# tanto uma matriz (R, S) quanto um lote de reamostragens (B, R, S).
+
+BOOTSTRAP_SAMPLES = 1000
+BOOTSTRAP_ALPHA = 0.05
+# Limita a memória do bootstrap: reamostragens avaliadas por bloco de B × R × S valores
+BOOTSTRAP_CHUNK_VALUES = 20_000_000
+
+
+# --- Alinhamento ---
+def collect_smells(datasets, repositories):
+    smells = set()
+    for data in datasets:
+        for repo in repositories:
+            smells.update(data.get(repo, {"code_smells": {}})["code_smells"].keys())
+    return sorted(smells)
+
+
+def to_matrix(data, repositories, smells):
+    """Converte {repo: {"code_smells": {smell: n}}} numa matriz (R, S) de contagens."""
+    row_index = {repo: i for i, repo in enumerate(repositories)}
+    col_index = {smell: j for j, smell in enumerate(smells)}
+    rows, cols, values = [], [], []
+    for repo, repo_data in data.items():
+        i = row_index.get(repo)
+        if i is None:
+            continue
+        for smell, count in repo_data.get("code_smells", {}).items():
+            j = col_index.get(smell)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+                values.append(count)
+
+    matrix = np.zeros((len(repositories), len(smells)), dtype=float)
+    if values:
+        np.add.at(matrix, (np.array(rows), np.array(cols)), np.array(values, dtype=float))
+    return matrix
+
+
+def align(datasets, repositories, smells=None):
+    """Alinha vários datasets nas mesmas linhas (repositórios) e colunas (smells)."""
+    if smells is None:
+        smells = collect_smells(datasets, repositories)
+    return smells, [to_matrix(data, repositories, smells) for data in datasets]
+
+
+def total_smells_vector(data, repositories):
+    return np.array([data.get(repo, {}).get("total_smells", 0) for repo in repositories], dtype=float)
+
+
+# --- Métricas do corpus ---
+def average_difference(totals1, totals2):
+    """Diferença média de detecções por repositório."""
+    if totals1.size == 0:
+        return 0
+    return float(np.mean(totals1 - totals2))
+
+
+def corpus_similarity(llm_matrix, tool_matrix):
+    """
+    Similaridade e divergência (Jaccard sobre os totais do corpus por tipo de smell), em %.
+    Mesma definição usada em analyze_results.calculate_corpus_metrics.
+    """
+    llm_totals = llm_matrix.sum(axis=-2)
+    tool_totals = tool_matrix.sum(axis=-2)
+    intersection = np.minimum(llm_totals, tool_totals).sum(axis=-1)
+    union = llm_totals.sum(axis=-1) + tool_totals.sum(axis=-1) - intersection
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = np.where(union == 0, 0.0, intersection / union * 100)
+        divergence = np.where(union == 0, 0.0, (llm_totals.sum(axis=-1) - intersection) / union * 100)
+    return similarity, divergence
+
+
+# --- Concordância por smell ---
+def _safe_divide(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator == 0, np.nan, numerator / np.where(denominator == 0, 1, denominator))
+
+
+def jaccard(m1, m2):
+    """Jaccard de presença/ausência: repositórios em que ambos detectam / em que algum detecta."""
+    a, b = m1 > 0, m2 > 0
+    return _safe_divide((a & b).sum(axis=-2), (a | b).sum(axis=-2))
+
+
+def weighted_jaccard(m1, m2):
+    return _safe_divide(np.minimum(m1, m2).sum(axis=-2), np.maximum(m1, m2).sum(axis=-2))
+
+
+def pearson(m1, m2):
+    c1 = m1 - m1.mean(axis=-2, keepdims=True)
+    c2 = m2 - m2.mean(axis=-2, keepdims=True)
+    covariance = (c1 * c2).sum(axis=-2)
+    return _safe_divide(covariance, np.sqrt((c1 ** 2).sum(axis=-2) * (c2 ** 2).sum(axis=-2)))
+
+
+def rank(matrix):
+    """Postos com média para empates ao longo do eixo -2, sem laços em Python."""
+    n = matrix.shape[-2]
+    order = np.argsort(matrix, axis=-2, kind="stable")
+    sorted_values = np.take_along_axis(matrix, order, axis=-2)
+
+    positions = np.arange(n).reshape((n,) + (1,))
+    positions = np.broadcast_to(positions, sorted_values.shape)
+    new_group = np.ones(sorted_values.shape, dtype=bool)
+    new_group[..., 1:, :] = sorted_values[..., 1:, :] != sorted_values[..., :-1, :]
+    end_group = np.ones(sorted_values.shape, dtype=bool)
+    end_group[..., :-1, :] = new_group[..., 1:, :]
+
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0), axis=-2)
+    group_end = np.flip(np.minimum.accumulate(np.flip(np.where(end_group, positions, n - 1), axis=-2), axis=-2), axis=-2)
+    average_rank = (group_start + group_end) / 2 + 1
+
+    ranks = np.empty(matrix.shape, dtype=float)
+    np.put_along_axis(ranks, order, average_rank, axis=-2)
+    return ranks
+
+
+def spearman(m1, m2):
+    return pearson(rank(m1), rank(m2))
+
+
+def cohen_kappa(m1, m2):
+    """Kappa de Cohen sobre presença/ausência do smell em cada repositório."""
+    a, b = m1 > 0, m2 > 0
+    observed = (a == b).mean(axis=-2)
+    p1, p2 = a.mean(axis=-2), b.mean(axis=-2)
+    expected = p1 * p2 + (1 - p1) * (1 - p2)
+    return _safe_divide(observed - expected, 1 - expected)
+
+
+AGREEMENT_METRICS = {
+    "jaccard": jaccard,
+    "weighted_jaccard": weighted_jaccard,
+    "pearson": pearson,
+    "spearman": spearman,
+    "cohen_kappa": cohen_kappa,
+}
+
+
+def per_smell_agreement(m1, m2):
+    return {name: metric(m1, m2) for name, metric in AGREEMENT_METRICS.items()}
+
+
+# --- Bootstrap ---
+def bootstrap_ci(m1, m2, n_samples=BOOTSTRAP_SAMPLES, alpha=BOOTSTRAP_ALPHA, seed=42):
+    """
+    Intervalos de confiança (percentis) por smell para cada métrica de concordância.
+    Os índices das reamostragens são sorteados de uma vez como uma matriz (B, R); as
+    métricas são avaliadas em blocos de reamostragens para limitar a memória.
+    """
+    n_repos, n_smells = m1.shape
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, n_repos, size=(n_samples, n_repos))
+
+    chunk = max(1, BOOTSTRAP_CHUNK_VALUES // max(1, n_repos * n_smells))
+    samples = {name: [] for name in AGREEMENT_METRICS}
+    for start in range(0, n_samples, chunk):
+        batch = indices[start:start + chunk]
+        for name, values in per_smell_agreement(m1[batch], m2[batch]).items():
+            samples[name].append(values)
+
+    intervals = {}
+    for name, chunks in samples.items():
+        values = np.concatenate(chunks, axis=0)
+        # Colunas só com NaN (smell ausente em todas as reamostragens) geram aviso
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            low = np.nanpercentile(values, 100 * alpha / 2, axis=0)
+            high = np.nanpercentile(values, 100 * (1 - alpha / 2), axis=0)
+        intervals[name] = (low, high)
+    return intervals
+
+
+def agreement_table(llm_data, tool_data, repositories, n_samples=BOOTSTRAP_SAMPLES, seed=42):
+    """Linhas (dicts) com as métricas por smell e seus intervalos de confiança."""
+    smells, (m1, m2) = align([llm_data, tool_data], repositories)
+    if not smells or not repositories:
+        return []
+    point = per_smell_agreement(m1, m2)
+    intervals = bootstrap_ci(m1, m2, n_samples=n_samples, seed=seed)
+
+    rows = []
+    for j, smell in enumerate(smells):
+        row = {"code_smell": smell}
+        for name in AGREEMENT_METRICS:
+            row[name] = float(point[name][j])
+            row[f"{name}_ci_low"] = float(intervals[name][0][j])
+            row[f"{name}_ci_high"] = float(intervals[name][1][j])
+        rows.append(row)
+    return rows
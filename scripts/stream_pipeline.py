@@ -0,0 +1,218 @@
+import os
+import json
+import stat
+import time
+import shutil
+import tarfile
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import setup_from_args, span
+from pipeline import BASE_DIR, DATA_DIR, load_stage
+
+# Modo streaming: cada repositório passa por clone → PMD + Checkstyle → sumários → remoção
+# da cópia de trabalho. Só MAX_IN_FLIGHT repositórios ocupam disco ao mesmo tempo.
+
+WORK_DIR = os.path.join(DATA_DIR, "stream_work")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "java_archives")
+RESULTS_FILE = os.path.join(DATA_DIR, "clone_logs", "stream_results.jsonl")
+
+MAX_IN_FLIGHT = 3
+NUM_REPOS = 10
+CLONE_DEPTH = 1  # Só o HEAD é analisado, o histórico não é necessário
+
+
+def remove_tree(path):
+    """Remove a cópia de trabalho, inclusive arquivos somente leitura do .git (Windows)."""
+    def on_error(func, failed_path, _):
+        os.chmod(failed_path, stat.S_IWRITE)
+        func(failed_path)
+    shutil.rmtree(path, onerror=on_error)
+
+
+def archive_java_files(repo_path, repo_name):
+    """Guarda apenas os arquivos .java do repositório num tar.gz."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    archive_path = os.path.join(ARCHIVE_DIR, f"{repo_name}.tar.gz")
+    with tarfile.open(archive_path, "w:gz") as tar:
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d != ".git"]
+            for file in files:
+                if file.endswith(".java"):
+                    file_path = os.path.join(root, file)
+                    tar.add(file_path, arcname=os.path.relpath(file_path, repo_path))
+    return archive_path
+
+
+class StreamingPipeline:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, archive=False, keep=False, depth=CLONE_DEPTH):
+        self.clone = load_stage("01_clone_repos")
+        self.pmd = load_stage("02_analyze_pmd")
+        self.pmd_summary = load_stage("03_total_smells_pmd")
+        self.checkstyle = load_stage("05_analyze_checkstyle")
+        self.checkstyle_summary = load_stage("06_total_smells_checkstyle")
+
+        self.max_in_flight = max_in_flight
+        self.archive = archive
+        self.keep = keep
+        self.depth = depth
+        # Limita quantas cópias de trabalho existem em disco ao mesmo tempo
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        # Clones bem-sucedidos e clones ainda em andamento, para o limite de --num-repos
+        self.clone_state = threading.Condition()
+        self.cloned = 0
+        self.cloning = 0
+        self.results_lock = threading.Lock()
+        os.makedirs(WORK_DIR, exist_ok=True)
+        os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+
+    def record(self, result):
+        with self.results_lock:
+            with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def analyse(self, repo_path, repo_name):
+        """Roda PMD e Checkstyle em paralelo na mesma cópia de trabalho e gera os sumários."""
+        checkstyle_xml = os.path.join(self.checkstyle.RESULTS_DIR, f"{repo_name}_checkstyle_raw.xml")
+        with ThreadPoolExecutor(max_workers=2) as analysers:
+            pmd_future = analysers.submit(self.pmd.run_pmd_on_repo, repo_path, repo_name)
+            checkstyle_future = analysers.submit(self.checkstyle.run_checkstyle, repo_path, checkstyle_xml)
+            pmd_ok, checkstyle_ok = pmd_future.result(), checkstyle_future.result()
+
+        if pmd_ok:
+            pmd_csv = os.path.join(self.pmd.REPORTS_DIR, f"{repo_name}_pmd_report.csv")
+            pmd_ok = self.pmd_summary.summarize_pmd_report(pmd_csv) is not None
+        if checkstyle_ok:
+            try:
+                self.checkstyle_summary.generate_summary_json(
+                    repo_name, self.checkstyle_summary.parse_checkstyle_report(checkstyle_xml))
+            except ET.ParseError as e:
+                # XML vazio ou truncado: o repositório fica sem sumário, como no 06_total_smells_checkstyle
+                print(f"✗ {repo_name}: relatório do Checkstyle inválido ({e})")
+                checkstyle_ok = False
+        return pmd_ok, checkstyle_ok
+
+    def process(self, repo):
+        """Executado por um worker; o slot já foi reservado por quem submeteu a tarefa."""
+        repo_name = f"{repo['owner']}_{repo['name']}"
+        repo_path = os.path.join(WORK_DIR, repo_name)
+        result = {"owner": repo["owner"], "name": repo["name"], "url": repo["url"], "stars": repo.get("stars"),
+                  "timestamp": datetime.now().isoformat(timespec="seconds")}
+        start = time.perf_counter()
+        success = False
+        try:
+            with span(repo_name, "repo"):
+                try:
+                    success, message = self.clone.clone_repository(repo["owner"], repo["name"], repo["url"],
+                                                                   repos_dir=WORK_DIR, depth=self.depth)
+                finally:
+                    self.clone_finished(success)
+                result.update({"cloned": success, "message": message})
+                if not success:
+                    return result
+
+                pmd_ok, checkstyle_ok = self.analyse(repo_path, repo_name)
+                result.update({"pmd": pmd_ok, "checkstyle": checkstyle_ok})
+                if self.archive:
+                    result["archive"] = archive_java_files(repo_path, repo_name)
+            return result
+        finally:
+            if os.path.exists(repo_path) and not self.keep:
+                remove_tree(repo_path)
+            self.slots.release()
+            result["seconds"] = round(time.perf_counter() - start, 1)
+            self.record(result)
+            print(f"✓ {repo_name} concluído em {result['seconds']}s "
+                  f"(PMD: {result.get('pmd')}, Checkstyle: {result.get('checkstyle')})")
+
+    def clone_finished(self, success):
+        with self.clone_state:
+            self.cloning -= 1
+            self.cloned += bool(success)
+            self.clone_state.notify_all()
+
+    def run(self, candidates, limit):
+        """
+        Consome os candidatos sob demanda: a próxima busca/clonagem só começa quando um
+        slot é liberado, então o disco nunca guarda mais que max_in_flight repositórios.
+        `limit` conta só os clones bem-sucedidos: um clone que falha abre vaga para outro candidato.
+        """
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for repo in candidates:
+                with self.clone_state:
+                    # Com clones em andamento que bastariam para o limite, espera o resultado deles
+                    self.clone_state.wait_for(lambda: self.cloned + self.cloning < limit or self.cloned >= limit)
+                    if self.cloned >= limit:
+                        break
+                    self.cloning += 1
+                self.slots.acquire()
+                futures.append((repo, executor.submit(self.process, repo)))
+
+        results = []
+        for repo, future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"✗ {repo['owner']}/{repo['name']}: {e}")
+                results.append({"owner": repo["owner"], "name": repo["name"], "url": repo["url"], "error": str(e)})
+        return results
+
+
+def discover_candidates(clone, start_page):
+    """Gera candidatos da busca do GitHub que usam Maven/Gradle e ainda não foram processados."""
+    already_done = clone.get_already_cloned_repos() | processed_repositories()
+    page = start_page
+    while True:
+        repos = clone.get_popular_java_repos(page=page, per_page=50)
+        if not repos:
+            return
+        candidates = [repo for repo in repos if f"{repo['owner']}_{repo['name']}" not in already_done]
+        yield from clone.filter_maven_gradle(candidates)
+        page += 1
+
+
+def processed_repositories():
+    done = set()
+    if os.path.exists(RESULTS_FILE):
+        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get("cloned"):
+                        done.add(f"{entry['owner']}_{entry['name']}")
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clona, analisa e remove cada repositório em fluxo contínuo.")
+    parser.add_argument("--repos", nargs="+", metavar="OWNER/NOME", help="Repositórios específicos (sem busca no GitHub).")
+    parser.add_argument("--num-repos", type=int, default=NUM_REPOS, help="Quantidade de repositórios a processar.")
+    parser.add_argument("--start-page", type=int, default=1, help="Página inicial da busca do GitHub.")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT, help="Repositórios em disco ao mesmo tempo.")
+    parser.add_argument("--archive-java", action="store_true", help="Guarda os arquivos .java em data/java_archives.")
+    parser.add_argument("--keep", action="store_true", help="Não remove as cópias de trabalho.")
+    parser.add_argument("--depth", type=int, default=CLONE_DEPTH, help="Profundidade do clone (0 = histórico completo).")
+    args = parser.parse_args(setup_from_args("stream_pipeline"))
+
+    os.chdir(BASE_DIR)
+    pipeline = StreamingPipeline(args.max_in_flight, args.archive_java, args.keep, args.depth or None)
+
+    if args.repos:
+        candidates = []
+        for full_name in args.repos:
+            owner, name = full_name.split("/", 1)
+            candidates.append({"owner": owner, "name": name, "url": f"https://github.com/{owner}/{name}"})
+    else:
+        candidates = discover_candidates(pipeline.clone, args.start_page)
+
+    results = pipeline.run(candidates, args.num_repos)
+    analysed = sum(1 for r in results if r.get("pmd") or r.get("checkstyle"))
+    print(f"\n{analysed}/{len(results)} repositórios analisados. Registro em {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
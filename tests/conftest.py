@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os scripts são módulos soltos em scripts/ (importados pelo nome, como no pipeline.py)
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
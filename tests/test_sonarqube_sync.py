@@ -0,0 +1,132 @@
+import json
+import importlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import mock_sonarqube_server
+
+# Sincronização das issues do 07_analyze_sonarqube.py contra o servidor local do
+# mock_sonarqube_server.py: completa, incremental, fallback quando as contagens divergem e
+# divisão por regra acima do limite de resultados da API.
+
+sonar = importlib.import_module("07_analyze_sonarqube")
+
+PROJECT = "code-smells:owner_repo"
+REPO = "owner_repo"
+
+
+@pytest.fixture
+def reports_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(sonar, "REPORTS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def start_server(monkeypatch, max_results=None, rules=None, **config):
+    if max_results is not None:
+        monkeypatch.setattr(mock_sonarqube_server, "MAX_RESULTS", max_results)
+        monkeypatch.setattr(sonar, "MAX_RESULTS", max_results)
+    if rules is not None:
+        monkeypatch.setattr(mock_sonarqube_server, "RULES", rules)
+    return mock_sonarqube_server.start_in_thread(latency=0, **config)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = start_server(monkeypatch)
+    yield server
+    server.shutdown()
+
+
+def sync(server, full=False):
+    client = sonar.SonarQubeClient(server.url, max_retries=1)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        return sonar.sync_issues(client, executor, REPO, PROJECT, full)
+
+
+def open_mapped(server):
+    """Issues abertas das regras mapeadas, como o servidor as vê."""
+    return [i for i in server.project_issues(PROJECT) if i["status"] == "OPEN" and i["rule"] in sonar.TARGET_RULES]
+
+
+def simulate_analysis(server, new=0, resolve=0):
+    response = requests.post(f"{server.url}/api/test/analysis",
+                             params={"project": PROJECT, "new": new, "resolve": resolve}, timeout=10)
+    response.raise_for_status()
+
+
+def test_full_sync(server, reports_dir):
+    issues, counts, mode = sync(server)
+
+    expected = open_mapped(server)
+    assert mode == "completa"
+    assert {i["key"] for i in issues} == {i["key"] for i in expected}
+    assert counts == dict(Counter(i["rule"] for i in expected))
+    with open(reports_dir / f"{REPO}_sonarqube_issues.json", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["project"] == PROJECT
+    assert len(state["issues"]) == len(expected)
+
+
+def test_incremental_sync_fetches_only_new_issues(server, reports_dir):
+    sync(server)
+    simulate_analysis(server, new=40)
+    searches = server.stats["issues_search"]
+
+    issues, counts, mode = sync(server)
+
+    expected = open_mapped(server)
+    assert mode.startswith("incremental")
+    assert {i["key"] for i in issues} == {i["key"] for i in expected}
+    assert counts == dict(Counter(i["rule"] for i in expected))
+    # Uma página de issues novas e a consulta das contagens, em vez de todas as páginas
+    assert server.stats["issues_search"] - searches == 2
+
+
+def test_resolved_issues_fall_back_to_full_sync(server, reports_dir, capsys):
+    sync(server)
+    simulate_analysis(server, resolve=15)
+
+    issues, counts, mode = sync(server)
+
+    expected = open_mapped(server)
+    assert mode == "completa"
+    assert "contagens divergentes" in capsys.readouterr().out
+    assert {i["key"] for i in issues} == {i["key"] for i in expected}
+    assert counts == dict(Counter(i["rule"] for i in expected))
+
+
+def test_splits_by_rule_above_max_results(monkeypatch, reports_dir):
+    server = start_server(monkeypatch, max_results=1000, issues_per_project=1500)
+    try:
+        expected = open_mapped(server)
+        assert len(expected) > 1000
+
+        issues, counts, mode = sync(server)
+
+        assert {i["key"] for i in issues} == {i["key"] for i in expected}
+        assert sum(counts.values()) == len(expected)
+    finally:
+        server.shutdown()
+
+
+def test_rule_above_max_results_keeps_incremental_sync(monkeypatch, reports_dir):
+    # Uma regra com mais issues do que a API devolve: o total local dela fica limitado e não
+    # pode ser conferido, mas as demais regras continuam sincronizando de forma incremental
+    rules = ["java:S2486"] * 8 + ["java:S1128", "java:S101"]
+    server = start_server(monkeypatch, max_results=1000, rules=rules, issues_per_project=3000)
+    try:
+        sync(server)
+        simulate_analysis(server, new=10)
+
+        issues, counts, mode = sync(server)
+
+        assert counts["java:S2486"] > 1000
+        assert mode.startswith("incremental")
+        local = Counter(i["rule"] for i in issues)
+        assert local["java:S1128"] == counts["java:S1128"]
+        assert local["java:S101"] == counts["java:S101"]
+    finally:
+        server.shutdown()